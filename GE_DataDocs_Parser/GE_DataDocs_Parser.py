@@ -1,170 +1,911 @@
 import ast
+import functools
 import json
 import logging
+import mmap
 import os
-import re
-from typing import Iterator, Union, List, Dict, Type
+import time
+from collections.abc import Mapping
+from concurrent.futures import Executor
+from typing import BinaryIO, Iterable, Iterator, Union, List, Dict, Optional, NamedTuple, Tuple
+
+from .cache import AnnotationCache
+from .defaults import CONFLICT_POLICIES, DEFAULT_MAX_SIZE
+from .docstrings import first_line, scan_docstrings
+from .limits import MemoryLimits
+from .pathfilter import PathFilter
+from .prefetch import prefetch_files, DEFAULT_READ_THREADS
+from .profiling import Profile
+from .records import FeatureAnnotation
 
 logger = logging.getLogger(__name__)
 
-# REGEX that is used to extract annotation information from DataDocs
-ANNOTATION_REGEX = ""
-ANNOTATION_REGEX += "[ ]*(id:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(title:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(icon:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(short_description:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(description:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(how_to_guide_url:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(maturity:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(maturity_details:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(api_stability:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(implementation_completeness:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(unit_test_coverage:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(integration_infrastructure_test_coverage:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(documentation_completeness:.*)[\n]"
-ANNOTATION_REGEX += "[ ]*(bug_risk:.*)[\n]"
-annotation_regex_compiled = re.compile(ANNOTATION_REGEX)
+# fields of compound statements that hold blocks of statements. Except handlers and match cases hold theirs in body
+_STATEMENT_BLOCKS = ("body", "orelse", "finalbody")
+
+# byte strings that every annotation block contains, rarest first. Used to skip files before building an AST
+FEATURE_MATURITY_MARKERS = (b"maturity", b"id:")
+
+# oversize files are searched for the markers in chunks of this many bytes instead of all at once
+MARKER_SCAN_CHUNK_SIZE = 1024 * 1024
+
+# fields of which an annotation block needs at least one, besides its id. Keeps "id:" lines in ordinary docstrings
+# (e.g. an Args section) from being mistaken for annotations
+REQUIRED_ANNOTATION_FIELDS = ("maturity", "maturity_details")
+
+ICON_URL_TEMPLATE = "https://great-expectations-web-assets.s3.us-east-2.amazonaws.com/feature_maturity_icons/{id}.png"
 
 # for extracting nested dict that contains maturity details
 maturity_details_keys = ["api_stability", "implementation_completeness", "unit_test_coverage", "integration_infrastructure_test_coverage", "documentation_completeness", "bug_risk"]
+MATURITY_DETAILS_FIELDS = frozenset(maturity_details_keys)
+
+
+class Provenance(NamedTuple):
+    """
+    Where an annotation was defined
+    """
+    filepath: Optional[str]
+    line: Optional[int]  # line the annotation block starts on
+    scope: Optional[str]  # dotted names of the class or function whose docstring holds the block, None for the module
+
+    def __str__(self) -> str:
+        location = ":".join(str(part) for part in (self.filepath, self.line) if part is not None) or "<unknown>"
+        return f"{location} ({self.scope})" if self.scope is not None else location
+
+
+class Conflict(NamedTuple):
+    """
+    An annotation id that is defined more than once
+    """
+    annotation_id: str
+    definitions: List[Provenance]  # every definition, in the order the files were added
+    kept: Optional[int]  # position in definitions of the one the index holds, None if the policy is error
+
+    def __str__(self) -> str:
+        definitions = ", ".join(f"{definition}{' (kept)' if position == self.kept else ''}"
+                                for position, definition in enumerate(self.definitions))
+        return f"{self.annotation_id} is defined {len(self.definitions)} times: {definitions}"
+
+
+class DuplicateAnnotationError(ValueError):
+    """
+    Raised when an index with the error conflict policy holds ids that are defined more than once
+    """
+
+    def __init__(self, conflicts: List[Conflict]):
+        super().__init__(f"{len(conflicts)} annotation ids are defined more than once: "
+                         f"{', '.join(conflict.annotation_id for conflict in conflicts)}")
+        self.conflicts = conflicts
+
+
+class AnnotationIndex(Mapping):
+    """
+    Annotations extracted from a source tree, by id. An index is filled in by build_index and not modified afterwards,
+    so it can be shared between threads and merged into any number of TOCs.
 
-# all annotation fields are stored as a global dict
-full_annotation = Dict[str, str]
+    The index also records the source file of every annotation, and the annotations of every file in the order the
+    files were added, which is what an incremental update needs to replace the annotations of a few files.
+
+    Files are added in walk order, which does not depend on the filesystem, so which definition of a duplicate id is
+    kept only depends on on_conflict. Every duplicate is recorded with where it was defined, for conflicts
+    """
+
+    def __init__(self, on_conflict: str = "last"):
+        """
+        Args:
+            on_conflict: one of CONFLICT_POLICIES. first keeps the first definition of an id, last the last one, and
+                error keeps the first one and makes check() raise
+        """
+        if on_conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}, not {on_conflict}")
+        self.on_conflict = on_conflict
+        self._annotations: Dict[str, Dict] = {}
+        self._sources: Dict[str, str] = {}  # id -> file the annotation was found in
+        self._files: Dict[str, List[Dict]] = {}  # file -> its annotations, for files that have any, in order added
+        self._duplicates: Dict[str, List[Provenance]] = {}  # id -> every definition, for ids defined more than once
+
+    def add(self, annotation_list: List[Dict], source: Optional[str] = None) -> None:
+        """
+        Args:
+            annotation_list: annotations of one file. An annotation whose id was added before is kept or dropped
+                according to on_conflict
+            source: path to the file the annotations were found in, if known
+        """
+        keep_last = self.on_conflict == "last"
+        for annotation in annotation_list:
+            annotation_id = annotation["id"]
+            if annotation_id in self._annotations:
+                definitions = self._duplicates.get(annotation_id)
+                if definitions is None:
+                    definitions = self._duplicates[annotation_id] = [self.provenance(annotation_id)]
+                definitions.append(Provenance(source, getattr(annotation, "line", None),
+                                              getattr(annotation, "scope", None)))
+                if not keep_last:
+                    continue
+            self._annotations[annotation_id] = annotation
+            if source is not None:
+                self._sources[annotation_id] = source
+            else:
+                self._sources.pop(annotation_id, None)
+        if source is not None and annotation_list:
+            self._files[source] = annotation_list
+
+    def source(self, annotation_id: str) -> Optional[str]:
+        """
+        Returns:
+            path to the file the annotation with annotation_id was found in, None if it was added without a source
+        """
+        return self._sources.get(annotation_id)
+
+    def provenance(self, annotation_id: str) -> Provenance:
+        """
+        Returns:
+            file, line and scope of the definition of annotation_id that the index holds
+        """
+        annotation = self._annotations[annotation_id]
+        return Provenance(self._sources.get(annotation_id), getattr(annotation, "line", None),
+                          getattr(annotation, "scope", None))
+
+    @property
+    def conflicts(self) -> List[Conflict]:
+        """
+        Returns:
+            the ids that were defined more than once, in the order their first duplicate was added
+        """
+        kept = {"first": 0, "error": None}
+        return [Conflict(annotation_id, definitions, kept.get(self.on_conflict, len(definitions) - 1))
+                for annotation_id, definitions in self._duplicates.items()]
+
+    def check(self) -> None:
+        """
+        Called once every file has been added
+
+        Raises:
+            DuplicateAnnotationError: if on_conflict is error and an id was defined more than once
+        """
+        if self.on_conflict == "error" and self._duplicates:
+            raise DuplicateAnnotationError(self.conflicts)
+
+    @property
+    def files(self) -> Dict[str, List[Dict]]:
+        return self._files
+
+    def __getitem__(self, annotation_id: str) -> Dict:
+        return self._annotations[annotation_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._annotations)
+
+    def __len__(self) -> int:
+        return len(self._annotations)
+
+
+class TocMergeReport(NamedTuple):
+    """
+    Ids that did not line up when annotations were merged into TOC files
+    """
+    unmatched_toc_ids: Dict[str, List[str]]  # TOC file -> ids of cases without an annotation
+    orphan_annotation_ids: List[str]  # ids of annotations that are not a case in any of the TOC files
+    duplicate_toc_ids: Dict[str, List[str]]  # TOC file -> ids that occur in more than one case
 
 
-def build_annotations(folder_to_annotate: object, in_json: object) -> object:
+class BuildOptions(NamedTuple):
+    """
+    How the files of a tree are found and parsed into an index, the same for every command that builds one
+    """
+    workers: Optional[int] = None  # processes used to parse files. None or 1 parses serially, 0 uses every CPU
+    cache_dir: Optional[str] = None  # directory of the persistent annotation cache. None keeps none on disk
+    cache_max_size: int = DEFAULT_MAX_SIZE  # size cap of the annotation cache in bytes
+    engine: str = "ast"  # how docstrings are found, one of ENGINES
+    # which directories and files under the tree to parse. None uses the default excludes and .gitignore files
+    path_filter: Optional[PathFilter] = None
+    read_ahead: int = 0  # files read ahead of the parser when parsing serially. 0 reads each file when it is parsed
+    read_threads: int = DEFAULT_READ_THREADS  # threads reading files ahead
+    on_conflict: str = "last"  # which definition of an id defined more than once is kept, one of CONFLICT_POLICIES
+    # size limit of the files that are parsed like the others, and what is done with larger ones. None parses every
+    # file with engine, whatever its size
+    memory_limits: Optional[MemoryLimits] = None
+
+
+def build_annotations(folder_to_annotate: object, in_json: object, workers: Optional[int] = None,
+                      cache_dir: Optional[str] = None, cache_max_size: int = DEFAULT_MAX_SIZE) -> object:
     """
     Entry-point into parser script from CLI
 
     Args:
         folder_to_annotate: PATH to Great Expectations folder
         in_json: TOC file for all Feature Maturity Grid annotations
+        workers: number of processes used to parse files. None or 1 parses serially, 0 uses every CPU
+        cache_dir: directory of the persistent annotation cache. None disables the cache
+        cache_max_size: size cap of the annotation cache in bytes
 
     Returns:
         JSON that can be used as input for the Feature Maturity Grid
     """
-    _build_full_annotation_dict(folder_to_annotate)
-    return _process_toc(in_json)
+    index = build_index(folder_to_annotate, BuildOptions(workers=workers, cache_dir=cache_dir,
+                                                         cache_max_size=cache_max_size))
+    return merge(in_json, index)
 
 
-def _build_full_annotation_dict(path: str) -> None:
+def build_index(path: str, options: Optional[BuildOptions] = None,
+                profile: Optional[Profile] = None) -> AnnotationIndex:
     """
+    Extracts the annotations of every .py file under path. Keeps no state between calls, so it is safe to call
+    concurrently from several threads
+
     Args:
-        path: PATH to Great Expectations folder (passed in from build_annotations function)
+        path: PATH to Great Expectations folder
+        options: how the files are found and parsed. None uses the defaults of BuildOptions, without a cache
+        profile: collects counts and timings of every stage, if given
 
     Returns:
-        None: will modify global full_annotation dict directly
+        index of the annotations by id
+
+    Raises:
+        DuplicateAnnotationError: if on_conflict is error and an id is defined more than once
+    """
+    options = options or BuildOptions()
+    cache = None
+    if options.cache_dir is not None:
+        cache = AnnotationCache(options.cache_dir, max_size=options.cache_max_size)
+    annotation_index, _ = build_unchecked_index(path, cache, options, profile=profile)
+    if cache is not None:
+        started = time.perf_counter()
+        cache.save()
+        if profile is not None:
+            profile.add("cache_save", time.perf_counter() - started)
+    annotation_index.check()
+    return annotation_index
+
+
+def build_unchecked_index(path: str, cache: Optional[AnnotationCache], options: BuildOptions,
+                          executor: Optional[Executor] = None,
+                          profile: Optional[Profile] = None) -> Tuple[AnnotationIndex, List[str]]:
+    """
+    The part of build_index that the batch, artifact, shard and serve builders share: they bring their own cache,
+    save it and check the index themselves
 
+    Args:
+        path: PATH to Great Expectations folder
+        cache: annotation cache consulted before parsing a file, and filled with the parsed files. Not saved. The cache
+            settings of options are left to the caller
+        options: how the files are found and parsed
+        executor: pool that parses the files instead of a pool of options.workers processes created for this call
+        profile: collects counts and timings of every stage, if given
+
+    Returns:
+        index of the annotations by id, and the path of every walked file in walk order. Its check() is left to the
+        caller, so the cache can be saved first. With a cache, every walked file has its digest in it
     """
     logger.info(f"working through path {path}")
     path = os.path.abspath(path)
-    directory_iter = _walk_directory(path)  # iterator(filepath of python file, ast object)
-    for filepath, ast_tree in directory_iter:
-        _walk_tree(filepath, ast_tree)
+    started = time.perf_counter()
+    filepaths = list(walk_directory(path, options.path_filter))
+    if profile is not None:
+        profile.add("walk_directory", time.perf_counter() - started, len(filepaths))
+    if cache is None:
+        annotation_lists = [None] * len(filepaths)
+    else:
+        started = time.perf_counter()
+        annotation_lists = [cache.lookup(filepath) for filepath in filepaths]
+        if profile is not None:
+            profile.add("cache_lookup", time.perf_counter() - started, len(filepaths))
+    missed = [index for index, annotation_list in enumerate(annotation_lists) if annotation_list is None]
+    if cache is None:
+        to_parse = missed
+    else:
+        # files with identical content (e.g. vendored copies) are parsed once
+        to_parse = []
+        seen_digests = set()
+        for index in missed:
+            digest = cache.digest(filepaths[index])
+            if digest not in seen_digests:
+                seen_digests.add(digest)
+                to_parse.append(index)
+    engine, memory_limits, read_ahead = options.engine, options.memory_limits, options.read_ahead
+    oversized = []
+    if memory_limits is not None:
+        limit = memory_limits.file_size_limit(engine)
+        if limit is not None:
+            sizes = {index: os.path.getsize(filepaths[index]) for index in to_parse}
+            oversized = [(index, sizes[index]) for index in to_parse if sizes[index] > limit]
+            to_parse = [index for index in to_parse if sizes[index] <= limit]
+        read_ahead = memory_limits.read_ahead(read_ahead, engine)
+    parsed_lists = extract_annotation_lists([filepaths[index] for index in to_parse], options.workers, executor,
+                                            profile, engine, read_ahead, options.read_threads)
+    skipped = 0
+    for index, annotation_list in zip(to_parse, parsed_lists):
+        if annotation_list is None:  # rejected by the pre-filter, no AST was built
+            skipped += 1
+            annotation_list = []
+        if cache is not None:
+            cache.store(filepaths[index], annotation_list)
+        annotation_lists[index] = annotation_list
+    if oversized:
+        started = time.perf_counter()
+        for index, size in oversized:
+            filepath = filepaths[index]
+            if memory_limits.oversize == "skip":
+                # not cached, so the file is parsed once the limit is raised
+                logger.warning(f"skipped {filepath}: {size} bytes is over the size limit of {limit} bytes")
+                annotation_lists[index] = []
+                continue
+            logger.info(f"scanning {filepath}: {size} bytes is over the size limit of {limit} bytes")
+            annotation_list = _scan_file_annotations(filepath) or []
+            if cache is not None:
+                cache.store(filepath, annotation_list)
+            annotation_lists[index] = annotation_list
+        if profile is not None:
+            profile.add(f"oversize_{memory_limits.oversize}", time.perf_counter() - started, len(oversized))
+    if cache is not None:
+        for index in missed:
+            if annotation_lists[index] is None:
+                # a skipped oversize file is not cached, and neither are the files with the same content
+                annotation_lists[index] = cache.lookup(filepaths[index]) or []
+    logger.info(f"pre-filter skipped {skipped} of {len(to_parse)} parsed files without Feature Maturity markers")
+    if profile is not None:
+        # the time of the pre-filter is in read_and_prefilter, this only counts the files it kept from ast_parse
+        profile.add("prefilter_skipped", 0.0, skipped)
+    annotation_index = AnnotationIndex(on_conflict=options.on_conflict)
+    for filepath, annotation_list in zip(filepaths, annotation_lists):
+        annotation_index.add(annotation_list, filepath)
+    return annotation_index, filepaths
+
+
+def merge(toc: Union[str, List[Dict]], index: Mapping) -> List[Dict]:
+    """
+    Merges annotations into a TOC. The TOC is not modified, so the same loaded TOC can be merged concurrently with
+    different indexes
+
+    Args:
+        toc: TOC file for Feature Maturity Grid annotations, or its loaded JSON
+        index: annotations by id, usually from build_index
+
+    Returns:
+        JSON that can be used as input for the Feature Maturity Grid
+    """
+    if isinstance(toc, str):
+        with open(toc) as json_file:
+            loaded_json = json.load(json_file)
+    else:
+        loaded_json = _copy_toc(toc)
+    return merge_toc(loaded_json, index)
 
 
-def _process_toc(in_json: str) -> Dict[str, str]:
+def extract_annotation_lists(filepaths: List[str], workers: Optional[int] = None, executor: Optional[Executor] = None,
+                             profile: Optional[Profile] = None, engine: str = "ast", read_ahead: int = 0,
+                             read_threads: int = DEFAULT_READ_THREADS) -> List[Optional[List[Dict]]]:
     """
-        Updates the TOC JSON file to include the annotations we have parsed from DataDocs
     Args:
-        in_json: TOC file for all Feature Maturity Grid annotations (passed in from build_annotations)
+        filepaths: .py files to parse (passed in from build_unchecked_index)
+        workers: number of processes used to parse files. None or 1 parses serially, 0 uses every CPU
+        executor: pool to parse the files in instead of creating one. workers is then only used to size the chunks
+        profile: collects the per-file timings, if given
+        engine: how docstrings are found, one of ENGINES
+        read_ahead: number of files read ahead of the parser by read_threads threads when parsing serially. 0 reads
+            each file when it is parsed. Worker processes always read their own files
+        read_threads: number of threads reading files ahead
 
     Returns:
-        dictionary that is the updated TOC JSON
+        one annotation list per file, in the same order as filepaths. None marks a file skipped by the pre-filter
     """
-    with open(in_json) as json_file:
-        loaded_json = json.load(json_file)
-        for title in loaded_json:
-            for section_features in title["section_features"]:
-                all_cases = section_features["cases"]
-                for index in range(len(all_cases)):
-                    if all_cases[index]["id"] in full_annotation.keys():
-                        all_cases[index] = full_annotation[all_cases[index]["id"]]
-                section_features["cases"] = all_cases
+    started = time.perf_counter()
+    extract = extract_file_annotations if profile is None else _extract_file_annotations_profiled
+    if engine != "ast":
+        extract = functools.partial(extract, engine=engine)
+    if workers == 0:
+        workers = os.cpu_count()
+    if (executor is None and (workers is None or workers <= 1)) or len(filepaths) <= 1:
+        if read_ahead > 0 and len(filepaths) > 1:
+            results = _extract_prefetched_annotations(filepaths, read_ahead, read_threads, profile is not None, engine)
+        else:
+            results = [extract(filepath) for filepath in filepaths]
+    else:
+        # executor.map yields results in input order, so the merge sees files in the same
+        # (sorted) order as the serial run and the output is identical
+        chunksize = max(1, len(filepaths) // ((workers or 1) * 4))
+        if executor is not None:
+            results = list(executor.map(extract, filepaths, chunksize=chunksize))
+        else:
+            from concurrent.futures import ProcessPoolExecutor  # multiprocessing is only imported when a pool is used
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(extract, filepaths, chunksize=chunksize))
+    if profile is None:
+        return results
+    profile.add("extract_annotations", time.perf_counter() - started, len(filepaths))
+    for filepath, (_, timings) in zip(filepaths, results):
+        profile.add_file(filepath, timings)
+    return [annotation_list for annotation_list, _ in results]
+
+
+def merge_report(loaded_tocs: Dict[str, List[Dict]], annotations: Mapping) -> TocMergeReport:
+    """
+    Args:
+        loaded_tocs: loaded TOC JSON by TOC file name
+        annotations: annotations by id
+
+    Returns:
+        the report of ids that do not match between the TOCs and the annotations
+    """
+    return _merge_report({name: index_toc(loaded_json) for name, loaded_json in loaded_tocs.items()}, annotations)
+
+
+def _merge_report(toc_indexes: Dict[str, Dict[str, List[Tuple[int, int, int]]]], annotations: Mapping) -> TocMergeReport:
+    toc_ids = set()
+    unmatched_toc_ids = {}
+    duplicate_toc_ids = {}
+    for name, toc_index in toc_indexes.items():
+        toc_ids.update(toc_index)
+        unmatched_toc_ids[name] = sorted(case_id for case_id in toc_index if case_id not in annotations)
+        duplicate_toc_ids[name] = sorted(case_id for case_id, positions in toc_index.items() if len(positions) > 1)
+    orphan_annotation_ids = sorted(annotation_id for annotation_id in annotations if annotation_id not in toc_ids)
+    return TocMergeReport(unmatched_toc_ids, orphan_annotation_ids, duplicate_toc_ids)
+
+
+def index_toc(loaded_json: List[Dict]) -> Dict[str, List[Tuple[int, int, int]]]:
+    """
+        Indexes the cases of a TOC by id. Building the index is one pass over the TOC, and the index can be reused to
+        merge any number of annotation sets into the same TOC
+    Args:
+        loaded_json: loaded TOC JSON
+
+    Returns:
+        positions (section index, feature index, case index) of every case, by case id
+    """
+    toc_index = {}
+    for section_index, title in enumerate(loaded_json):
+        for feature_index, section_features in enumerate(title["section_features"]):
+            for case_index, case in enumerate(section_features["cases"]):
+                toc_index.setdefault(case["id"], []).append((section_index, feature_index, case_index))
+    return toc_index
+
+
+def merge_toc(loaded_json: List[Dict], annotations: Mapping,
+              toc_index: Optional[Dict[str, List[Tuple[int, int, int]]]] = None) -> List[Dict]:
+    """
+        Replaces every TOC case that has an annotation with that annotation
+    Args:
+        loaded_json: loaded TOC JSON, modified in place
+        annotations: annotations by id
+        toc_index: index of loaded_json from index_toc, built if not given
+
+    Returns:
+        the updated TOC JSON
+    """
+    if toc_index is None:
+        toc_index = index_toc(loaded_json)
+    for case_id, positions in toc_index.items():
+        annotation = annotations.get(case_id)
+        if annotation is None:
+            continue
+        if isinstance(annotation, FeatureAnnotation):
+            annotation = annotation.to_dict()
+        for section_index, feature_index, case_index in positions:
+            loaded_json[section_index]["section_features"][feature_index]["cases"][case_index] = annotation
     return loaded_json
 
 
-def _walk_directory(path: str) -> Iterator[ast.AST]:
+def _copy_toc(loaded_json: List[Dict]) -> List[Dict]:
     """
-    Does an os.walk through the input PATH to read all .py files and load them as abstract syntax tree (AST) objects, which can be parsed
+        Copies the containers of a TOC down to the case lists, which is all that merge_toc modifies
+    Args:
+        loaded_json: loaded TOC JSON
+
+    Returns:
+        copy of loaded_json that shares the case dicts
+    """
+    return [
+        {**title, "section_features": [{**section_features, "cases": list(section_features["cases"])}
+                                       for section_features in title["section_features"]]}
+        for title in loaded_json
+    ]
+
+
+def walk_directory(path: str, path_filter: Optional[PathFilter] = None) -> Iterator[str]:
+    """
+    Walks the input PATH with os.scandir to find all .py files. Directories and files are visited in sorted order so
+    that the result does not depend on the filesystem, and excluded directories are not descended into
     Args:
         path: path of great_expectations folder
+        path_filter: which directories and files to walk. None uses the default excludes and .gitignore files
 
     Returns:
-        Iterator of resulting AST objects
+        Iterator of paths to .py files
     """
     logger.info(f"Beginning to parse path {path}")
-    for root, dirs, files in os.walk(path):
-        for file in files:
-            if not file.endswith(".py"):
-                logger.info(f"skipping file {file}")
-                continue
-            filepath = os.path.join(root, file)
-            with open(filepath, 'r') as srcfile:
-                logger.info(f"parsing file {file}")
-                yield os.path.relpath(filepath, path), ast.parse(srcfile.read())
+    return (path_filter or PathFilter()).walk(path)
+
+
+def walk_order_key(relpath: str) -> List[Tuple[int, str]]:
+    """
+    Args:
+        relpath: path of a file relative to the PATH it was walked from
+
+    Returns:
+        sort key that puts paths in the order walk_directory yields them: the files of a directory, sorted, before its
+        sorted subdirectories
+    """
+    parts = relpath.split(os.sep)
+    return [(1, part) for part in parts[:-1]] + [(0, parts[-1])]
+
+
+def extract_file_annotations(filepath: str, timings: Optional[Dict[str, float]] = None,
+                             engine: str = "ast") -> Optional[List[Dict]]:
+    """
+    Reads a single .py file, loads it as an abstract syntax tree (AST) object and extracts its annotations. This is the
+    unit of work that is handed to worker processes, so it must not touch module-level state
+
+    The raw bytes are scanned for the Feature Maturity markers first, and the AST is only built for files that contain
+    them. Files are memory-mapped so that the scan of a file that gets skipped does not copy it into a string. With the
+    tokenize engine no AST is built at all: the docstrings are picked out of the token stream
+
+    Args:
+        filepath: path to .py file (passed in from extract_annotation_lists)
+        timings: filled in with the size of the file and the time spent in each stage, if given
+        engine: how docstrings are found, one of ENGINES
+
+    Returns:
+        list of annotation dictionaries, in the order they were found in the file. None if the file was skipped
+    """
+    with open(filepath, 'rb') as srcfile:
+        size = os.fstat(srcfile.fileno()).st_size
+        if timings is not None:
+            timings["bytes"] = size
+        if size == 0:  # empty files cannot be memory-mapped
+            return None
+        with mmap.mmap(srcfile.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            return _extract_source_annotations(source, filepath, timings, engine)
+
+
+def _extract_source_annotations(source: Union[bytes, mmap.mmap], filepath: str,
+                                timings: Optional[Dict[str, float]] = None, engine: str = "ast") -> Optional[List[Dict]]:
+    """
+    Args:
+        source: raw bytes of a .py file, memory-mapped or already read (passed in from extract_file_annotations or
+            _extract_prefetched_annotations)
+        filepath: path to the .py file, for logging
+        timings: filled in with the time spent in each stage, if given
+        engine: how docstrings are found, one of ENGINES
+
+    Returns:
+        list of annotation dictionaries, in the order they were found in the file. None if the file was skipped
+    """
+    started = time.perf_counter()
+    has_markers = _has_feature_maturity_markers(source)
+    if timings is not None:
+        timings["read_and_prefilter"] = time.perf_counter() - started
+    if not has_markers:
+        return None
+    logger.debug("parsing file %s", filepath)
+    if engine == "tokenize":
+        if timings is None:
+            return _parse_docstrings(scan_docstrings(source[:]))
+        started = time.perf_counter()
+        docstrings = scan_docstrings(source[:])
+        timings["scan_docstrings"] = time.perf_counter() - started
+        return _parse_docstrings(docstrings, timings)
+    if timings is None:
+        return _walk_tree(ast.parse(source[:]))
+    started = time.perf_counter()
+    tree = ast.parse(source[:])
+    timings["ast_parse"] = time.perf_counter() - started
+    started = time.perf_counter()
+    annotation_list = _walk_tree(tree, timings)
+    timings["walk_tree"] = time.perf_counter() - started
+    return annotation_list
+
+
+def _extract_file_annotations_profiled(filepath: str,
+                                       engine: str = "ast") -> Tuple[Optional[List[Dict]], Dict[str, float]]:
+    """
+    extract_file_annotations with per-file timings, used instead of it when profiling
+
+    Args:
+        filepath: path to .py file (passed in from extract_annotation_lists)
+        engine: how docstrings are found, one of ENGINES
+
+    Returns:
+        the annotation list, and the size of the file and time spent in each stage
+    """
+    timings = {}
+    started = time.perf_counter()
+    annotation_list = extract_file_annotations(filepath, timings, engine)
+    timings["total"] = time.perf_counter() - started
+    return annotation_list, timings
+
+
+def _scan_file_annotations(filepath: str) -> Optional[List[Dict]]:
+    """
+    Extracts the annotations of a file over the size limit of MemoryLimits without holding it in memory: the file is
+    searched for the markers in chunks, and its docstrings are found by the tokenize scanner reading it one line at a
+    time. Only the current chunk or line, and the docstrings, are held, whatever the size of the file
+
+    Args:
+        filepath: path to .py file (passed in from build_unchecked_index)
+
+    Returns:
+        list of annotation dictionaries, in the order they were found in the file. None if the file was skipped by
+        the pre-filter
+    """
+    with open(filepath, 'rb') as srcfile:
+        if not _file_has_feature_maturity_markers(srcfile):
+            return None
+        srcfile.seek(0)
+        logger.debug("scanning file %s", filepath)
+        return _parse_docstrings(scan_docstrings(srcfile))
+
+
+def _extract_prefetched_annotations(filepaths: List[str], read_ahead: int, read_threads: int, profiled: bool = False,
+                                    engine: str = "ast") -> List:
+    """
+    Parses the files in this process while a pool of threads reads the next ones, so the parser does not wait on the
+    filesystem for every file
+
+    Args:
+        filepaths: .py files to parse (passed in from extract_annotation_lists)
+        read_ahead: maximum number of files read ahead of the parser
+        read_threads: number of threads reading files
+        profiled: whether to return the per-file timings with each annotation list, as _extract_file_annotations_profiled
+        engine: how docstrings are found, one of ENGINES
+
+    Returns:
+        one result per file, in the same order as filepaths
+    """
+    sources = prefetch_files(filepaths, read_ahead, read_threads)
+    results = []
+    for filepath in filepaths:
+        if not profiled:
+            results.append(_extract_source_annotations(next(sources), filepath, engine=engine))
+            continue
+        started = time.perf_counter()
+        source = next(sources)
+        timings = {"read_wait": time.perf_counter() - started, "bytes": len(source)}
+        annotation_list = _extract_source_annotations(source, filepath, timings, engine)
+        del source  # not held while the next file is waited for
+        timings["total"] = time.perf_counter() - started
+        results.append((annotation_list, timings))
+    return results
+
+
+def _has_feature_maturity_markers(source: Union[bytes, mmap.mmap]) -> bool:
+    """
+    Cheap test of whether a file can contain annotations. Every annotation block has both markers, so a file without them
+    cannot contribute to the grid
+
+    Args:
+        source: raw bytes of a .py file (passed in from extract_file_annotations)
+
+    Returns:
+        True if the file has to be parsed
+    """
+    return all(source.find(marker) != -1 for marker in FEATURE_MATURITY_MARKERS)
 
 
-def _walk_tree(tree: ast.AST) -> None:
+def _file_has_feature_maturity_markers(srcfile: BinaryIO) -> bool:
+    """
+    _has_feature_maturity_markers for a file too large to map or read at once
+
+    Args:
+        srcfile: .py file opened in binary mode, read from its current position in chunks of MARKER_SCAN_CHUNK_SIZE
+
+    Returns:
+        True if the file has to be parsed
+    """
+    missing = list(FEATURE_MATURITY_MARKERS)
+    overlap = max(len(marker) for marker in FEATURE_MATURITY_MARKERS) - 1  # a marker can span two chunks
+    tail = b""
+    for chunk in iter(lambda: srcfile.read(MARKER_SCAN_CHUNK_SIZE), b""):
+        window = tail + chunk
+        missing = [marker for marker in missing if window.find(marker) == -1]
+        if not missing:
+            return True
+        tail = window[-overlap:]
+    return False
+
+
+def _walk_tree(tree: ast.AST, timings: Optional[Dict[str, float]] = None) -> List[Dict]:
     """
 
     Args:
         tree: ast.AST tree for each .py file in Great Expectations directory
+        timings: accumulates the time spent in _parse_feature_annotation and the number of docstrings, if given
 
     Returns:
-        None: modifies global full_annotation dict directly.
+        list of annotation dictionaries found in module, class and function docstrings
     """
-    annotation_list = None
+    return _parse_docstrings(_tree_docstrings(tree), timings)
+
+
+def _tree_docstrings(tree: ast.AST) -> Iterator[Tuple[Optional[str], Optional[int], Optional[str]]]:
+    """
+    Args:
+        tree: ast.AST tree of a .py file (passed in from _walk_tree)
+
+    Returns:
+        the docstring of every module, class and function node, the line it starts on and the dotted names of the node
+        and the classes and functions it is in (None for the module), in ast.walk order. (None, None, None) for a node
+        without a docstring
+    """
+    scopes = {}
+    _definition_scopes(tree.body, None, scopes)
     for node in ast.walk(tree):
-        if not isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef)):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            docstring = ast.get_docstring(node)
+            if docstring is None:
+                yield None, None, None
+            else:
+                literal = node.body[0].value
+                yield docstring, first_line(literal.value, literal.lineno), scopes.get(node)
+
+
+def _definition_scopes(body: List[ast.stmt], scope: Optional[str], scopes: Dict[ast.AST, str]) -> None:
+    """
+    Fills in the dotted names of every class and function defined in body. Only statements are visited, since
+    definitions cannot be nested in expressions, which is much cheaper than walking every node of the tree
+
+    Args:
+        body: statements of a block
+        scope: dotted names of the class or function the block is in, None at module level
+        scopes: class and function nodes -> their dotted names, filled in place
+    """
+    for node in body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            node_scope = scopes[node] = f"{scope}.{node.name}" if scope is not None else node.name
+            _definition_scopes(node.body, node_scope, scopes)
             continue
-        annotation_list = _parse_feature_annotation(ast.get_docstring(node))
-        if annotation_list is not None:
-            for annotation in annotation_list:
-                # key is annotation["id"] and
-                full_annotation[annotation["id"]] = annotation
+        for field in _STATEMENT_BLOCKS:
+            block = getattr(node, field, None)
+            if block:
+                _definition_scopes(block, scope, scopes)
+        for handler in getattr(node, "handlers", None) or getattr(node, "cases", None) or ():
+            _definition_scopes(handler.body, scope, scopes)
+
+
+def _parse_docstrings(docstrings: Iterable[Tuple[Optional[str], Optional[int], Optional[str]]],
+                      timings: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """
 
+    Args:
+        docstrings: (docstring, line it starts on, scope) of a file, None for a node without a docstring (passed in from
+            _walk_tree or scan_docstrings)
+        timings: accumulates the time spent in _parse_feature_annotation and the number of docstrings, if given
+
+    Returns:
+        list of annotation dictionaries found in the docstrings, in order
+    """
+    annotations = []
+    if timings is not None:
+        timings.setdefault("parse_feature_annotation", 0.0)
+        timings.setdefault("docstrings", 0)
+    for docstring, line, scope in docstrings:
+        if timings is None:
+            annotation_list = _parse_feature_annotation(docstring, line, scope)
+        else:
+            started = time.perf_counter()
+            annotation_list = _parse_feature_annotation(docstring, line, scope)
+            timings["parse_feature_annotation"] += time.perf_counter() - started
+            timings["docstrings"] += 1
+        if annotation_list is not None:
+            annotations.extend(annotation_list)
+    return annotations
 
 
-def _parse_feature_annotation(docstring: Union[str, List[str], None]) -> List[Type[Dict[any, any]]]:
+def _parse_feature_annotation(docstring: Union[str, None], first_line: Optional[int] = None,
+                              scope: Optional[str] = None) -> Optional[List[Dict]]:
     """
+    Parses the annotation blocks of a docstring with _parse_annotation_blocks and keeps each of them as a
+    FeatureAnnotation record
 
     Args:
         docstring: docstring object that is parsed from ast.get_docstring(node) (passed in from _walk_tree method)
+        first_line: line of the source file the docstring starts on, from which the line of each block is counted
+        scope: dotted names of the class or function the docstring belongs to, None for the module docstring
 
     Returns:
-        list_of_annotations: list of dictionaries that contain one annotation per dictionay
+        list_of_annotations: list of FeatureAnnotation records, one per annotation block
     """
-
-    list_of_annotations = []
-    id_val = ""
     if docstring is None:
-        return
-    if isinstance(docstring, str):
-        for matches in re.findall(annotation_regex_compiled, docstring):
-            annotation_dict = Dict[str, str] # create new dictionary for each match
-            maturity_details_dict = Dict[str, str]
-            for matched_line in matches:
-                # split matched line_fields
-                matched_line_fields = matched_line.split(":")
-                this_key = matched_line_fields[0].strip()
-                this_val = matched_line_fields[1].strip()
-
-                if this_key == "id":
-                    id_val = this_val
-
-                if this_key in maturity_details_keys:
-                    maturity_details_dict[this_key] = this_val
-                elif this_key == "icon": # icon is a special case
-                    if this_val is "":
-                        annotation_dict[this_key] = f"https://great-expectations-web-assets.s3.us-east-2.amazonaws.com/feature_maturity_icons/{id_val}.png"
-                    else:
-                        annotation_dict[this_key] = this_val
-                else:
-                    annotation_dict[this_key] = this_val
+        return None
+    if first_line is None:
+        return [FeatureAnnotation(fields, None, scope) for _, fields in _parse_annotation_blocks(docstring)]
+    return [FeatureAnnotation(fields, first_line + line_offset, scope)
+            for line_offset, fields in _parse_annotation_blocks(docstring)]
+
+
+def _parse_annotation_blocks(docstring: str) -> List[Tuple[int, Dict]]:
+    """
+    Single pass over the lines of a docstring. An annotation block starts at an "id:" line and continues over
+    "key: value" lines until a blank line, a line that is not a field, or the next "id:" line. Fields can come in any
+    order and unknown fields are kept. Maturity detail fields, and any field indented under "maturity_details:", are
+    collected into the nested maturity_details dict. A line indented deeper than the field above it continues that
+    field's value
 
-            annotation_dict["maturity_details"] = maturity_details_dict
-            if annotation_dict is not None:
-                list_of_annotations.append(annotation_dict)
+    Args:
+        docstring: docstring object that is parsed from ast.get_docstring(node)
+
+    Returns:
+        blocks: (line offset in the docstring, fields as a plain dict) of each annotation block
+    """
+    blocks = []
+    if "id:" not in docstring:
+        return blocks
+    annotation_dict = None
+    maturity_details_dict = None
+    block_offset = 0  # line of the docstring the open block starts on
+    details_indent = -1  # indentation of the "maturity_details:" line of the open block, -1 if there is none
+    last_fields = None  # dict that received the previous field
+    last_key = None
+    last_indent = 0
+    for line_offset, line in enumerate(docstring.splitlines()):
+        if annotation_dict is None:
+            if "id:" not in line:  # outside of a block only an "id:" line matters
+                continue
+            field_line = line.lstrip()
+            this_key, _, this_val = field_line.partition(":")
+            if this_key != "id":
+                continue
+            indent = len(line) - len(field_line)
+        else:
+            field_line = line.lstrip()
+            if not field_line:
+                _finish_annotation(annotation_dict, maturity_details_dict, blocks, block_offset)
+                annotation_dict = None
+                continue
+            indent = len(line) - len(field_line)
+            this_key, separator, this_val = field_line.partition(":")
+            if indent > last_indent and last_key != "maturity_details" and (this_key != "id" or not separator):
+                # continuation line of a wrapped value
+                last_fields[last_key] = f"{last_fields[last_key]} {field_line.rstrip()}".lstrip()
+                continue
+            if separator and this_key != "id" and this_key.isidentifier():
+                if this_key == "maturity_details":
+                    annotation_dict[this_key] = maturity_details_dict
+                    details_indent = indent
+                    last_fields = annotation_dict
+                elif this_key in MATURITY_DETAILS_FIELDS or indent > details_indent >= 0:
+                    maturity_details_dict[this_key] = this_val.strip()
+                    last_fields = maturity_details_dict
+                else:
+                    annotation_dict[this_key] = this_val.strip()
+                    last_fields = annotation_dict
+                last_key = this_key
+                last_indent = indent
+                continue
+            # a line that is not a field, or the next "id:" line, ends the block
+            _finish_annotation(annotation_dict, maturity_details_dict, blocks, block_offset)
+            annotation_dict = None
+            if this_key != "id" or not separator:
+                continue
+        annotation_dict = {"id": this_val.strip()}  # create new dictionary for each block
+        maturity_details_dict = {}
+        block_offset = line_offset
+        details_indent = -1
+        last_fields = annotation_dict
+        last_key = "id"
+        last_indent = indent
+    _finish_annotation(annotation_dict, maturity_details_dict, blocks, block_offset)
+    return blocks
+
+
+def _finish_annotation(annotation_dict: Optional[Dict], maturity_details_dict: Dict, blocks: List[Tuple[int, Dict]],
+                       line_offset: int) -> None:
+    """
+    Closes the annotation block that _parse_annotation_blocks is collecting and keeps it if it is an annotation
 
-    return list_of_annotations
+    Args:
+        annotation_dict: fields of the block, None if no block is open
+        maturity_details_dict: maturity detail fields of the block
+        blocks: annotation blocks of the docstring, appended to in place
+        line_offset: line of the docstring the block starts on
+    """
+    if annotation_dict is None:
+        return
+    # loose maturity detail fields are not enough: the pre-filter only passes files that contain "maturity", so a block
+    # without a maturity or maturity_details field would be kept or not depending on the rest of its file
+    if not any(field in annotation_dict for field in REQUIRED_ANNOTATION_FIELDS):
+        return
+    if annotation_dict.get("icon") == "":  # icon is a special case
+        annotation_dict["icon"] = ICON_URL_TEMPLATE.format(id=annotation_dict["id"])
+    annotation_dict.setdefault("maturity_details", maturity_details_dict)
+    blocks.append((line_offset, annotation_dict))
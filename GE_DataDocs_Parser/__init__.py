@@ -1,2 +1,46 @@
-# the only entrypoint into the script
-from .GE_DataDocs_Parser import build_annotations
+# keep in step with the version in setup.py
+__version__ = "0.0.1"
+
+# The names below are imported on first use, so importing the package (which GE_parse does before it parses its
+# arguments) does not load the parser. Module name of each public name:
+_exports = {
+    # the only entrypoint into the script
+    "build_annotations": "GE_DataDocs_Parser",
+    # reentrant API: build an index once, merge it into any number of TOCs
+    "AnnotationIndex": "GE_DataDocs_Parser",
+    "BuildOptions": "GE_DataDocs_Parser",
+    "build_index": "GE_DataDocs_Parser",
+    "merge": "GE_DataDocs_Parser",
+    # where each annotation was defined, and the ids defined more than once
+    "Provenance": "GE_DataDocs_Parser",
+    "Conflict": "GE_DataDocs_Parser",
+    "DuplicateAnnotationError": "GE_DataDocs_Parser",
+    # annotations are read-only records, converted to dicts when the grid is written
+    "FeatureAnnotation": "records",
+    "MaturityDetails": "records",
+    # checks of the extracted annotations, located by file and line
+    "ValidationError": "validation",
+    "validate_index": "validation",
+    # annotation index files, merged into TOCs without the sources
+    "build_artifact": "artifact",
+    "load_artifact": "artifact",
+    # a tree parsed in shards by separate processes or hosts, merged back into one index
+    "build_shard": "shard",
+    "reduce_shards": "shard",
+}
+
+__all__ = ["__version__", *_exports]
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(f"{__name__}.{_exports[name]}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
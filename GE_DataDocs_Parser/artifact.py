@@ -0,0 +1,205 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import __version__
+from .GE_DataDocs_Parser import AnnotationIndex, BuildOptions, Provenance, build_unchecked_index
+from .cache import AnnotationCache
+from .profiling import Profile
+from .records import FeatureAnnotation, to_json
+
+# first bytes of every index artifact
+ARTIFACT_MAGIC = b"GEANNIDX"
+
+# bump whenever the layout of the artifact changes
+ARTIFACT_VERSION = 2
+
+# magic, layout version and length of the JSON header, which is followed by the header and the data section
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def build_artifact(path: str, artifact_path: str,
+                   options: Optional[BuildOptions] = None) -> Tuple[AnnotationIndex, Dict]:
+    """
+    Extracts the annotations of every .py file under path, like build_index, and writes them to an artifact
+
+    Args:
+        path: PATH to Great Expectations folder
+        artifact_path: file to write the artifact to
+        options: how the files are found and parsed. None uses the defaults of BuildOptions
+
+    Returns:
+        the index, and the metadata written to the artifact
+
+    Raises:
+        DuplicateAnnotationError: if options.on_conflict is error and an id is defined more than once. No artifact is
+            written
+    """
+    options = options or BuildOptions()
+    index, digests = build_hashed_index(path, options)
+    metadata = {"engine": options.engine, "files": len(digests), "source_hash": source_hash(path, digests)}
+    write_artifact(index, path, artifact_path, metadata)
+    return index, metadata
+
+
+def build_hashed_index(path: str, options: Optional[BuildOptions] = None,
+                       profile: Optional[Profile] = None) -> Tuple[AnnotationIndex, List[Tuple[str, str]]]:
+    """
+    build_index that also returns the content hash of every file it walked, for source_hash
+
+    Args:
+        path: PATH to Great Expectations folder
+        options: how the files are found and parsed. Without a cache_dir, the cache that hashes the files is kept in
+            memory for this call only
+        profile: collects counts and timings of every stage, if given
+
+    Returns:
+        the index, and (path, content hash) of every walked file in walk order
+    """
+    options = options or BuildOptions()
+    if options.workers == 0:
+        options = options._replace(workers=os.cpu_count())
+    # the cache hashes the content of every file it looks up, which is what the source hash is made of
+    cache = AnnotationCache(options.cache_dir, max_size=options.cache_max_size)
+    # the digests are those of the files this walk looked up, so a file added since is not hashed without being parsed
+    index, filepaths = build_unchecked_index(path, cache, options, profile=profile)
+    cache.save()
+    index.check()
+    return index, [(filepath, cache.digest(filepath)) for filepath in filepaths]
+
+
+def source_hash(root: Optional[str], digests: Iterable[Tuple[str, str]]) -> str:
+    """
+    Args:
+        root: PATH the files were walked from. None if the paths are relative to it already, with / separators
+        digests: (path, content hash) of every file that was walked, in walk order
+
+    Returns:
+        hash of the relative paths and contents of all files, which changes when any file is added, removed or edited
+    """
+    root = os.path.abspath(root) if root is not None else None
+    hasher = hashlib.blake2b(digest_size=16)
+    for filepath, digest in digests:
+        relpath = os.path.relpath(filepath, root).replace(os.sep, "/") if root is not None else filepath
+        hasher.update(f"{relpath}\0{digest}\n".encode())
+    return hasher.hexdigest()
+
+
+def write_artifact(index: AnnotationIndex, root: Optional[str], artifact_path: str,
+                   metadata: Optional[Dict] = None) -> None:
+    """
+    Atomically writes the annotations of an index to a binary artifact that load_artifact maps back without parsing
+    any source. The artifact is the same for the same annotations and metadata, so it can be checked in or cached
+
+    Args:
+        index: index from build_index
+        root: PATH the index was built from. Sources are stored relative to it. None if the sources of the index are
+            relative paths already
+        artifact_path: file to write
+        metadata: JSON-serializable details of the build, e.g. the source hash, stored in the header
+    """
+    root = os.path.abspath(root) if root is not None else None
+    records = []
+    for annotation_id, annotation in index.items():
+        relpath = index.source(annotation_id)
+        if relpath is not None and root is not None:
+            relpath = os.path.relpath(relpath, root).replace(os.sep, "/")
+        records.append(json.dumps([relpath, getattr(annotation, "line", None), getattr(annotation, "scope", None),
+                                   annotation], separators=(",", ":"), default=to_json).encode())
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    header = json.dumps({"parser_version": __version__, **(metadata or {}), "ids": list(index), "offsets": offsets},
+                        separators=(",", ":")).encode()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(artifact_path)), suffix=".tmp")
+    with os.fdopen(fd, "wb") as artifact_file:
+        artifact_file.write(_PREAMBLE.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, len(header)))
+        artifact_file.write(header)
+        for record in records:
+            artifact_file.write(record)
+    os.chmod(tmp_path, 0o644)  # mkstemp creates the file private to its owner, but the artifact is meant to be shared
+    os.replace(tmp_path, artifact_path)
+
+
+class ArtifactIndex(Mapping):
+    """
+    Annotations by id, read from an artifact written by write_artifact. The file is memory-mapped and only its header is
+    decoded up front; an annotation is decoded the first time it is looked up, so a merge only pays for the cases of its
+    TOC
+    """
+
+    def __init__(self, artifact_path: str):
+        with open(artifact_path, "rb") as artifact_file:
+            if os.fstat(artifact_file.fileno()).st_size < _PREAMBLE.size:
+                raise ValueError(f"{artifact_path} is not an annotation index, write one with GE_parse index")
+            self._data = mmap.mmap(artifact_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_size = _PREAMBLE.unpack_from(self._data)
+        if magic != ARTIFACT_MAGIC:
+            raise ValueError(f"{artifact_path} is not an annotation index, write one with GE_parse index")
+        if version != ARTIFACT_VERSION:
+            raise ValueError(f"{artifact_path} was written by another version, write it again with GE_parse index")
+        header = json.loads(self._data[_PREAMBLE.size:_PREAMBLE.size + header_size])
+        self._data_start = _PREAMBLE.size + header_size
+        self._offsets: List[int] = header.pop("offsets")
+        self._positions: Dict[str, int] = {annotation_id: position
+                                           for position, annotation_id in enumerate(header.pop("ids"))}
+        self._decoded: Dict[str, Tuple[Optional[str], FeatureAnnotation]] = {}  # id -> (relpath, annotation)
+        self.metadata: Dict = header
+
+    def source(self, annotation_id: str) -> Optional[str]:
+        """
+        Returns:
+            path, relative to the PATH the artifact was built from, of the file the annotation was found in
+        """
+        return self._decode(annotation_id)[0]
+
+    def provenance(self, annotation_id: str) -> Provenance:
+        """
+        Returns:
+            file, relative to the PATH the artifact was built from, line and scope of the annotation
+        """
+        relpath, annotation = self._decode(annotation_id)
+        return Provenance(relpath, annotation.line, annotation.scope)
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __getitem__(self, annotation_id: str) -> FeatureAnnotation:
+        return self._decode(annotation_id)[1]
+
+    def __contains__(self, annotation_id) -> bool:
+        return annotation_id in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _decode(self, annotation_id: str) -> Tuple[Optional[str], FeatureAnnotation]:
+        decoded = self._decoded.get(annotation_id)
+        if decoded is None:
+            position = self._positions[annotation_id]
+            start, end = self._offsets[position], self._offsets[position + 1]
+            relpath, line, scope, fields = json.loads(self._data[self._data_start + start:self._data_start + end])
+            decoded = self._decoded[annotation_id] = (relpath, FeatureAnnotation(fields, line, scope))
+        return decoded
+
+
+def load_artifact(artifact_path: str) -> ArtifactIndex:
+    """
+    Args:
+        artifact_path: file written by write_artifact
+
+    Returns:
+        the annotations of the artifact by id, with its metadata
+
+    Raises:
+        ValueError: if the file is not an artifact, or was written with another layout
+    """
+    return ArtifactIndex(artifact_path)
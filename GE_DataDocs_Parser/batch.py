@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import time
+from typing import Iterator, List, NamedTuple, Optional
+
+from .GE_DataDocs_Parser import BuildOptions, build_unchecked_index
+from .cache import AnnotationCache
+from .output import write_grid
+
+logger = logging.getLogger(__name__)
+
+
+class BatchJob(NamedTuple):
+    """
+    One entry of a batch manifest: parse path, merge into the TOC in injson and write the grid to out
+    """
+    path: str
+    injson: str
+    out: str
+
+
+class BatchJobResult(NamedTuple):
+    job: BatchJob
+    annotations: int  # number of annotations found under job.path
+    seconds: float  # wall-clock time of the job, parse and write
+
+
+def load_manifest(manifest: str) -> List[BatchJob]:
+    """
+    Args:
+        manifest: JSON file with a list of {"path": ..., "injson": ..., "out": ...} objects. Relative paths are relative
+            to the directory of the manifest
+
+    Returns:
+        the jobs of the manifest, in order
+
+    Raises:
+        ValueError: if the manifest is not a JSON list of jobs with every field, or the path of a job is not a directory
+            or its injson not a file. Checked before any job runs, as parse checks its arguments
+    """
+    with open(manifest) as manifest_file:
+        try:
+            entries = json.load(manifest_file)
+        except ValueError as e:
+            raise ValueError(f"{manifest} is not JSON: {e}")
+    if not isinstance(entries, list):
+        raise ValueError(f"{manifest} is not a list of jobs")
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    jobs = []
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"{manifest}: job {position} is not an object")
+        missing = [field for field in BatchJob._fields if not isinstance(entry.get(field), str)]
+        if missing:
+            raise ValueError(f"{manifest}: job {position} is missing {', '.join(missing)}")
+        job = BatchJob(*(os.path.join(base_dir, entry[field]) for field in BatchJob._fields))
+        if not os.path.isdir(job.path):
+            raise ValueError(f"{manifest}: path {job.path} of job {position} is not a directory")
+        if not os.path.isfile(job.injson):
+            raise ValueError(f"{manifest}: injson {job.injson} of job {position} is not a file")
+        jobs.append(job)
+    return jobs
+
+
+def run_batch(jobs: List[BatchJob], options: Optional[BuildOptions] = None) -> Iterator[BatchJobResult]:
+    """
+    Runs the jobs one after the other in this process, with one worker pool and one annotation cache for all of them.
+    The cache is keyed by file content, so a file that is vendored into several trees is parsed once per batch
+
+    Args:
+        jobs: the jobs to run
+        options: how the files under each job's path are found and parsed. None uses the defaults of BuildOptions.
+            Without a cache_dir the cache is kept in memory for this batch only
+
+    Returns:
+        Iterator of the result of each job, yielded as soon as the job is done
+    """
+    options = options or BuildOptions()
+    workers = os.cpu_count() if options.workers == 0 else options.workers
+    cache = AnnotationCache(options.cache_dir, max_size=options.cache_max_size)
+    executor = None
+    if workers is not None and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor  # multiprocessing is only imported when a pool is used
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for job in jobs:
+            started = time.perf_counter()
+            index, _ = build_unchecked_index(job.path, cache, options, executor=executor)
+            with open(job.injson) as json_file:
+                loaded_json = json.load(json_file)
+            out_dir = os.path.dirname(job.out)
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+            with open(job.out, "w") as outfile:
+                write_grid(loaded_json, index, outfile)
+            yield BatchJobResult(job, len(index), time.perf_counter() - started)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        cache.save()
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .defaults import DEFAULT_MAX_SIZE
+from .records import FeatureAnnotation, dump_records, load_records
+
+logger = logging.getLogger(__name__)
+
+# bump whenever the shape of the extracted annotations changes, so stale caches are discarded instead of reused
+CACHE_VERSION = 6
+
+CACHE_FILENAME = "annotations-cache.json"
+
+# bytes of JSON that an entry takes besides its digest, size and annotations: brackets and separators
+ENTRY_OVERHEAD = 10
+
+# files are hashed in chunks of this many bytes, so hashing a huge file does not read all of it into memory
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class AnnotationCache:
+    """
+    Persistent cache of the annotation list extracted from each .py file.
+
+    Files are first matched on (path, mtime, size). If that fails the file content is hashed, so a file that was touched
+    or checked out again without changing is still a hit. Entries are keyed by content hash and kept in least-recently-used
+    order; the oldest ones are evicted on save until the cache file, with the file records that point at the entries,
+    fits in max_size bytes.
+
+    Without a cache_dir the cache lives in memory only, which still lets identical files in several trees that are
+    parsed by one process (e.g. vendored copies) be parsed once.
+    """
+
+    def __init__(self, cache_dir: Optional[str], max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._files: Dict[str, List] = {}  # filepath -> [mtime_ns, size, digest]
+        self._entries: "OrderedDict[str, List]" = OrderedDict()  # digest -> [entry size, annotations], oldest first
+        self._load()
+
+    @property
+    def path(self) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, CACHE_FILENAME)
+
+    def lookup(self, filepath: str) -> Optional[List[Dict]]:
+        """
+        Args:
+            filepath: path to .py file
+
+        Returns:
+            cached annotation list, or None if the file has to be parsed. After a miss, store() must be called with the
+            parsed annotations
+        """
+        stat = os.stat(filepath)
+        record = self._files.get(filepath)
+        if record is not None and record[0] == stat.st_mtime_ns and record[1] == stat.st_size:
+            if record[2] in self._entries:
+                return self._hit(record[2])
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(filepath, 'rb') as srcfile:
+            for chunk in iter(lambda: srcfile.read(HASH_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        self._files[filepath] = [stat.st_mtime_ns, stat.st_size, digest]
+        if digest in self._entries:
+            return self._hit(digest)
+        self.misses += 1
+        return None
+
+    def store(self, filepath: str, annotations: List[Dict]) -> None:
+        """
+        Args:
+            filepath: path to .py file that missed in lookup()
+            annotations: annotation list extracted from the file
+        """
+        self._entries[self.digest(filepath)] = [len(json.dumps(dump_records(annotations))), annotations]
+
+    def digest(self, filepath: str) -> str:
+        """
+        Args:
+            filepath: path to .py file that went through lookup()
+
+        Returns:
+            content hash of the file
+        """
+        return self._files[filepath][2]
+
+    def save(self) -> None:
+        """
+        Evicts least-recently-used entries down to max_size and atomically writes the cache to disk, if it has a cache_dir
+        """
+        # most files have no annotations, so their records and digests are most of the size of the cache file
+        sizes = {digest: len(digest) + len(str(entry_size)) + entry_size + ENTRY_OVERHEAD + 2
+                 for digest, (entry_size, _) in self._entries.items()}
+        for filepath, record in self._files.items():
+            if record[2] in sizes:
+                sizes[record[2]] += len(json.dumps(filepath)) + len(json.dumps(record)) + 4
+        total_size = len(json.dumps({"version": CACHE_VERSION, "files": {}, "entries": []})) + sum(sizes.values())
+        while self._entries and total_size > self.max_size:
+            digest, _ = self._entries.popitem(last=False)
+            total_size -= sizes[digest]
+        if self.cache_dir is None:
+            return
+        files = {filepath: record for filepath, record in self._files.items() if record[2] in self._entries}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # a unique temporary file per writer, so concurrent saves from several threads or processes cannot interleave
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as cachefile:
+            entries = [[digest, [entry_size, _dumped(annotations)]]
+                       for digest, (entry_size, annotations) in self._entries.items()]
+            json.dump({"version": CACHE_VERSION, "files": files, "entries": entries}, cachefile)
+        os.replace(tmp_path, self.path)
+        logger.info(f"annotation cache: {self.hits} hits, {self.misses} misses, {len(self._entries)} entries")
+
+    def _hit(self, digest: str) -> List[Dict]:
+        self.hits += 1
+        self._entries.move_to_end(digest)
+        entry = self._entries[digest]
+        if entry[1] and not isinstance(entry[1][0], FeatureAnnotation):  # loaded from disk as [line, fields] pairs
+            entry[1] = load_records(entry[1])
+        return entry[1]
+
+    def _load(self) -> None:
+        if self.cache_dir is None:
+            return
+        try:
+            with open(self.path) as cachefile:
+                loaded = json.load(cachefile)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            logger.warning(f"ignoring corrupt annotation cache {self.path}")
+            return
+        if loaded.get("version") != CACHE_VERSION:
+            logger.info(f"ignoring annotation cache {self.path} written by another version")
+            return
+        self._files = loaded["files"]
+        self._entries = OrderedDict((digest, entry) for digest, entry in loaded["entries"])
+
+
+def _dumped(annotations: List) -> List:
+    # entries that were loaded from disk and never hit are still in their dumped form
+    if annotations and isinstance(annotations[0], FeatureAnnotation):
+        return dump_records(annotations)
+    return annotations
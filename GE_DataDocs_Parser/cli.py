@@ -1,30 +1,584 @@
 import click
+import functools
 import os
-import json
+import time
 
-from .GE_DataDocs_Parser import build_annotations
+# only what the options need is imported up front; every command imports the parser when it runs, so --help and
+# --version stay fast
+from . import __version__
+from .defaults import (CONFLICT_POLICIES, DEFAULT_MAX_SIZE, DEFAULT_PORT, DEFAULT_READ_AHEAD, DEFAULT_READ_THREADS,
+                       ENGINES, OUTPUT_FORMATS, OVERSIZE_POLICIES, default_cache_dir)
 
 @click.group()
-@click.version_option()
+@click.version_option(version=__version__)
 def cli():
     pass
 
+def _path_filter_options(command):
+    """Adds the options that select the files under PATH, and passes them to the command as one path_filter"""
+    @click.option('--include', multiple=True, metavar='GLOB',
+                  help='Only parse the .py files that match GLOB, in .gitignore syntax. Can be repeated.')
+    @click.option('--exclude', multiple=True, metavar='GLOB',
+                  help='Skip the files and directories that match GLOB, in .gitignore syntax. Can be repeated.')
+    @click.option('--ignore-file', multiple=True, type=click.Path(exists=True, dir_okay=False),
+                  help='File of .gitignore-style patterns, relative to PATH, of files and directories to skip. '
+                       'Can be repeated.')
+    @click.option('--no-default-excludes', is_flag=True, default=False,
+                  help='Also walk .git, node_modules, build, dist, virtualenvs and the like.')
+    @click.option('--no-gitignore', is_flag=True, default=False,
+                  help='Ignore the .gitignore files under PATH.')
+    @functools.wraps(command)
+    def wrapper(*args, include, exclude, ignore_file, no_default_excludes, no_gitignore, **kwargs):
+        from .pathfilter import PathFilter
+
+        path_filter = PathFilter(include=include, exclude=exclude, ignore_files=ignore_file,
+                                 default_excludes=not no_default_excludes, gitignore=not no_gitignore)
+        return command(*args, path_filter=path_filter, **kwargs)
+    return wrapper
+
+def _memory_limit_options(command):
+    """Adds the options that bound the memory parsing takes, and passes them to the command as one memory_limits"""
+    @click.option('--max-file-size', default=None, metavar='SIZE', callback=_parse_size,
+                  help='Files larger than SIZE bytes, or K, M or G with a suffix, are handled by --oversize instead of '
+                       'being parsed like the others.')
+    @click.option('--oversize', default=OVERSIZE_POLICIES[0], type=click.Choice(OVERSIZE_POLICIES),
+                  help='What is done with files over the size limit: scan finds their docstrings with the tokenize '
+                       'scanner reading them line by line, without holding them in memory; skip leaves them out with a '
+                       'warning.')
+    @click.option('--memory-budget', default=None, metavar='SIZE', callback=_parse_size,
+                  help='Memory that parsing one file, and the files read ahead, may take. Files whose parse would take '
+                       'more are handled by --oversize.')
+    @functools.wraps(command)
+    def wrapper(*args, max_file_size, oversize, memory_budget, **kwargs):
+        memory_limits = None
+        if max_file_size is not None or memory_budget is not None:
+            from .limits import MemoryLimits
+
+            memory_limits = MemoryLimits(max_file_size, oversize, memory_budget)
+        return command(*args, memory_limits=memory_limits, **kwargs)
+    return wrapper
+
+def _cache_options(command):
+    """Adds the options that set the worker processes and the annotation cache, and passes the cache to the command as
+    cache_dir, None without one, and cache_max_size in bytes"""
+    @click.option('--jobs', '-j', default=1, type=click.IntRange(min=0),
+                  help='Number of processes used to parse files. 0 uses every CPU.')
+    @click.option('--cache-dir', default=default_cache_dir, type=click.Path(file_okay=False),
+                  help='Directory of the persistent annotation cache.')
+    @click.option('--no-cache', is_flag=True, default=False,
+                  help='Parse every file instead of reusing the annotations of the persistent cache.')
+    @click.option('--cache-size', default=DEFAULT_MAX_SIZE // (1024 * 1024), type=click.IntRange(min=0),
+                  help='Size cap of the annotation cache in MB. Least recently used entries are evicted first.')
+    @functools.wraps(command)
+    def wrapper(*args, cache_dir, no_cache, cache_size, **kwargs):
+        return command(*args, cache_dir=None if no_cache else cache_dir, cache_max_size=cache_size * 1024 * 1024,
+                       **kwargs)
+    return wrapper
+
+def _engine_option(command):
+    """Adds the option that chooses how docstrings are found"""
+    return click.option('--engine', default='ast', type=click.Choice(ENGINES),
+                        help='How docstrings are found: ast builds a syntax tree per file, tokenize scans the tokens '
+                             'without one.')(command)
+
+def _read_ahead_options(command):
+    """Adds the options that set how many files are read ahead of the parser, and by how many threads"""
+    command = click.option('--read-threads', default=DEFAULT_READ_THREADS, type=click.IntRange(min=1),
+                           help='Number of threads reading files ahead of the parser.')(command)
+    return click.option('--read-ahead', default=DEFAULT_READ_AHEAD, type=click.IntRange(min=0),
+                        help='Number of files read ahead of the parser by background threads when parsing in this '
+                             'process. 0 reads each file when it is parsed.')(command)
+
+def _conflict_options(default, default_help):
+    """Returns a decorator adding the options that choose which definition of an id defined more than once is kept,
+    with default as the --on-conflict default, described by default_help"""
+    def decorator(command):
+        command = click.option('--conflict-report', 'conflict_report_path', default=None,
+                               type=click.Path(exists=False),
+                               help='The file to which to save the ids defined more than once, with the file, line '
+                                    'and class or function of every definition.')(command)
+        return click.option('--on-conflict', default=default, type=click.Choice(CONFLICT_POLICIES),
+                            help='Which definition of an id defined more than once is kept, in walk order: first, '
+                                 'last, or error, keeping none and exiting with an error. ' + default_help)(command)
+    return decorator
+
+def _output_options(command):
+    """Adds the options that choose the formats the grid is written in, and where its merge report is saved"""
+    command = click.option('--merge-report', 'merge_report_path', default=None, type=click.Path(exists=False),
+                           help='The file to which to save the TOC ids without annotations, and the annotations '
+                                'without TOC case.')(command)
+    command = click.option('--compact', is_flag=True, default=False,
+                           help='Write json without indentation or whitespace.')(command)
+    return click.option('--format', 'output_formats', multiple=True, default=['json'],
+                        type=click.Choice(OUTPUT_FORMATS),
+                        help='json writes the grid, ndjson one case per line, csv one row per case, markdown and html '
+                             'a table per feature. Can be repeated to write several formats in one pass, each to --out '
+                             'with the extension of its format.')(command)
+
+def _parse_size(ctx, param, value):
+    if value is None:
+        return None
+    number, unit = value[:-1], value[-1].upper()
+    if unit not in "KMG":
+        number, unit = value, ""
+    if not number.isdigit() or int(number) == 0:
+        raise click.BadParameter(f'{value} is not a positive number of bytes, or of K, M or G with a suffix')
+    return int(number) * 1024 ** " KMG".index(unit or " ")
+
+def _report_peak_rss(started_peak):
+    """Prints the peak RSS of this process, and that of its largest worker if it is above the peak of the children from
+    before the command, started_peak (e.g. those of a launcher script that exec'ed Python)"""
+    from .profiling import peak_rss
+
+    peak = peak_rss()
+    if peak is not None:
+        own, workers = peak
+        click.echo(f"peak RSS {own / (1024 * 1024):.1f} MB" + (f", largest worker {workers / (1024 * 1024):.1f} MB"
+                                                              if workers > started_peak[1] else ""), err=True)
+
+def _parse_shard(ctx, param, value):
+    if value is None:
+        return None
+    index, _, count = value.partition('/')
+    if not (index.isdigit() and count.isdigit() and 1 <= int(index) <= int(count)):
+        raise click.BadParameter(f'{value} is not of the form i/N, with 1 <= i <= N')
+    return int(index), int(count)
+
 @cli.command(name='parse')
 @click.argument('path', type=click.Path(exists=True))
-@click.argument('injson', type=click.Path(exists=True))
+@click.argument('injson', nargs=-1, type=click.Path(exists=True))
 @click.option('--out', default=None, type=click.Path(exists=False),
-              help='The file to which to save the resulting annotations json.')
-def annotations_build(path, injson, out):
+              help='The file to which to save the resulting annotations json. With several INJSON files, the directory '
+                   'in which to save one annotations json per INJSON file, under the same file name.')
+@click.option('--profile', 'profile_summary', is_flag=True, default=False,
+              help='Print counts and timings of every stage and the slowest files to stderr.')
+@click.option('--profile-out', default=None, type=click.Path(exists=False),
+              help='The file to which to save the profile: a cProfile dump if it ends in .pstats, json otherwise.')
+@click.option('--index-out', default=None, type=click.Path(exists=False),
+              help='The file to which to save the annotations of every source file, for the update command.')
+@click.option('--strict', is_flag=True, default=False,
+              help='Exit with an error, after writing the output, if any annotation fails validation.')
+@click.option('--report', 'report_path', default=None, type=click.Path(exists=False),
+              help='The file to which to save the validation errors of the annotations, with their file and line.')
+@click.option('--shard', default=None, metavar='I/N', callback=_parse_shard,
+              help='Only parse shard I of N of the files, and save their annotations to --out for the reduce command '
+                   'instead of merging them into INJSON files.')
+@_output_options
+@_cache_options
+@_engine_option
+@_read_ahead_options
+@_conflict_options(None, 'Defaults to last.')
+@_path_filter_options
+@_memory_limit_options
+def annotations_build(path, injson, out, profile_summary, profile_out, index_out, strict, report_path, shard,
+                      output_formats, compact, merge_report_path, jobs, cache_dir, cache_max_size, engine, read_ahead,
+                      read_threads, on_conflict, conflict_report_path, path_filter, memory_limits):
     """Build annotations from a python project.\n
+        PATH: the root directory from which to parse the project\n
+        INJSON: json file(s) that will serve as the scaffold for the feature maturity grid. Left out with --shard
+    """
+    import cProfile
+    import json
+    from .GE_DataDocs_Parser import BuildOptions
+    from .profiling import Profile, peak_rss
+
+    started_peak = peak_rss()
+    if shard is not None:
+        if (injson or merge_report_path is not None or index_out is not None or on_conflict is not None or
+                conflict_report_path is not None):
+            raise click.UsageError("INJSON, --merge-report, --index-out, --on-conflict and --conflict-report are given "
+                                   "to reduce, not to parse --shard")
+        if out is None:
+            raise click.UsageError("--out is required with --shard")
+    elif not injson:
+        raise click.UsageError("Missing argument 'INJSON...'.")
+    _check_outputs(injson, out, output_formats)
+    profile = Profile() if profile_summary or profile_out is not None else None
+    profiler = cProfile.Profile() if profile_out is not None and profile_out.endswith(".pstats") else None
+    if profiler is not None:
+        profiler.enable()
+    options = BuildOptions(workers=jobs, cache_dir=cache_dir, cache_max_size=cache_max_size, engine=engine,
+                           path_filter=path_filter, read_ahead=read_ahead, read_threads=read_threads,
+                           on_conflict=on_conflict or 'last', memory_limits=memory_limits)
+    try:
+        errors = _build(path, injson, out, options, profile=profile, index_out=index_out, report_path=report_path,
+                        shard=shard, output_formats=output_formats, compact=compact,
+                        merge_report_path=merge_report_path, conflict_report_path=conflict_report_path)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_out)
+    _report_peak_rss(started_peak)
+    if profile_summary:
+        click.echo(profile.format_summary(), err=True)
+    if profile_out is not None and profiler is None:
+        with open(profile_out, "w") as profilefile:
+            json.dump(profile.to_dict(), profilefile, indent=2)
+    if strict and errors:
+        raise click.ClickException(f"{len(errors)} annotations failed validation")
+
+def _stage(profile, name, count=1):
+    import contextlib
+
+    return profile.stage(name, count) if profile is not None else contextlib.nullcontext()
+
+def _build(path, injson, out, options, profile=None, index_out=None, report_path=None, shard=None,
+           output_formats=('json',), compact=False, merge_report_path=None, conflict_report_path=None):
+    """Parses PATH with options, the BuildOptions of the command, and writes everything parse is asked for. Returns the
+    validation errors of the annotations"""
+    import json
+    from .validation import validate_index
+
+    if shard is not None:
+        from .shard import build_shard
+
+        # a shard only sees its own files, so duplicate ids are left to reduce
+        index = build_shard(path, out, shard, options, profile=profile)
+        click.echo(f"wrote {len(index)} annotations of shard {shard[0]}/{shard[1]} to {out}", err=True)
+    else:
+        from .GE_DataDocs_Parser import DuplicateAnnotationError, build_index
+
+        try:
+            index = build_index(path, options, profile=profile)
+        except DuplicateAnnotationError as e:
+            _report_conflicts(e.conflicts, conflict_report_path, failed=True)
+        _report_conflicts(index.conflicts, conflict_report_path)
+    if index_out is not None:
+        from .incremental import write_index
+
+        with _stage(profile, "write_index"):
+            write_index(index, path, index_out)
+    with _stage(profile, "validate", len(index)):
+        errors = validate_index(index)
+    for error in errors:
+        click.echo(str(error), err=True)
+    click.echo(f"{len(errors)} validation errors", err=True)
+    if report_path is not None:
+        with open(report_path, "w") as reportfile:
+            json.dump([error._asdict() for error in errors], reportfile, indent=2)
+    if shard is None:
+        _write_grids(index, injson, out, merge_report_path, output_formats, compact, profile)
+    return errors
+
+def _report_conflicts(conflicts, conflict_report_path, failed=False):
+    """Prints the ids defined more than once and saves them to the conflict report. failed exits with an error after"""
+    import json
+
+    for conflict in conflicts:
+        click.echo(str(conflict), err=True)
+    click.echo(f"{len(conflicts)} duplicate annotation ids", err=True)
+    if conflict_report_path is not None:
+        with open(conflict_report_path, "w") as reportfile:
+            json.dump([{"annotation_id": conflict.annotation_id, "kept": conflict.kept,
+                        "definitions": [definition._asdict() for definition in conflict.definitions]}
+                       for conflict in conflicts], reportfile, indent=2)
+    if failed:
+        raise click.ClickException(f"{len(conflicts)} annotation ids are defined more than once")
+
+def _write_grids(index, injson, out, merge_report_path, output_formats, compact, profile=None):
+    import contextlib
+    import json
+    from .GE_DataDocs_Parser import merge_report
+    from .output import RENDERERS, JsonRenderer, render_grid
+
+    loaded_tocs = {}
+    with _stage(profile, "load_toc", len(injson)):
+        for in_json in injson:
+            with open(in_json) as json_file:
+                loaded_tocs[in_json] = json.load(json_file)
+    with _stage(profile, "merge_report", len(injson)):
+        report = merge_report(loaded_tocs, index)
+    unmatched_count = sum(len(case_ids) for case_ids in report.unmatched_toc_ids.values())
+    click.echo(f"{unmatched_count} TOC cases without annotation, "
+               f"{len(report.orphan_annotation_ids)} annotations without TOC case", err=True)
+    if merge_report_path is not None:
+        with open(merge_report_path, "w") as reportfile:
+            json.dump(report._asdict(), reportfile, indent=2)
+
+    output_formats = list(dict.fromkeys(output_formats))
+
+    def renderer(output_format, outfile):
+        if output_format == 'json':
+            return JsonRenderer(outfile, indent=None if compact else 2)
+        return RENDERERS[output_format][0](outfile)
+
+    with _stage(profile, "merge_and_write_output", len(injson) * len(output_formats)):
+        if out is None:
+            stdout = click.get_text_stream('stdout')
+            render_grid(loaded_tocs[injson[0]], index, [renderer(output_formats[0], stdout)])
+            if output_formats[0] == 'json':
+                stdout.write("\n")
+            return
+        if len(injson) > 1:
+            os.makedirs(out, exist_ok=True)
+        for in_json, loaded_json in loaded_tocs.items():
+            target = out if len(injson) == 1 else os.path.join(out, os.path.basename(in_json))
+            with contextlib.ExitStack() as outfiles:
+                # every format of a TOC is rendered from the same pass over its merged cases
+                renderers = [renderer(output_format, outfiles.enter_context(open(
+                    target if len(output_formats) == 1 else os.path.splitext(target)[0] + RENDERERS[output_format][1],
+                    "w"))) for output_format in output_formats]
+                render_grid(loaded_json, index, renderers)
+
+def _check_outputs(injson, out, output_formats=('json',)):
+    if len(injson) > 1 and out is None:
+        raise click.UsageError("--out is required when several INJSON files are given")
+    if len(set(output_formats)) > 1 and out is None:
+        raise click.UsageError("--out is required when several formats are given")
+    if len({os.path.basename(in_json) for in_json in injson}) < len(injson):
+        raise click.UsageError("INJSON files must have distinct file names")
+
+@cli.command(name='watch')
+@click.argument('path', type=click.Path(exists=True))
+@click.argument('injson', type=click.Path(exists=True))
+@click.option('--out', required=True, type=click.Path(exists=False),
+              help='The file to which to save the resulting annotations json.')
+@click.option('--interval', default=0.2, type=click.FloatRange(min=0.01),
+              help='Seconds between polls of PATH for changed files.')
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=0),
+              help='Number of processes used for the initial parse. 0 uses every CPU.')
+@_engine_option
+@_conflict_options('last', 'Defaults to last. Duplicates that appear while watching are logged; with error the '
+                           'grid is kept as it was until they are resolved.')
+@_path_filter_options
+def annotations_watch(path, injson, out, interval, jobs, engine, on_conflict, conflict_report_path, path_filter):
+    """Keep the annotations json up to date while files change.\n
         PATH: the root directory from which to parse the project\n
         INJSON: json file that will serve as the scaffold for the feature maturity grid
     """
-    annotations = build_annotations(path, injson)
+    from .GE_DataDocs_Parser import BuildOptions, DuplicateAnnotationError
+    from .watch import AnnotationWatcher
+
+    try:
+        watcher = AnnotationWatcher(path, injson, out, BuildOptions(workers=jobs, engine=engine,
+                                                                    path_filter=path_filter, on_conflict=on_conflict))
+    except DuplicateAnnotationError as e:
+        _report_conflicts(e.conflicts, conflict_report_path, failed=True)
+    _report_conflicts(watcher.conflicts, conflict_report_path)
+    click.echo(f"watching {path}, writing {out}", err=True)
+    try:
+        watcher.run(interval=interval)
+    except KeyboardInterrupt:
+        pass
+
+@cli.command(name='batch')
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+@_cache_options
+@_engine_option
+@_read_ahead_options
+@_path_filter_options
+def annotations_batch(manifest, jobs, cache_dir, cache_max_size, engine, read_ahead, read_threads, path_filter):
+    """Build annotations for several python projects in one process.\n
+        MANIFEST: json list of {"path": ..., "injson": ..., "out": ...} jobs, with paths relative to the manifest
+    """
+    from .GE_DataDocs_Parser import BuildOptions
+    from .batch import load_manifest, run_batch
+
+    try:
+        batch_jobs = load_manifest(manifest)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    started = time.perf_counter()
+    results = run_batch(batch_jobs, BuildOptions(workers=jobs, cache_dir=cache_dir, cache_max_size=cache_max_size,
+                                                 engine=engine, path_filter=path_filter, read_ahead=read_ahead,
+                                                 read_threads=read_threads))
+    for result in results:
+        click.echo(f"{result.seconds:8.3f}s  {result.annotations:6d} annotations  {result.job.path} -> {result.job.out}")
+    click.echo(f"{time.perf_counter() - started:8.3f}s  total for {len(batch_jobs)} jobs")
+
+@cli.command(name='update')
+@click.argument('path', type=click.Path(exists=True, file_okay=False))
+@click.argument('previous', type=click.Path(exists=True, dir_okay=False))
+@click.option('--index', 'index_path', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='Index written by parse --index-out for PREVIOUS. It is updated in place.')
+@click.option('--changed', multiple=True, type=click.Path(exists=False),
+              help='A file that was added, modified or deleted since PREVIOUS was written. Can be repeated.')
+@click.option('--since', default=None,
+              help='Git revision PREVIOUS was built from; the files changed since then are read with git diff.')
+@click.option('--out', default=None, type=click.Path(exists=False),
+              help='The file to which to save the updated annotations json. Defaults to stdout.')
+@_engine_option
+@_conflict_options(None, 'Defaults to the policy the index was written with, and must be the same if given.')
+@_path_filter_options
+def annotations_update(path, previous, index_path, changed, since, out, engine, on_conflict, conflict_report_path,
+                       path_filter):
+    """Patch a previous annotations json by parsing only the changed files.\n
+        PATH: the root directory the previous annotations json was parsed from\n
+        PREVIOUS: annotations json written by parse
+    """
+    import json
+    from .GE_DataDocs_Parser import DuplicateAnnotationError
+    from .incremental import git_changed_files, load_index, patch_grid, update_index, write_index
+    from .output import write_grid
+
+    if not changed and since is None:
+        raise click.UsageError("give the changed files with --changed or a git revision with --since")
+    changed_files = list(changed)
+    if since is not None:
+        try:
+            changed_files.extend(git_changed_files(path, since))
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+    try:
+        previous_index = load_index(index_path, path)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if on_conflict is not None and on_conflict != previous_index.on_conflict:
+        raise click.UsageError(f"--on-conflict {on_conflict} differs from the policy {previous_index.on_conflict} the "
+                               f"index was written with, rebuild it with parse --on-conflict {on_conflict} --index-out")
+    try:
+        index, parsed = update_index(previous_index, path, changed_files, engine=engine, path_filter=path_filter)
+    except DuplicateAnnotationError as e:
+        _report_conflicts(e.conflicts, conflict_report_path, failed=True)
+    _report_conflicts(index.conflicts, conflict_report_path)
+    with open(previous) as grid_file:
+        grid = json.load(grid_file)
+    patched_ids = patch_grid(grid, previous_index, index)
+    click.echo(f"parsed {parsed} changed files, {len(patched_ids)} TOC cases changed", err=True)
     if out is None:
-        print(json.dumps(annotations, indent=2))
+        stdout = click.get_text_stream('stdout')
+        write_grid(grid, {}, stdout)
+        stdout.write("\n")
     else:
         with open(out, "w") as outfile:
-            json.dump(annotations, outfile, indent=2)
+            write_grid(grid, {}, outfile)
+    write_index(index, path, index_path)
+
+@cli.command(name='serve')
+@click.argument('root', nargs=-1, required=True, type=click.Path(exists=True, file_okay=False))
+@click.option('--socket', 'socket_path', default=None, type=click.Path(dir_okay=False),
+              help='Unix socket to listen on instead of --host and --port.')
+@click.option('--host', default='127.0.0.1',
+              help='Interface to listen on. Keep it local: requests can read any TOC file the server can.')
+@click.option('--port', default=DEFAULT_PORT, type=click.IntRange(min=0, max=65535),
+              help='Port to listen on. 0 picks a free one.')
+@_cache_options
+@_engine_option
+@_path_filter_options
+def annotations_serve(root, socket_path, host, port, jobs, cache_dir, cache_max_size, engine, path_filter):
+    """Keep the annotations of python projects in memory and serve grids over HTTP.\n
+        ROOT: root directory of a project to serve. Can be repeated\n
+        GET /build?toc=FILE&root=ROOT merges a TOC file, POST /merge?root=ROOT merges the TOC json in the body and
+        GET /stats reports cache hits and latencies. Changed files are parsed again before each request.
+    """
+    from .GE_DataDocs_Parser import BuildOptions
+    from .serve import AnnotationService, is_socket, make_server
+
+    # checked before the initial parse, which can take a while
+    if socket_path is not None and os.path.lexists(socket_path) and not is_socket(socket_path):
+        raise click.ClickException(f"{socket_path} exists and is not a socket")
+    started = time.perf_counter()
+    service = AnnotationService(list(root), BuildOptions(workers=jobs, cache_dir=cache_dir,
+                                                         cache_max_size=cache_max_size, engine=engine,
+                                                         path_filter=path_filter))
+    try:
+        server = make_server(service, socket_path=socket_path, host=host, port=port)
+    except FileExistsError as e:
+        raise click.ClickException(str(e))
+    address = socket_path if socket_path is not None else "http://{}:{}".format(*server.server_address[:2])
+    click.echo(f"indexed {len(root)} roots in {time.perf_counter() - started:.3f}s, serving on {address}", err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and is_socket(socket_path):
+            os.unlink(socket_path)
+
+@cli.command(name='index')
+@click.argument('path', type=click.Path(exists=True, file_okay=False))
+@click.option('--out', required=True, type=click.Path(exists=False, dir_okay=False),
+              help='The file to which to save the annotation index, for the merge command.')
+@_cache_options
+@_engine_option
+@_read_ahead_options
+@_conflict_options('last', 'Defaults to last.')
+@_path_filter_options
+@_memory_limit_options
+def annotations_index(path, out, jobs, cache_dir, cache_max_size, engine, read_ahead, read_threads, on_conflict,
+                      conflict_report_path, path_filter, memory_limits):
+    """Write the annotations of a python project to an index file.\n
+        PATH: the root directory from which to parse the project\n
+        The index can be merged into any number of TOC files with the merge command, without the sources.
+    """
+    from .GE_DataDocs_Parser import BuildOptions, DuplicateAnnotationError
+    from .artifact import build_artifact
+    from .profiling import peak_rss
+
+    started_peak = peak_rss()
+    try:
+        index, metadata = build_artifact(path, out, BuildOptions(
+            workers=jobs, cache_dir=cache_dir, cache_max_size=cache_max_size, engine=engine, path_filter=path_filter,
+            read_ahead=read_ahead, read_threads=read_threads, on_conflict=on_conflict, memory_limits=memory_limits))
+    except DuplicateAnnotationError as e:
+        _report_conflicts(e.conflicts, conflict_report_path, failed=True)
+    _report_conflicts(index.conflicts, conflict_report_path)
+    click.echo(f"wrote {len(index)} annotations from {metadata['files']} files to {out}, "
+               f"source hash {metadata['source_hash']}", err=True)
+    _report_peak_rss(started_peak)
+
+@cli.command(name='merge')
+@click.argument('index_path', metavar='INDEX', type=click.Path(exists=True, dir_okay=False))
+@click.argument('injson', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--out', default=None, type=click.Path(exists=False),
+              help='The file to which to save the resulting annotations json. With several INJSON files, the directory '
+                   'in which to save one annotations json per INJSON file, under the same file name.')
+@_output_options
+def annotations_merge(index_path, injson, out, output_formats, compact, merge_report_path):
+    """Merge an index file written by the index command into TOC files.\n
+        INDEX: annotation index written by GE_parse index\n
+        INJSON: json file(s) that will serve as the scaffold for the feature maturity grid
+    """
+    from .artifact import load_artifact
+
+    _check_outputs(injson, out, output_formats)
+    try:
+        index = load_artifact(index_path)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{len(index)} annotations, source hash {index.metadata.get('source_hash')}", err=True)
+    _write_grids(index, injson, out, merge_report_path, output_formats, compact)
+
+@cli.command(name='reduce')
+@click.argument('shard_paths', metavar='SHARD...', nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False))
+@click.option('--injson', multiple=True, type=click.Path(exists=True),
+              help='json file that will serve as the scaffold for the feature maturity grid. Can be repeated.')
+@click.option('--out', default=None, type=click.Path(exists=False),
+              help='The file to which to save the resulting annotations json. With several --injson files, the '
+                   'directory in which to save one annotations json per --injson file, under the same file name.')
+@click.option('--index-out', default=None, type=click.Path(exists=False, dir_okay=False),
+              help='The file to which to save the annotation index of the whole tree, for the merge command.')
+@_output_options
+@_conflict_options('error', 'Defaults to error; parse keeps the last.')
+def annotations_reduce(shard_paths, injson, out, index_out, output_formats, compact, merge_report_path, on_conflict,
+                       conflict_report_path):
+    """Merge the shard files written by parse --shard.\n
+        SHARD: shard file written by GE_parse parse --shard, one for each shard of the tree\n
+        The annotations are merged into the --injson files as parse merges them, or saved with --index-out.
+    """
+    from .GE_DataDocs_Parser import DuplicateAnnotationError
+    from .shard import reduce_shards
+
+    if not injson and index_out is None:
+        raise click.UsageError("at least one of --injson and --index-out is required")
+    _check_outputs(injson, out, output_formats)
+    try:
+        index, metadata = reduce_shards(shard_paths, on_conflict)
+    except DuplicateAnnotationError as e:
+        _report_conflicts(e.conflicts, conflict_report_path, failed=True)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    _report_conflicts(index.conflicts, conflict_report_path)
+    click.echo(f"{len(index)} annotations from {metadata['files']} files, source hash {metadata['source_hash']}",
+               err=True)
+    if index_out is not None:
+        from .artifact import write_artifact
+
+        write_artifact(index, None, index_out, metadata)
+    if injson:
+        _write_grids(index, injson, out, merge_report_path, output_formats, compact)
 
 def main():
     cli()
@@ -0,0 +1,38 @@
+import os
+
+# Settings that the command line needs before a command is chosen, e.g. for its option choices and defaults. This module
+# imports nothing else, so GE_parse --help and --version do not load the parser
+
+# ways of finding the docstrings of a file: "ast" builds the syntax tree, "tokenize" scans the token stream without one.
+# Both find the same docstrings in the same order
+ENGINES = ("ast", "tokenize")
+
+# what an index keeps when an annotation id is defined more than once: the first definition in walk order, the last
+# one, or none, raising DuplicateAnnotationError once every file has been added
+CONFLICT_POLICIES = ("first", "last", "error")
+
+# formats the grid can be written in, any number of them from one pass over the merged TOC
+OUTPUT_FORMATS = ("json", "ndjson", "csv", "markdown", "html")
+
+# what is done with a file over the size limit: find its docstrings with the tokenize scanner reading it line by line,
+# so neither the file nor a syntax tree of it is held in memory, or skip it with a warning
+OVERSIZE_POLICIES = ("scan", "skip")
+
+# default cap on the total size of cached annotation lists, in bytes
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+# files read ahead of the parser, and threads reading them. Reads release the GIL, so the threads wait on the
+# filesystem while the parser keeps the CPU busy
+DEFAULT_READ_AHEAD = 32
+DEFAULT_READ_THREADS = 4
+
+DEFAULT_PORT = 8765
+
+
+def default_cache_dir() -> str:
+    """
+    Returns:
+        per-user cache directory, honoring XDG_CACHE_HOME
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "GE_DataDocs_Parser")
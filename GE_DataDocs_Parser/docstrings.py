@@ -0,0 +1,202 @@
+import ast
+import inspect
+import io
+import sys
+import tokenize
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+# compound statements whose body is one level deeper than the statement itself
+BLOCK_KEYWORDS = frozenset(["for", "while", "with", "try", "finally", "match", "case"])
+
+
+def scan_docstrings(source: Union[bytes, BinaryIO]) -> List[Tuple[str, int, Optional[str]]]:
+    """
+    Finds the docstrings of the module and of every class, function and async function with the tokenizer, without
+    building an AST. Only the tokens of the current line and a stack of indentation levels are held in memory.
+
+    The docstrings are returned in the order ast.walk visits their nodes, which is breadth-first: by depth of the node in
+    the AST, then by position in the source. The depth is tracked through the indented blocks, counting the extra AST
+    levels of elif chains (nested If nodes), except handlers and match cases.
+
+    Args:
+        source: raw bytes of a .py file, or the .py file opened in binary mode, which is then read one line at a time
+            from its current position, so that the source is never held in memory as a whole
+
+    Returns:
+        the docstrings, cleaned like ast.get_docstring does, each with the line of the source its first line is on and
+        the dotted names of the class or function it belongs to, None for the module docstring
+
+    Raises:
+        SyntaxError: if the source cannot be tokenized, as ast.parse would
+    """
+    found: List[Tuple[int, Tuple[int, int], Tuple[str, int, Optional[str]]]] = []  # (depth, position, docstring)
+    # per indented block: depth of its statements, depth of the last If node of an if/elif chain, and the dotted names
+    # of the classes and functions it is in
+    blocks = [[1, None, None]]
+    statement_start = True
+    async_start = None  # position of an "async" that starts the statement
+    header = None  # (node depth, position, body depth, body scope) of the compound statement whose header is being read
+    naming = False  # whether the next token is the name of a class or function
+    body_depth = None  # depth of the block that the next INDENT opens
+    body_scope = None  # scope of the block that the next INDENT opens
+    paren_depth = 0
+    lambdas = 0  # lambdas in the header whose ':' has not been seen yet
+    # (depth, position, scope) of the node whose docstring is next
+    owner: Optional[Tuple[int, Tuple[int, int], Optional[str]]] = (0, (0, 0), None)
+    statement_tokens: Optional[List[tokenize.TokenInfo]] = None  # tokens of the first statement of the owner's body
+
+    for token in _tokens(source):
+        token_type = token.type
+        if token_type in (tokenize.NL, tokenize.COMMENT, tokenize.ENCODING):
+            continue
+
+        if owner is not None:
+            if statement_tokens is None:
+                if token_type == tokenize.STRING or (token_type == tokenize.OP and token.string == "("):
+                    statement_tokens = [token]
+                elif token_type not in (tokenize.NEWLINE, tokenize.INDENT):
+                    owner = None
+            elif token_type in (tokenize.NEWLINE, tokenize.ENDMARKER) or (token_type == tokenize.OP and token.string == ";"):
+                docstring = _docstring_value(statement_tokens)
+                if docstring is not None:
+                    found.append((owner[0], owner[1], (*docstring, owner[2])))
+                owner = None
+                statement_tokens = None
+            else:
+                statement_tokens.append(token)
+
+        if token_type == tokenize.INDENT:
+            blocks.append([body_depth if body_depth is not None else blocks[-1][0] + 1, None,
+                           body_scope if body_depth is not None else blocks[-1][2]])
+            body_depth = None
+            continue
+        if token_type == tokenize.DEDENT:
+            blocks.pop()
+            continue
+        if token_type == tokenize.NEWLINE:
+            statement_start = True
+            header = None
+            continue
+        if token_type == tokenize.ENDMARKER:
+            break
+
+        if statement_start:
+            body_depth = None
+            body_scope = None
+            block = blocks[-1]
+            depth = block[0]
+            scope = block[2]
+            keyword = token.string if token_type == tokenize.NAME else None
+            if keyword == "async":
+                async_start = token.start
+                continue  # the statement is decided by the next token
+            statement_start = False
+            position = async_start or token.start
+            async_start = None
+            lambdas = 0
+            if keyword in ("def", "class"):
+                header = (depth, position, depth + 1, scope)  # the scope is completed by the name that follows
+                naming = True
+                block[1] = None
+                continue
+            elif keyword == "if":
+                header = (None, position, depth + 1, scope)
+                block[1] = depth
+            elif keyword == "elif":
+                # elif is an If node in the orelse of the previous If
+                block[1] = (block[1] if block[1] is not None else depth) + 1
+                header = (None, position, block[1] + 1, scope)
+            elif keyword == "else":
+                header = (None, position, (block[1] if block[1] is not None else depth) + 1, scope)
+                block[1] = None
+            elif keyword == "except":
+                # the body of an ExceptHandler, which is a child of the Try node
+                header = (None, position, depth + 2, scope)
+                block[1] = None
+            elif keyword in BLOCK_KEYWORDS:
+                header = (None, position, depth + 1, scope)
+                block[1] = None
+            else:
+                header = None
+                block[1] = None
+
+        if naming:
+            naming = False
+            if header is not None and token_type == tokenize.NAME:
+                scope = header[3]
+                header = header[:3] + (f"{scope}.{token.string}" if scope is not None else token.string,)
+
+        if token_type == tokenize.OP:
+            if token.string in "([{":
+                paren_depth += 1
+            elif token.string in ")]}":
+                paren_depth -= 1
+            elif token.string == ":" and paren_depth == 0 and header is not None:
+                if lambdas:
+                    lambdas -= 1
+                else:
+                    node_depth, position, body_depth, body_scope = header
+                    if node_depth is not None:
+                        owner = (node_depth, position, body_scope)
+                    header = None
+        elif token_type == tokenize.NAME and token.string == "lambda" and paren_depth == 0 and header is not None:
+            lambdas += 1
+
+    found.sort(key=lambda entry: (entry[0], entry[1]))
+    return [docstring for _, _, docstring in found]
+
+
+def first_line(value: str, lineno: int) -> int:
+    """
+    Args:
+        value: raw value of a docstring literal, before it is cleaned
+        lineno: line of the source the literal starts at
+
+    Returns:
+        line of the source that the first line of the cleaned docstring is on. The leading lines that
+        inspect.cleandoc drops are skipped the way it drops them
+    """
+    lines = value.expandtabs().split("\n")
+    margin = min((len(line) - len(line.lstrip()) for line in lines[1:] if line.lstrip()), default=sys.maxsize)
+    stripped = [lines[0].lstrip()] + [line[margin:] if margin < sys.maxsize else line for line in lines[1:]]
+    blank = 0
+    while blank < len(stripped) - 1 and not stripped[blank]:
+        blank += 1
+    return lineno + blank
+
+
+def _tokens(source: Union[bytes, BinaryIO]) -> Iterator[tokenize.TokenInfo]:
+    readline = io.BytesIO(source).readline if isinstance(source, bytes) else source.readline
+    try:
+        yield from tokenize.tokenize(readline)
+    except tokenize.TokenError as e:
+        raise SyntaxError(e.args[0]) from e
+
+
+def _docstring_value(statement_tokens: List[tokenize.TokenInfo]) -> Optional[Tuple[str, int]]:
+    """
+    Args:
+        statement_tokens: tokens of the first statement of a body, without the NEWLINE or ';' that ends it
+
+    Returns:
+        the cleaned docstring and the line it starts on, if the statement is a plain (possibly parenthesized, implicitly
+        concatenated) string literal. None otherwise
+    """
+    strings = [token for token in statement_tokens if token.type == tokenize.STRING]
+    if not strings:
+        return None
+    for token in statement_tokens:
+        if token.type == tokenize.OP and token.string in "()":
+            continue
+        if token.type != tokenize.STRING:
+            return None
+        prefix = token.string[:token.string.index(token.string[-1])].lower()
+        if "f" in prefix or "b" in prefix:
+            return None
+    try:
+        value = ast.literal_eval(" ".join(token.string for token in statement_tokens))
+    except (ValueError, SyntaxError):
+        return None
+    if not isinstance(value, str):
+        return None
+    return inspect.cleandoc(value), first_line(value, strings[0].start[0])
@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import subprocess
+import tempfile
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .GE_DataDocs_Parser import AnnotationIndex, extract_file_annotations, index_toc, walk_order_key
+from .pathfilter import PathFilter
+from .records import dump_records, load_records
+
+logger = logging.getLogger(__name__)
+
+# bump whenever the layout of the index file changes
+INDEX_VERSION = 4
+
+
+def write_index(index: AnnotationIndex, root: str, index_path: str) -> None:
+    """
+    Atomically writes the annotations of every file of the index, with paths relative to root, in walk order, and its
+    conflict policy
+
+    Args:
+        index: index from build_index or update_index
+        root: PATH the index was built from
+        index_path: file to write the index to
+    """
+    root = os.path.abspath(root)
+    files = [[os.path.relpath(filepath, root).replace(os.sep, "/"), dump_records(annotation_list)]
+             for filepath, annotation_list in index.files.items()]
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(index_path)), suffix=".tmp")
+    with os.fdopen(fd, "w") as indexfile:
+        json.dump({"version": INDEX_VERSION, "on_conflict": index.on_conflict, "files": files}, indexfile)
+    os.replace(tmp_path, index_path)
+
+
+def load_index(index_path: str, root: str) -> AnnotationIndex:
+    """
+    Args:
+        index_path: file written by write_index
+        root: PATH the index was built from
+
+    Returns:
+        the index, with source paths under root and the conflict policy it was written with
+
+    Raises:
+        ValueError: if the file was written by another version
+    """
+    with open(index_path) as indexfile:
+        loaded = json.load(indexfile)
+    if loaded.get("version") != INDEX_VERSION:
+        raise ValueError(f"{index_path} was written by another version, rebuild it with parse --index-out")
+    root = os.path.abspath(root)
+    index = AnnotationIndex(on_conflict=loaded["on_conflict"])
+    for relpath, annotation_list in loaded["files"]:
+        index.add(load_records(annotation_list), os.path.join(root, *relpath.split("/")))
+    return index
+
+
+def git_changed_files(root: str, since: str) -> List[str]:
+    """
+    Args:
+        root: directory inside a git work tree
+        since: revision to compare the work tree against
+
+    Returns:
+        absolute paths of the files under root that differ from since, including deleted and untracked files. A moved
+        file is listed under both its old and its new path
+    """
+    root = os.path.abspath(root)
+    # without --no-renames a moved file is only listed under its new path, and the old one keeps its annotations.
+    # -z keeps paths with unusual characters unquoted
+    changed = _git(root, "diff", "--name-only", "--no-renames", "-z", "--relative", since, "--")
+    untracked = _git(root, "ls-files", "-z", "--others", "--exclude-standard")
+    return [os.path.join(root, *relpath.split("/")) for relpath in dict.fromkeys(changed + untracked)]
+
+
+def _git(root: str, *args: str) -> List[str]:
+    """Runs git with -z output in root and returns the paths it lists"""
+    try:
+        completed = subprocess.run(["git", *args], cwd=root, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"git {' '.join(args)} failed: {e.stderr.strip()}") from e
+    return [path for path in completed.stdout.split("\0") if path]
+
+
+def update_index(index: AnnotationIndex, root: str, changed_files: Iterable[str], engine: str = "ast",
+                 path_filter: Optional[PathFilter] = None,
+                 failed: Optional[List[str]] = None) -> Tuple[AnnotationIndex, int]:
+    """
+    Re-extracts the annotations of the changed files only. Files that no longer exist lose their annotations. The
+    files are merged again in walk order, so the result is the index a full build_index of root would return
+
+    Args:
+        index: previous index of root, from build_index or load_index
+        root: PATH the index was built from
+        changed_files: paths of added, modified or deleted files. Files that a walk of root would not yield are ignored
+        engine: how docstrings are found, one of ENGINES
+        path_filter: which directories and files under root are parsed. None uses the default excludes and .gitignore
+            files. Should be the one index was built with
+        failed: if given, a file that cannot be parsed (e.g. while it is being saved) keeps its previous annotations
+            and is appended to failed, instead of raising
+
+    Returns:
+        the updated index, with the conflict policy of index, and the number of files that were parsed
+
+    Raises:
+        DuplicateAnnotationError: if the conflict policy of index is error and an id is defined more than once
+    """
+    root = os.path.abspath(root)
+    path_filter = path_filter or PathFilter()
+    files = dict(index.files)
+    parsed = 0
+    for filepath in changed_files:
+        filepath = os.path.abspath(filepath)
+        previous = files.pop(filepath, None)
+        if not path_filter.is_selected(root, filepath):
+            continue
+        if not os.path.isfile(filepath):
+            logger.info(f"dropping annotations of deleted file {filepath}")
+            continue
+        parsed += 1
+        try:
+            annotation_list = extract_file_annotations(filepath, engine=engine)
+        except (OSError, SyntaxError, ValueError) as e:
+            if failed is None:
+                raise
+            logger.warning(f"could not parse {filepath}: {e}")
+            failed.append(filepath)
+            annotation_list = previous
+        if annotation_list:
+            files[filepath] = annotation_list
+    updated = AnnotationIndex(on_conflict=index.on_conflict)
+    for filepath in sorted(files, key=lambda filepath: walk_order_key(os.path.relpath(filepath, root))):
+        updated.add(files[filepath], filepath)
+    updated.check()
+    return updated, parsed
+
+
+def patch_grid(grid: List[Dict], previous: AnnotationIndex, updated: AnnotationIndex) -> Set[str]:
+    """
+    Replaces the cases of a previously written grid whose annotation changed between two indexes. A case whose
+    annotation was removed goes back to a plain TOC case, which only holds the id
+
+    Args:
+        grid: loaded Feature Maturity Grid JSON, modified in place
+        previous: index the grid was built from
+        updated: index to bring the grid up to date with
+
+    Returns:
+        ids of the cases that were patched
+    """
+    patched_ids = set()
+    for case_id, positions in index_toc(grid).items():
+        annotation = updated.get(case_id)
+        if annotation == previous.get(case_id):
+            continue
+        for section_index, feature_index, case_index in positions:
+            grid[section_index]["section_features"][feature_index]["cases"][case_index] = \
+                annotation if annotation is not None else {"id": case_id}
+        patched_ids.add(case_id)
+    return patched_ids
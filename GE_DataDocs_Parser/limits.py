@@ -0,0 +1,61 @@
+from typing import Optional
+
+from .defaults import OVERSIZE_POLICIES
+
+# bytes of memory that parsing a file takes per byte of its source, by engine. A syntax tree takes 60 to 120 times the
+# size of its source (see benchmarks/bench_memory.py); the tokenize engine holds the mapped file and one copy of it
+PARSE_MEMORY_FACTORS = {"ast": 128, "tokenize": 2}
+
+
+class MemoryLimits:
+    """
+    Bounds on the memory that parsing a tree takes, which otherwise grows with its largest file. Files over the size
+    limit are not parsed like the others but handled by the oversize policy, one at a time in the parsing process, and
+    never read ahead, so with a limit the peak memory of a build does not depend on the size of the largest file.
+
+    The limit is max_file_size, or the size of the largest file whose parse fits in the budget with the engine it is
+    parsed with, whichever is smaller. The budget also caps the number of files read ahead, so that they fit in it too.
+    With several workers, each worker process keeps to the limits on its own.
+    """
+
+    def __init__(self, max_file_size: Optional[int] = None, oversize: str = "scan", budget: Optional[int] = None):
+        """
+        Args:
+            max_file_size: size in bytes over which a file is oversize. None for no limit
+            oversize: one of OVERSIZE_POLICIES. scan finds the docstrings of oversize files with the tokenize scanner
+                reading them line by line, skip leaves them out of the index with a warning
+            budget: memory in bytes that parsing one file may take, and that the files read ahead may take. None for no
+                budget
+        """
+        if oversize not in OVERSIZE_POLICIES:
+            raise ValueError(f"oversize must be one of {', '.join(OVERSIZE_POLICIES)}, not {oversize}")
+        self.max_file_size = max_file_size
+        self.oversize = oversize
+        self.budget = budget
+
+    def file_size_limit(self, engine: str) -> Optional[int]:
+        """
+        Args:
+            engine: how docstrings are found, one of ENGINES
+
+        Returns:
+            size in bytes over which a file is oversize, None for no limit
+        """
+        limits = [] if self.max_file_size is None else [self.max_file_size]
+        if self.budget is not None:
+            limits.append(max(1, self.budget // PARSE_MEMORY_FACTORS[engine]))
+        return min(limits, default=None)
+
+    def read_ahead(self, read_ahead: int, engine: str) -> int:
+        """
+        Args:
+            read_ahead: number of files to read ahead of the parser
+            engine: how docstrings are found, one of ENGINES
+
+        Returns:
+            read_ahead, lowered so that that many files of at most the size limit fit in the budget
+        """
+        limit = self.file_size_limit(engine)
+        if self.budget is None or limit is None or read_ahead == 0:
+            return read_ahead
+        return min(read_ahead, max(1, self.budget // limit))
@@ -0,0 +1,345 @@
+import csv
+import html
+import io
+import json
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Sequence, TextIO, Tuple
+
+from .records import FeatureAnnotation, to_json
+
+# size of the chunks handed to fp.write, so a large grid is written in a few thousand calls instead of one per token.
+# The renderers fed by one render_grid call share it, so writing several formats buffers no more than writing one
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# maturity details in the order the tabular formats show them, with their column titles
+MATURITY_DETAIL_COLUMNS = (
+    ("api_stability", "API stability"),
+    ("implementation_completeness", "Implementation completeness"),
+    ("unit_test_coverage", "Unit test coverage"),
+    ("integration_infrastructure_test_coverage", "Integration infrastructure test coverage"),
+    ("documentation_completeness", "Documentation completeness"),
+    ("bug_risk", "Bug risk"),
+)
+
+# annotation fields written as CSV columns after the section and feature, followed by the maturity details
+CSV_CASE_FIELDS = ("id", "title", "maturity", "short_description", "description", "how_to_guide_url", "icon")
+
+
+class Renderer:
+    """
+    Writes the merged grid in one format while render_grid walks it. render_grid calls begin, then begin_section,
+    begin_feature, case for every case of the feature, end_feature, and end_section for every section in TOC order, then
+    end. Every call gets the loaded TOC objects it is about, and case gets the annotation merged in, so a renderer keeps
+    no copy of the grid
+    """
+
+    def __init__(self, fp: TextIO):
+        self._out = _ChunkWriter(fp)
+
+    def begin(self) -> None:
+        pass
+
+    def begin_section(self, section: Dict) -> None:
+        pass
+
+    def begin_feature(self, section: Dict, feature: Dict) -> None:
+        pass
+
+    def case(self, section: Dict, feature: Dict, case: Mapping) -> None:
+        pass
+
+    def end_feature(self, section: Dict, feature: Dict) -> None:
+        pass
+
+    def end_section(self, section: Dict) -> None:
+        pass
+
+    def end(self) -> None:
+        self._out.flush()
+
+
+class JsonRenderer(Renderer):
+    """
+    The Feature Maturity Grid JSON. With indent=2 the output is byte-identical to json.dump(merge(...), fp, indent=2)
+    """
+
+    def __init__(self, fp: TextIO, indent: Optional[int] = 2):
+        """
+        Args:
+            fp: text file to write to
+            indent: indentation of the JSON, None for compact JSON without whitespace
+        """
+        super().__init__(fp)
+        self._indent = indent
+        self._key_separator = ": " if indent is not None else ":"
+        # annotation records are converted to dicts as they are encoded, one case at a time
+        self._encode = json.JSONEncoder(indent=indent, separators=(",", self._key_separator), default=to_json).encode
+        self._items = [0, 0, 0]  # items written so far to the open sections, features and cases arrays
+        self._section_rest: List[Tuple[str, object]] = []  # keys of the open section after section_features
+        self._feature_rest: List[Tuple[str, object]] = []  # keys of the open feature after cases
+
+    def begin(self) -> None:
+        self._items[0] = 0
+
+    def begin_section(self, section: Dict) -> None:
+        self._open_item(0, 0)
+        self._section_rest = self._open_object(section, 1, "section_features")
+        self._items[1] = 0
+
+    def begin_feature(self, section: Dict, feature: Dict) -> None:
+        self._open_item(1, 2)
+        self._feature_rest = self._open_object(feature, 3, "cases")
+        self._items[2] = 0
+
+    def case(self, section: Dict, feature: Dict, case: Mapping) -> None:
+        self._open_item(2, 4)
+        self._out.write(self._encode_value(case, 5))
+
+    def end_feature(self, section: Dict, feature: Dict) -> None:
+        self._close_array(2, 4)
+        self._close_object(self._feature_rest, 3)
+
+    def end_section(self, section: Dict) -> None:
+        self._close_array(1, 2)
+        self._close_object(self._section_rest, 1)
+
+    def end(self) -> None:
+        self._close_array(0, 0)
+        super().end()
+
+    def _newline(self, level: int) -> str:
+        return "\n" + " " * (self._indent * level) if self._indent is not None else ""
+
+    def _encode_value(self, value, level: int) -> str:
+        # the encoder indents nested values as if they were at the top level; shift them to where they are written
+        encoded = self._encode(value)
+        return encoded.replace("\n", self._newline(level)) if self._indent is not None else encoded
+
+    def _open_item(self, depth: int, level: int) -> None:
+        self._out.write(("[" if self._items[depth] == 0 else ",") + self._newline(level + 1))
+        self._items[depth] += 1
+
+    def _close_array(self, depth: int, level: int) -> None:
+        self._out.write("[]" if self._items[depth] == 0 else self._newline(level) + "]")
+
+    def _open_object(self, value: Dict, level: int, nested_key: str) -> List[Tuple[str, object]]:
+        """Writes the keys of value up to nested_key, whose array the following calls fill, and returns the rest"""
+        items = list(value.items())
+        separator = "{"
+        for position, (key, item) in enumerate(items):
+            self._out.write(separator + self._newline(level + 1) + self._encode(key) + self._key_separator)
+            if key == nested_key:
+                return items[position + 1:]
+            self._out.write(self._encode_value(item, level + 1))
+            separator = ","
+        raise KeyError(nested_key)
+
+    def _close_object(self, rest: List[Tuple[str, object]], level: int) -> None:
+        for key, item in rest:
+            self._out.write("," + self._newline(level + 1) + self._encode(key) + self._key_separator +
+                            self._encode_value(item, level + 1))
+        self._out.write(self._newline(level) + "}")
+
+
+class NdjsonRenderer(Renderer):
+    """
+    One merged case per line, along with the section and feature it belongs to, so consumers can process cases as soon
+    as they are written
+    """
+
+    def __init__(self, fp: TextIO):
+        super().__init__(fp)
+        self._encode = json.JSONEncoder(separators=(",", ":"), default=to_json).encode
+
+    def case(self, section: Dict, feature: Dict, case: Mapping) -> None:
+        self._out.write(self._encode({"section_title": section.get("section_title"), "feature_id": feature.get("id"),
+                                      "case": case}) + "\n")
+
+
+class CsvRenderer(Renderer):
+    """
+    One row per case with its section and feature, the annotation fields of CSV_CASE_FIELDS and the maturity details.
+    Cases without an annotation only have their id filled in
+    """
+
+    def __init__(self, fp: TextIO):
+        super().__init__(fp)
+        self._writer = csv.writer(self._out, lineterminator="\n")
+
+    def begin(self) -> None:
+        self._writer.writerow(["section_title", "feature_id", "feature_title", *CSV_CASE_FIELDS,
+                               *(field for field, _ in MATURITY_DETAIL_COLUMNS)])
+
+    def case(self, section: Dict, feature: Dict, case: Mapping) -> None:
+        details = case.get("maturity_details") or {}
+        self._writer.writerow([section.get("section_title", ""), feature.get("id", ""), feature.get("title", ""),
+                               *(case.get(field, "") for field in CSV_CASE_FIELDS),
+                               *(details.get(field, "") for field, _ in MATURITY_DETAIL_COLUMNS)])
+
+
+class MarkdownRenderer(Renderer):
+    """
+    A heading per section and feature, and a table of the maturity of the cases of every feature
+    """
+
+    def begin_section(self, section: Dict) -> None:
+        self._out.write(f"## {_markdown_text(section.get('section_title', ''))}\n\n")
+
+    def begin_feature(self, section: Dict, feature: Dict) -> None:
+        self._out.write(f"### {_markdown_text(feature.get('title') or feature.get('id', ''))}\n\n")
+        if feature.get("description"):
+            self._out.write(f"{_markdown_text(feature['description'])}\n\n")
+        self._out.write("| Case | Maturity | " + " | ".join(title for _, title in MATURITY_DETAIL_COLUMNS) + " |\n")
+        self._out.write("|---" * (len(MATURITY_DETAIL_COLUMNS) + 2) + "|\n")
+
+    def case(self, section: Dict, feature: Dict, case: Mapping) -> None:
+        title = _markdown_cell(case.get("title") or case["id"])
+        if case.get("how_to_guide_url"):
+            title = f"[{title}]({case['how_to_guide_url']})"
+        details = case.get("maturity_details") or {}
+        cells = [title, case.get("maturity", ""), *(details.get(field, "") for field, _ in MATURITY_DETAIL_COLUMNS)]
+        self._out.write("| " + " | ".join(_markdown_cell(cell) if position else cell
+                                           for position, cell in enumerate(cells)) + " |\n")
+
+    def end_feature(self, section: Dict, feature: Dict) -> None:
+        self._out.write("\n")
+
+
+class HtmlRenderer(Renderer):
+    """
+    A standalone HTML page with a heading per section and feature, and a table of the maturity of the cases of every
+    feature
+    """
+
+    def begin(self) -> None:
+        self._out.write('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>Feature Maturity Grid</title>\n'
+                        '</head>\n<body>\n')
+
+    def begin_section(self, section: Dict) -> None:
+        self._out.write(f"<h2>{html.escape(section.get('section_title', ''))}</h2>\n")
+
+    def begin_feature(self, section: Dict, feature: Dict) -> None:
+        self._out.write(f"<h3 id=\"{html.escape(feature.get('id', ''))}\">"
+                        f"{html.escape(feature.get('title') or feature.get('id', ''))}</h3>\n")
+        if feature.get("description"):
+            self._out.write(f"<p>{html.escape(feature['description'])}</p>\n")
+        self._out.write("<table>\n<thead>\n<tr><th>Case</th><th>Maturity</th>" +
+                        "".join(f"<th>{title}</th>" for _, title in MATURITY_DETAIL_COLUMNS) +
+                        "</tr>\n</thead>\n<tbody>\n")
+
+    def case(self, section: Dict, feature: Dict, case: Mapping) -> None:
+        title = html.escape(case.get("title") or case["id"])
+        if case.get("how_to_guide_url"):
+            title = f"<a href=\"{html.escape(case['how_to_guide_url'])}\">{title}</a>"
+        details = case.get("maturity_details") or {}
+        cells = [case.get("maturity", ""), *(details.get(field, "") for field, _ in MATURITY_DETAIL_COLUMNS)]
+        self._out.write(f"<tr id=\"{html.escape(case['id'])}\"><td>{title}</td>" +
+                        "".join(f"<td>{html.escape(str(cell))}</td>" for cell in cells) + "</tr>\n")
+
+    def end_feature(self, section: Dict, feature: Dict) -> None:
+        self._out.write("</tbody>\n</table>\n")
+
+    def end(self) -> None:
+        self._out.write("</body>\n</html>\n")
+        super().end()
+
+
+# renderer and file extension of every one of OUTPUT_FORMATS
+RENDERERS = {
+    "json": (JsonRenderer, ".json"),
+    "ndjson": (NdjsonRenderer, ".ndjson"),
+    "csv": (CsvRenderer, ".csv"),
+    "markdown": (MarkdownRenderer, ".md"),
+    "html": (HtmlRenderer, ".html"),
+}
+
+
+def render_grid(loaded_json: List[Dict], annotations: Mapping, renderers: Sequence[Renderer]) -> None:
+    """
+    Merges annotations into the TOC and feeds the merged grid to every renderer in a single pass. Every case is looked
+    up and converted to a dict once for all renderers, and neither the merged grid nor any serialized output is built
+    in memory
+
+    Args:
+        loaded_json: loaded TOC JSON, not modified
+        annotations: annotations by id
+        renderers: renderers to feed, each writing its own file
+    """
+    for renderer in renderers:
+        renderer._out.buffer_size = WRITE_BUFFER_SIZE // len(renderers)
+        renderer.begin()
+    for section in loaded_json:
+        for renderer in renderers:
+            renderer.begin_section(section)
+        for feature in section["section_features"]:
+            for renderer in renderers:
+                renderer.begin_feature(section, feature)
+            for case in feature["cases"]:
+                merged = annotations.get(case["id"], case)
+                if type(merged) is FeatureAnnotation:
+                    merged = merged.to_dict()
+                for renderer in renderers:
+                    renderer.case(section, feature, merged)
+            for renderer in renderers:
+                renderer.end_feature(section, feature)
+        for renderer in renderers:
+            renderer.end_section(section)
+    for renderer in renderers:
+        renderer.end()
+
+
+def write_grid(loaded_json: List[Dict], annotations: Mapping, fp: TextIO, indent: Optional[int] = 2) -> None:
+    """
+    Writes the Feature Maturity Grid JSON while merging annotations into the TOC, without building the merged grid or
+    its serialized string in memory. With indent=2 the output is byte-identical to json.dump(merge(...), fp, indent=2)
+
+    Args:
+        loaded_json: loaded TOC JSON, not modified
+        annotations: annotations by id
+        fp: text file to write to
+        indent: indentation of the JSON, None for compact JSON without whitespace
+    """
+    render_grid(loaded_json, annotations, [JsonRenderer(fp, indent)])
+
+
+def grid_string(loaded_json: List[Dict], annotations: Mapping, indent: Optional[int] = 2) -> str:
+    """
+    Returns:
+        the Feature Maturity Grid JSON that write_grid writes, as a string
+    """
+    buffer = io.StringIO()
+    write_grid(loaded_json, annotations, buffer, indent)
+    return buffer.getvalue()
+
+
+class _ChunkWriter:
+    """
+    Collects the small strings a renderer writes and hands them to the file in WRITE_BUFFER_SIZE chunks, so a large grid
+    is written in a few thousand calls instead of one per token
+    """
+
+    def __init__(self, fp: TextIO):
+        self._fp = fp
+        self.buffer_size = WRITE_BUFFER_SIZE
+        self._buffer: List[str] = []
+        self._buffered = 0
+
+    def write(self, chunk: str) -> None:
+        self._buffer.append(chunk)
+        self._buffered += len(chunk)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self._fp.write("".join(self._buffer))
+        self._buffer.clear()
+        self._buffered = 0
+
+
+def _markdown_text(text: str) -> str:
+    # headings and paragraphs are one line each
+    return " ".join(str(text).split())
+
+
+def _markdown_cell(text: str) -> str:
+    return _markdown_text(text).replace("|", "\\|")
@@ -0,0 +1,232 @@
+import os
+import re
+import zlib
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+# directories that never hold the sources to annotate, skipped unless default_excludes is off. Virtualenvs are
+# recognised by their pyvenv.cfg wherever they are, whatever their name
+DEFAULT_EXCLUDES = (".git/", ".hg/", ".svn/", ".tox/", ".nox/", ".eggs/", "*.egg-info/", "__pycache__/", ".mypy_cache/",
+                    ".pytest_cache/", "node_modules/", "build/", "dist/", ".venv/", "venv/")
+
+IGNORE_FILENAME = ".gitignore"
+
+VIRTUALENV_MARKER = "pyvenv.cfg"
+
+
+class _Rule(NamedTuple):
+    regex: Pattern
+    negate: bool
+    dir_only: bool
+
+
+class PathFilter:
+    """
+    Decides which directories are descended into and which .py files are parsed. Patterns use .gitignore syntax: a
+    pattern without a slash matches a name at any depth, a pattern with one is relative to PATH (or to the directory of
+    the .gitignore it comes from), a trailing slash only matches directories, ** matches across directories and ! re-
+    includes. When several patterns match, the last one wins; the default excludes come first, then the .gitignore files
+    from the outermost to the innermost, then the ignore files and the exclude patterns.
+
+    Excluded directories are pruned before they are listed, so nothing below them is stat'ed.
+
+    With a shard, only the files of one of several hash partitions are selected, so a tree can be parsed by several
+    processes or hosts that each walk it with a different shard.
+    """
+
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = (), ignore_files: Iterable[str] = (),
+                 default_excludes: bool = True, gitignore: bool = True, shard: Optional[Tuple[int, int]] = None):
+        """
+        Args:
+            include: patterns of the .py files to parse. Every .py file is parsed if there are none
+            exclude: patterns of the files and directories to skip
+            ignore_files: files of .gitignore-style patterns, relative to PATH, of the files and directories to skip
+            default_excludes: whether to skip DEFAULT_EXCLUDES and virtualenvs
+            gitignore: whether to read the .gitignore files under PATH
+            shard: (index, count) to only select the files that shard_of puts in shard index of count, index counting
+                from 1. None selects every file
+        """
+        self.default_excludes = default_excludes
+        self.gitignore = gitignore
+        self.shard = shard
+        self._include = _compile_rules(include)
+        self._default_rules = _compile_rules(DEFAULT_EXCLUDES) if default_excludes else []
+        self._rules: List[_Rule] = []
+        for ignore_file in ignore_files:
+            self._rules.extend(_load_rules(ignore_file))
+        self._rules.extend(_compile_rules(exclude))
+
+    def walk(self, root: str) -> Iterator[str]:
+        """
+        Args:
+            root: directory to walk
+
+        Returns:
+            Iterator of paths to the .py files to parse, files of a directory in sorted order before its sorted
+            subdirectories, as os.walk with sorted dirs and files would yield them. Symlinked directories are not
+            followed
+        """
+        return self._walk(root, "", [])
+
+    def _walk(self, dirpath: str, relpath: str, gitignores: List[Tuple[str, List[_Rule]]]) -> Iterator[str]:
+        try:
+            with os.scandir(dirpath) as scanned:
+                entries = sorted(scanned, key=lambda entry: entry.name)
+        except OSError:  # unreadable or removed while walking, like os.walk
+            return
+        names = {entry.name for entry in entries}
+        if relpath and self.default_excludes and VIRTUALENV_MARKER in names:
+            return
+        if self.gitignore and IGNORE_FILENAME in names:
+            gitignores = gitignores + [(relpath, _load_rules(os.path.join(dirpath, IGNORE_FILENAME)))]
+        subdirs = []
+        for entry in entries:
+            entry_relpath = f"{relpath}/{entry.name}" if relpath else entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if not entry.is_symlink() and not self._excluded(entry_relpath, True, gitignores):
+                    subdirs.append((entry.path, entry_relpath))
+            elif entry.name.endswith(".py") and self._selected(entry_relpath, gitignores):
+                yield entry.path
+        for subdir_path, subdir_relpath in subdirs:
+            yield from self._walk(subdir_path, subdir_relpath, gitignores)
+
+    def is_selected(self, root: str, filepath: str) -> bool:
+        """
+        Checks a single file, and every directory between root and the file, without walking root
+
+        Args:
+            root: directory the file would be found under by walk
+            filepath: path to the file, which need not exist
+
+        Returns:
+            True if walk(root) would yield filepath if it existed
+        """
+        relpath = os.path.relpath(os.path.abspath(filepath), os.path.abspath(root)).replace(os.sep, "/")
+        parts = relpath.split("/")
+        if parts[0] in ("..", ".") or not relpath.endswith(".py"):
+            return False
+        gitignores = []
+        dirpath = root
+        for depth, part in enumerate(parts):
+            if self.gitignore and os.path.isfile(os.path.join(dirpath, IGNORE_FILENAME)):
+                gitignores.append(("/".join(parts[:depth]), _load_rules(os.path.join(dirpath, IGNORE_FILENAME))))
+            if depth == len(parts) - 1:
+                break
+            dirpath = os.path.join(dirpath, part)
+            if self._excluded("/".join(parts[:depth + 1]), True, gitignores):
+                return False
+            if self.default_excludes and os.path.isfile(os.path.join(dirpath, VIRTUALENV_MARKER)):
+                return False
+        return self._selected(relpath, gitignores)
+
+    def _selected(self, relpath: str, gitignores: List[Tuple[str, List[_Rule]]]) -> bool:
+        if self.shard is not None and shard_of(relpath, self.shard[1]) != self.shard[0]:
+            return False
+        if self._excluded(relpath, False, gitignores):
+            return False
+        return not self._include or bool(_match(self._include, relpath, False))
+
+    def _excluded(self, relpath: str, is_dir: bool, gitignores: List[Tuple[str, List[_Rule]]]) -> bool:
+        excluded = _match(self._default_rules, relpath, is_dir)
+        for base, rules in gitignores:
+            if not base:
+                matched = _match(rules, relpath, is_dir)
+            elif relpath.startswith(base + "/"):
+                matched = _match(rules, relpath[len(base) + 1:], is_dir)
+            else:
+                continue
+            if matched is not None:
+                excluded = matched
+        matched = _match(self._rules, relpath, is_dir)
+        if matched is not None:
+            excluded = matched
+        return bool(excluded)
+
+
+def shard_of(relpath: str, count: int) -> int:
+    """
+    Args:
+        relpath: path of a file relative to PATH, with / separators
+        count: number of shards
+
+    Returns:
+        the shard, from 1 to count, the file belongs to. It only depends on relpath, so it is the same on every host and
+        for every checkout location
+    """
+    return zlib.crc32(relpath.encode()) % count + 1
+
+
+def _match(rules: List[_Rule], relpath: str, is_dir: bool) -> Optional[bool]:
+    """
+    Returns:
+        whether the last rule that matches relpath excludes it, None if no rule matches
+    """
+    matched = None
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        if rule.regex.match(relpath):
+            matched = not rule.negate
+    return matched
+
+
+def _load_rules(ignore_file: str) -> List[_Rule]:
+    with open(ignore_file) as patterns:
+        return _compile_rules(patterns)
+
+
+def _compile_rules(patterns: Iterable[str]) -> List[_Rule]:
+    rules = []
+    for pattern in patterns:
+        pattern = pattern.rstrip("\n").rstrip()
+        if not pattern or pattern.startswith("#"):
+            continue
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        elif pattern.startswith("\\"):  # escaped leading ! or #
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        regex = _glob_regex(pattern.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        rules.append(_Rule(re.compile(regex + r"\Z"), negate, dir_only))
+    return rules
+
+
+def _glob_regex(pattern: str) -> str:
+    parts = []
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        if pattern.startswith("**/", position):
+            parts.append("(?:.*/)?")
+            position += 3
+        elif pattern.startswith("**", position):
+            parts.append(".*")
+            position += 2
+        elif char == "*":
+            parts.append("[^/]*")
+            position += 1
+        elif char == "?":
+            parts.append("[^/]")
+            position += 1
+        elif char == "[" and pattern.find("]", position + 2) != -1:
+            end = pattern.find("]", position + 2)
+            chars = pattern[position + 1:end]
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            parts.append("[" + chars.replace("\\", "\\\\") + "]")
+            position = end + 1
+        elif char == "\\" and position + 1 < len(pattern):
+            parts.append(re.escape(pattern[position + 1]))
+            position += 2
+        else:
+            parts.append(re.escape(char))
+            position += 1
+    return "".join(parts)
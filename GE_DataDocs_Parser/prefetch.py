@@ -0,0 +1,40 @@
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Iterable, Iterator
+
+from .defaults import DEFAULT_READ_AHEAD, DEFAULT_READ_THREADS
+
+
+def prefetch_files(filepaths: Iterable[str], read_ahead: int = DEFAULT_READ_AHEAD,
+                   read_threads: int = DEFAULT_READ_THREADS) -> Iterator[bytes]:
+    """
+    Reads files on a pool of threads, up to read_ahead files ahead of the consumer, so that the latency of each read is
+    hidden behind the parsing of the files before it. At most read_ahead files are held in memory at once
+
+    Args:
+        filepaths: files to read
+        read_ahead: maximum number of files read but not consumed yet, at least 1
+        read_threads: number of threads reading files concurrently
+
+    Returns:
+        Iterator of the contents of the files, in the order of filepaths. A file that cannot be read raises its OSError
+        when its turn comes
+    """
+    filepaths = iter(filepaths)
+    executor = ThreadPoolExecutor(max_workers=read_threads, thread_name_prefix="GE_parse-reader")
+    try:
+        pending: Deque = deque(executor.submit(_read_file, filepath)
+                               for filepath in itertools.islice(filepaths, max(1, read_ahead)))
+        while pending:
+            source = pending.popleft().result()
+            for filepath in itertools.islice(filepaths, 1):
+                pending.append(executor.submit(_read_file, filepath))
+            yield source
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _read_file(filepath: str) -> bytes:
+    with open(filepath, "rb") as srcfile:
+        return srcfile.read()
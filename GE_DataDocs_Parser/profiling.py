@@ -0,0 +1,96 @@
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# per-file stages recorded by extract_file_annotations, in pipeline order
+FILE_STAGES = ("read_wait", "read_and_prefilter", "ast_parse", "walk_tree", "scan_docstrings", "parse_feature_annotation")
+
+
+class Profile:
+    """
+    Counts and timings of the stages of one run, filled in by build_index and the CLI when --profile is given.
+
+    Without a Profile the pipeline runs the uninstrumented code paths and only pays a None check per stage and per
+    docstring. Per-file timings are measured where the file is parsed, in the worker process if there is one, and sent
+    back with its annotations, so with several workers the per-file stages add up to more than the wall-clock time.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}  # stage -> [count, cumulative seconds]
+        self.files: List[Tuple[float, int, str]] = []  # (seconds, bytes, filepath) of every file that was read
+        self.bytes_read = 0
+
+    def add(self, name: str, seconds: float, count: int = 1) -> None:
+        """
+        Args:
+            name: stage name
+            seconds: time spent in the stage
+            count: number of items (files, docstrings, ...) the stage processed in that time
+        """
+        stage = self.stages.setdefault(name, [0, 0.0])
+        stage[0] += count
+        stage[1] += seconds
+
+    @contextmanager
+    def stage(self, name: str, count: int = 1) -> Iterator[None]:
+        started = time.perf_counter()
+        yield
+        self.add(name, time.perf_counter() - started, count)
+
+    def add_file(self, filepath: str, timings: Dict[str, float]) -> None:
+        """
+        Args:
+            filepath: path to the parsed .py file
+            timings: per-file timings from extract_file_annotations
+        """
+        self.bytes_read += timings["bytes"]
+        self.files.append((timings["total"], timings["bytes"], filepath))
+        for name in FILE_STAGES:
+            if name in timings:
+                self.add(name, timings[name], timings.get("docstrings", 1) if name == "parse_feature_annotation" else 1)
+
+    def slowest_files(self, top: int = 10) -> List[Tuple[float, int, str]]:
+        return sorted(self.files, reverse=True)[:top]
+
+    def to_dict(self, top: int = 20) -> Dict:
+        return {
+            "stages": {name: {"count": count, "seconds": seconds} for name, (count, seconds) in self.stages.items()},
+            "files_read": len(self.files),
+            "bytes_read": self.bytes_read,
+            "slowest_files": [{"filepath": filepath, "seconds": seconds, "bytes": size}
+                              for seconds, size, filepath in self.slowest_files(top)],
+        }
+
+    def format_summary(self, top: int = 10) -> str:
+        lines = [f"{'stage':<28}{'count':>10}{'seconds':>12}"]
+        for name, (count, seconds) in self.stages.items():
+            lines.append(f"{name:<28}{count:>10}{seconds:>12.4f}")
+        lines.append(f"{len(self.files)} files read, {self.bytes_read} bytes")
+        if self.files:
+            lines.append("slowest files:")
+            for seconds, size, filepath in self.slowest_files(top):
+                lines.append(f"{seconds:>12.4f}s {size:>10} bytes  {filepath}")
+        return "\n".join(lines)
+
+
+def peak_rss() -> Optional[Tuple[int, int]]:
+    """
+    Returns:
+        peak resident set size in bytes of this process, and of the largest of its child processes that have finished
+        (the worker processes of a parse, 0 if there were none). None where the resource module is not available
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    try:
+        # on Linux ru_maxrss also counts the process this one was forked from, until the exec. The high-water mark of
+        # its address space does not
+        with open("/proc/self/status") as status:
+            own = next(int(line.split()[1]) * 1024 for line in status if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        pass
+    return own, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
@@ -0,0 +1,140 @@
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# fields whose values come from a small fixed vocabulary (Production, Beta, Stable, Low, ...). Their values are
+# interned, so every annotation shares one string per distinct value
+ENUM_FIELDS = frozenset(["maturity"])
+
+# key tuples shared by all records with the same fields in the same order, which is nearly all of them
+_layouts: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _layout(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    layout = _layouts.get(keys)
+    if layout is None:
+        layout = tuple(sys.intern(key) for key in keys)
+        _layouts[layout] = layout
+    return layout
+
+
+class _Record(Mapping):
+    """
+    Read-only mapping stored as a shared tuple of keys and a tuple of values, in the order the fields were written in
+    the docstring, so a record takes a fraction of the memory of the dict it replaces and converts back to an equal
+    dict with the same key order
+    """
+    __slots__ = ("_keys", "_values")
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):  # slots that are not set yet, e.g. while unpickling
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __reduce__(self):
+        # pickled as a dict, so the keys and values are shared again in the process that unpickles it
+        return type(self), (self.to_dict(),)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self._keys, self._values))
+
+
+class MaturityDetails(_Record):
+    """
+    The maturity_details of an annotation: api_stability, implementation_completeness, unit_test_coverage,
+    integration_infrastructure_test_coverage, documentation_completeness and bug_risk, or whichever of them are given.
+    All of them take their values from a small vocabulary, so all values are interned
+    """
+    __slots__ = ()
+
+    def __init__(self, fields: Mapping):
+        self._keys = _layout(tuple(fields))
+        try:
+            self._values = tuple(map(sys.intern, fields.values()))
+        except TypeError:  # not all values are strings
+            self._values = tuple([sys.intern(value) if type(value) is str else value for value in fields.values()])
+
+
+class FeatureAnnotation(_Record):
+    """
+    One annotation block: id, title, icon, short_description, description, how_to_guide_url, maturity and any other
+    field of the block, with maturity_details as MaturityDetails. Fields can be read as keys or attributes.
+
+    line, the line of the source file the block starts at, and scope, the dotted names of the classes and functions
+    whose docstring holds the block (None for the module docstring), are not fields: they are not compared and not
+    written to the grid. Scopes are interned, so the annotations of one class share one string
+    """
+    __slots__ = ("line", "scope")
+
+    def __init__(self, fields: Mapping, line: Optional[int] = None, scope: Optional[str] = None):
+        self.line = line
+        self.scope = sys.intern(scope) if scope is not None else None
+        self._keys = keys = _layout(tuple(fields))
+        values = list(fields.values())
+        for field in ENUM_FIELDS:
+            value = fields.get(field)
+            if type(value) is str:
+                values[keys.index(field)] = sys.intern(value)
+        details = fields.get("maturity_details")
+        if details is not None and type(details) is not MaturityDetails:
+            values[keys.index("maturity_details")] = MaturityDetails(details)
+        self._values = tuple(values)
+
+    def __reduce__(self):
+        return type(self), (self.to_dict(), self.line, self.scope)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: value.to_dict() if isinstance(value, MaturityDetails) else value
+                for key, value in zip(self._keys, self._values)}
+
+
+def to_json(value: Any) -> Any:
+    """
+    default hook of the JSON encoders, which converts records to dicts when they are written
+
+    Raises:
+        TypeError: for any other object that JSON cannot encode
+    """
+    if isinstance(value, _Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_records(annotations: List[FeatureAnnotation]) -> List[List]:
+    """
+    Args:
+        annotations: annotation list of one file
+
+    Returns:
+        JSON-serializable [line, scope, fields] triples, read back by load_records
+    """
+    return [[annotation.line, annotation.scope, annotation.to_dict()] for annotation in annotations]
+
+
+def load_records(dumped: List[List]) -> List[FeatureAnnotation]:
+    """
+    Args:
+        dumped: output of dump_records, e.g. loaded from JSON
+
+    Returns:
+        the annotations as FeatureAnnotation records, in order
+    """
+    return [FeatureAnnotation(fields, line, scope) for line, scope, fields in dumped]
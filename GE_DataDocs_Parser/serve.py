@@ -0,0 +1,329 @@
+import json
+import logging
+import os
+import socketserver
+import stat
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .GE_DataDocs_Parser import AnnotationIndex, BuildOptions, build_unchecked_index
+from .cache import AnnotationCache
+from .defaults import DEFAULT_PORT
+from .incremental import update_index
+from .output import grid_string
+from .pathfilter import PathFilter
+from .watch import stat_file
+
+logger = logging.getLogger(__name__)
+
+# request latencies kept per endpoint for the percentiles in the stats
+LATENCY_WINDOW = 1000
+
+
+class RootNotServedError(LookupError):
+    """
+    Raised when a request names a root that is not served, or names none while several are
+    """
+
+
+class WarmIndex:
+    """
+    Annotation index of one root that is kept in memory and brought up to date before it is used. The tree is polled
+    with os.stat, as AnnotationWatcher does, and only the files whose mtime or size changed are parsed again
+    """
+
+    def __init__(self, root: str, cache: Optional[AnnotationCache] = None, options: Optional[BuildOptions] = None):
+        options = options or BuildOptions()
+        self.root = os.path.abspath(root)
+        self.engine = options.engine
+        self.path_filter = options.path_filter or PathFilter()
+        self.refreshes = 0
+        self.unchanged_refreshes = 0
+        self.reparsed_files = 0
+        self.parse_errors = 0
+        self._lock = threading.Lock()
+        # stat before parsing, so a file saved during the build is parsed again on the first refresh
+        self._stats = self._stat_files()
+        self._index, _ = build_unchecked_index(self.root, cache, options._replace(path_filter=self.path_filter))
+
+    def refresh(self) -> AnnotationIndex:
+        """
+        Re-parses the files that were added, changed or removed since the last refresh. Concurrent callers wait for one
+        refresh instead of each walking the tree
+
+        Returns:
+            the up-to-date index. It is not modified afterwards, so it can be used while later refreshes replace it
+        """
+        with self._lock:
+            stats = self._stat_files()
+            changed = [filepath for filepath, stat in stats.items() if self._stats.get(filepath) != stat]
+            changed.extend(filepath for filepath in self._stats if filepath not in stats)
+            self.refreshes += 1
+            if not changed:
+                self.unchanged_refreshes += 1
+                return self._index
+            failed: List[str] = []
+            self._index, parsed = update_index(self._index, self.root, changed, engine=self.engine,
+                                               path_filter=self.path_filter, failed=failed)
+            for filepath in failed:  # parsed again on the next refresh
+                stats[filepath] = None
+            self._stats = stats
+            self.reparsed_files += parsed
+            self.parse_errors += len(failed)
+            return self._index
+
+    def stats(self) -> Dict:
+        return {"files": len(self._stats), "annotations": len(self._index), "refreshes": self.refreshes,
+                "unchanged_refreshes": self.unchanged_refreshes, "reparsed_files": self.reparsed_files,
+                "parse_errors": self.parse_errors}
+
+    def _stat_files(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        return {filepath: stat_file(filepath) for filepath in self.path_filter.walk(self.root)}
+
+
+class AnnotationService:
+    """
+    Warm indexes of one or more roots, and the build and merge requests answered from them. Safe to call from several
+    threads
+    """
+
+    def __init__(self, roots: List[str], options: Optional[BuildOptions] = None):
+        """
+        Args:
+            roots: PATHs to Great Expectations folders, each parsed once up front
+            options: how the files under each root are found and parsed. None uses the defaults of BuildOptions. Its
+                workers and cache are only used for the initial parse
+        """
+        options = options or BuildOptions()
+        if options.workers == 0:
+            options = options._replace(workers=os.cpu_count())
+        self.started = time.time()
+        self.cache = AnnotationCache(options.cache_dir, max_size=options.cache_max_size)
+        self.indexes: Dict[str, WarmIndex] = {}
+        for root in roots:
+            warm_index = WarmIndex(root, self.cache, options)
+            self.indexes[warm_index.root] = warm_index
+        self.cache.save()
+        self._tocs: Dict[str, Tuple[Tuple[int, int], List[Dict]]] = {}  # TOC file -> ((mtime_ns, size), loaded TOC)
+        self._toc_hits = 0
+        self._toc_misses = 0
+        self._grids: Dict[Tuple, Tuple[AnnotationIndex, List[Dict], str]] = {}  # (TOC, root, indent) -> last grid
+        self._grid_hits = 0
+        self._grid_misses = 0
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def index(self, root: Optional[str] = None) -> AnnotationIndex:
+        """
+        Args:
+            root: one of the served roots. May be left out when only one root is served
+
+        Returns:
+            the up-to-date index of root
+
+        Raises:
+            RootNotServedError: if root is not served
+        """
+        if root is None:
+            if len(self.indexes) != 1:
+                raise RootNotServedError("root is required when several roots are served")
+            return next(iter(self.indexes.values())).refresh()
+        warm_index = self.indexes.get(os.path.abspath(root))
+        if warm_index is None:
+            raise RootNotServedError(f"{root} is not served")
+        return warm_index.refresh()
+
+    def build(self, toc_path: str, root: Optional[str] = None, indent: Optional[int] = 2) -> str:
+        """
+        Args:
+            toc_path: TOC file, loaded again only when it changes
+            root: one of the served roots. May be left out when only one root is served
+            indent: indentation of the JSON, None for compact JSON
+
+        Returns:
+            the Feature Maturity Grid JSON, the same as parse writes. Served again without merging when neither the
+            annotations nor the TOC changed since the last request for it
+        """
+        index = self.index(root)
+        toc = self._load_toc(toc_path)
+        key = (os.path.abspath(toc_path), root and os.path.abspath(root), indent)
+        with self._lock:
+            cached = self._grids.get(key)
+            if cached is not None and cached[0] is index and cached[1] is toc:
+                self._grid_hits += 1
+                return cached[2]
+            self._grid_misses += 1
+        grid = grid_string(toc, index, indent)
+        with self._lock:
+            self._grids[key] = (index, toc, grid)
+        return grid
+
+    def merge(self, toc: List[Dict], root: Optional[str] = None, indent: Optional[int] = 2) -> str:
+        """
+        Args:
+            toc: loaded TOC JSON, not modified
+            root: one of the served roots. May be left out when only one root is served
+            indent: indentation of the JSON, None for compact JSON
+
+        Returns:
+            the Feature Maturity Grid JSON, the same as parse writes
+        """
+        return grid_string(toc, self.index(root), indent)
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            self._requests[endpoint] = self._requests.get(endpoint, 0) + 1
+            self._latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def stats(self) -> Dict:
+        """
+        Returns:
+            the state of every root, the hits of the annotation, TOC and grid caches, and request counts and latencies in
+            milliseconds per endpoint, over the last LATENCY_WINDOW requests
+        """
+        with self._lock:
+            requests = {endpoint: {"count": count, **_percentiles(self._latencies[endpoint])}
+                        for endpoint, count in self._requests.items()}
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "roots": {root: warm_index.stats() for root, warm_index in self.indexes.items()},
+            "annotation_cache": {"hits": self.cache.hits, "misses": self.cache.misses},
+            "toc_cache": {"hits": self._toc_hits, "misses": self._toc_misses},
+            "grid_cache": {"hits": self._grid_hits, "misses": self._grid_misses},
+            "requests": requests,
+        }
+
+    def _load_toc(self, toc_path: str) -> List[Dict]:
+        toc_path = os.path.abspath(toc_path)
+        stat = stat_file(toc_path)
+        if stat is None:
+            raise FileNotFoundError(f"{toc_path} does not exist")
+        with self._lock:
+            cached = self._tocs.get(toc_path)
+            if cached is not None and cached[0] == stat:
+                self._toc_hits += 1
+                return cached[1]
+            self._toc_misses += 1
+        with open(toc_path) as json_file:
+            toc = json.load(json_file)
+        with self._lock:
+            self._tocs[toc_path] = (stat, toc)
+        return toc
+
+
+def _percentiles(latencies: Deque[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {"p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+            "p95_ms": round(ordered[min(len(ordered) - 1, len(ordered) * 95 // 100)] * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /build?toc=FILE[&root=PATH][&compact=1]  grid of the TOC file, merged with the annotations under root
+    POST /merge[?root=PATH][&compact=1]          grid of the TOC JSON in the request body
+    GET /stats                                   AnnotationService.stats()
+    """
+    server_version = "GE_parse"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str) -> None:
+        started = time.perf_counter()
+        service: AnnotationService = self.server.service
+        url = urlsplit(self.path)
+        endpoint = url.path.strip("/")
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        indent = None if params.get("compact") in ("1", "true") else 2
+        try:
+            if (method, endpoint) == ("GET", "build"):
+                if "toc" not in params:
+                    raise ValueError("the toc parameter is required")
+                body = service.build(params["toc"], params.get("root"), indent)
+            elif (method, endpoint) == ("POST", "merge"):
+                toc = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                body = service.merge(toc, params.get("root"), indent)
+            elif (method, endpoint) == ("GET", "stats"):
+                body = json.dumps(service.stats(), indent=2)
+            else:
+                self._respond(404, {"error": f"no endpoint {method} /{endpoint}"})
+                return
+        except RootNotServedError as e:
+            self._respond(404, {"error": str(e)})
+            return
+        except (OSError, ValueError) as e:
+            self._respond(400, {"error": str(e)})
+            return
+        except (KeyError, TypeError, AttributeError) as e:
+            # raised by the merge of a TOC that is valid JSON but not a list of sections of features of cases
+            self._respond(400, {"error": f"malformed TOC: {e.__class__.__name__} {e}"})
+            return
+        self._respond(200, body)
+        if endpoint != "stats":
+            service.record(endpoint, time.perf_counter() - started)
+
+    def _respond(self, status: int, body) -> None:
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        encoded = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        # client_address is not a (host, port) pair on a Unix socket
+        logger.debug(format, *args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: AnnotationService, socket_path: Optional[str] = None, host: str = "127.0.0.1",
+                port: int = DEFAULT_PORT) -> socketserver.BaseServer:
+    """
+    Args:
+        service: service that answers the requests
+        socket_path: Unix socket to listen on. A stale socket file is replaced. None listens on host and port instead
+        host: interface to listen on over TCP
+        port: port to listen on over TCP, 0 picks a free one
+
+    Returns:
+        the server, not started yet. Call serve_forever() on it
+
+    Raises:
+        FileExistsError: if something other than a socket is at socket_path
+    """
+    if socket_path is not None:
+        if is_socket(socket_path):
+            os.unlink(socket_path)
+        elif os.path.lexists(socket_path):
+            raise FileExistsError(f"{socket_path} exists and is not a socket")
+        server = _UnixHTTPServer(socket_path, _RequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), _RequestHandler)
+    server.service = service
+    return server
+
+
+def is_socket(path: str) -> bool:
+    """
+    Returns:
+        whether path is a Unix socket, without following symlinks. False if nothing is at path
+    """
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,136 @@
+import copy
+import json
+import os
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .GE_DataDocs_Parser import AnnotationIndex, BuildOptions, walk_order_key
+from .artifact import build_hashed_index, source_hash
+from .pathfilter import PathFilter
+from .profiling import Profile
+from .records import dump_records, load_records
+
+# bump whenever the layout of the shard file changes
+SHARD_VERSION = 2
+
+
+class ReducedShards(NamedTuple):
+    """
+    The index of a whole tree, put together from the shard files its shards wrote
+    """
+    index: AnnotationIndex  # sources are paths relative to PATH, with / separators. Duplicate ids are in its conflicts
+    metadata: Dict  # engine, number of files and source hash, the same as the index command writes for the tree
+
+
+def build_shard(path: str, shard_path: str, shard: Tuple[int, int], options: Optional[BuildOptions] = None,
+                profile: Optional[Profile] = None) -> AnnotationIndex:
+    """
+    Extracts the annotations of the files of one shard of path and writes them to a shard file for reduce_shards.
+    Every shard walks the whole tree but only parses the files that shard_of puts in it, so shards can run as separate
+    processes or on separate hosts, each with its own checkout of the tree
+
+    Args:
+        path: PATH to Great Expectations folder
+        shard_path: file to write the shard to
+        shard: (index, count) of the shard, index counting from 1
+        options: how the files are found and parsed. None uses the defaults of BuildOptions. The path filter must be
+            the same for every shard. Its on_conflict is not used: a shard only sees its own files, so duplicate ids
+            are resolved by reduce_shards
+        profile: collects counts and timings of every stage, if given
+
+    Returns:
+        the index of the files of the shard
+    """
+    options = options or BuildOptions()
+    path_filter = copy.copy(options.path_filter or PathFilter())
+    path_filter.shard = shard
+    index, digests = build_hashed_index(path, options._replace(path_filter=path_filter, on_conflict="last"), profile)
+    root = os.path.abspath(path)
+
+    def relative(filepath: str) -> str:
+        return os.path.relpath(filepath, root).replace(os.sep, "/")
+
+    shard_data = {
+        "version": SHARD_VERSION,
+        "shard": list(shard),
+        "engine": options.engine,
+        "files": [[relative(filepath), dump_records(annotation_list)]
+                  for filepath, annotation_list in index.files.items()],
+        "digests": [[relative(filepath), digest] for filepath, digest in digests],
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(shard_path)), suffix=".tmp")
+    with os.fdopen(fd, "w") as shardfile:
+        json.dump(shard_data, shardfile)
+    os.replace(tmp_path, shard_path)
+    return index
+
+
+def reduce_shards(shard_paths: List[str], on_conflict: str = "error") -> ReducedShards:
+    """
+    Merges the shard files of every shard of a tree into the index a build_index of the whole tree returns
+
+    Args:
+        shard_paths: files written by build_shard, one per shard, in any order
+        on_conflict: which definition of an id defined more than once is kept, one of CONFLICT_POLICIES. Shards only
+            see their own files, so duplicates are only resolved here
+
+    Returns:
+        the index and the metadata of the tree
+
+    Raises:
+        DuplicateAnnotationError: if on_conflict is error and an id is defined more than once
+        ValueError: if a file is not a shard file, a shard number is not between 1 and the number of shards, or the
+            shards do not add up to exactly one walk of a tree with one engine
+    """
+    shards: Dict[int, Dict] = {}
+    counts, engines = set(), set()
+    for shard_path in shard_paths:
+        with open(shard_path) as shardfile:
+            try:
+                loaded = json.load(shardfile)
+            except ValueError:
+                raise ValueError(f"{shard_path} is not a shard file, write one with GE_parse parse --shard")
+        if not isinstance(loaded, dict) or "shard" not in loaded:
+            raise ValueError(f"{shard_path} is not a shard file, write one with GE_parse parse --shard")
+        if loaded.get("version") != SHARD_VERSION:
+            raise ValueError(f"{shard_path} was written by another version, write it again with GE_parse parse --shard")
+        shard_index, count = loaded["shard"]
+        if not 1 <= shard_index <= count:
+            raise ValueError(f"{shard_path} holds shard {shard_index}/{count}, not one of shards 1 to {count}")
+        if shard_index in shards:
+            raise ValueError(f"shard {shard_index}/{count} is given more than once")
+        shards[shard_index] = loaded
+        counts.add(count)
+        engines.add(loaded["engine"])
+    if len(counts) > 1:
+        raise ValueError(f"the shards split the tree in different numbers of shards: {sorted(counts)}")
+    if len(engines) > 1:
+        raise ValueError(f"the shards were parsed with different engines: {sorted(engines)}")
+    if not shards:
+        raise ValueError("no shard files are given")
+    count = counts.pop()
+    missing = [str(shard_index) for shard_index in range(1, count + 1) if shard_index not in shards]
+    if missing:
+        raise ValueError(f"shards {', '.join(missing)} of {count} are missing")
+
+    files: Dict[str, List] = {}
+    digests: Dict[str, str] = {}
+    for shard_index, loaded in shards.items():
+        for relpath, digest in loaded["digests"]:
+            if relpath in digests:
+                raise ValueError(f"{relpath} is in more than one shard, were the shards parsed with the same filters?")
+            digests[relpath] = digest
+        for relpath, dumped in loaded["files"]:
+            files[relpath] = load_records(dumped)
+
+    def walk_order(relpath: str) -> List[Tuple[int, str]]:
+        return walk_order_key(relpath.replace("/", os.sep))
+
+    index = AnnotationIndex(on_conflict=on_conflict)
+    for relpath in sorted(files, key=walk_order):
+        index.add(files[relpath], relpath)
+    index.check()
+    ordered_digests = [(relpath, digests[relpath]) for relpath in sorted(digests, key=walk_order)]
+    metadata = {"engine": engines.pop(), "files": len(ordered_digests),
+                "source_hash": source_hash(None, ordered_digests)}
+    return ReducedShards(index, metadata)
@@ -0,0 +1,79 @@
+from typing import List, Mapping, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from .GE_DataDocs_Parser import AnnotationIndex, maturity_details_keys
+
+# fields every annotation has to define. The descriptions and how_to_guide_url may be left blank, the grid shows them
+# as to be written
+ANNOTATION_FIELDS = ("title", "icon", "short_description", "description", "how_to_guide_url", "maturity",
+                     "maturity_details")
+
+# maturity levels the Feature Maturity Grid knows how to show
+MATURITY_LEVELS = ("Production", "Beta", "Experimental", "N/A")
+
+# fields that hold a link, when they are not blank
+URL_FIELDS = ("icon", "how_to_guide_url")
+
+
+class ValidationError(NamedTuple):
+    """
+    A problem with one annotation, located at the line of the source file its block starts on
+    """
+    filepath: Optional[str]
+    line: Optional[int]
+    annotation_id: str
+    message: str
+
+    def __str__(self) -> str:
+        location = ":".join(str(part) for part in (self.filepath, self.line) if part is not None)
+        return f"{location or '<unknown>'}: {self.annotation_id}: {self.message}"
+
+
+def validate_index(index: AnnotationIndex) -> List[ValidationError]:
+    """
+    Checks the annotations that were extracted into the index, without reading the source files again
+
+    Args:
+        index: index from build_index or update_index
+
+    Returns:
+        the errors of every annotation of every file, in walk order
+    """
+    return [ValidationError(filepath, annotation.line, annotation["id"], message)
+            for filepath, annotation_list in index.files.items()
+            for annotation in annotation_list
+            for message in validate_annotation(annotation)]
+
+
+def validate_annotation(annotation: Mapping) -> List[str]:
+    """
+    Args:
+        annotation: one annotation, as extracted by _parse_feature_annotation
+
+    Returns:
+        a message per problem: missing fields, a blank title, an unknown maturity level, missing maturity details and
+        links that are not http(s) URLs. Empty if the annotation is valid
+    """
+    messages = [f"missing field {field}" for field in ANNOTATION_FIELDS if field not in annotation]
+    if "title" in annotation and not annotation["title"]:
+        messages.append("title is blank")
+    maturity = annotation.get("maturity")
+    if maturity is not None and maturity not in MATURITY_LEVELS:
+        messages.append(f"maturity {maturity!r} is not one of {', '.join(MATURITY_LEVELS)}")
+    maturity_details = annotation.get("maturity_details")
+    if maturity_details is not None:
+        messages.extend(f"maturity_details is missing {field}" for field in maturity_details_keys
+                        if field not in maturity_details)
+    for field in URL_FIELDS:
+        value = annotation.get(field)
+        if value and not _is_url(value):
+            messages.append(f"{field} {value!r} is not an http(s) URL")
+    return messages
+
+
+def _is_url(value: str) -> bool:
+    try:
+        parts = urlsplit(value)
+    except ValueError:  # e.g. an unbalanced [ in the host
+        return False
+    return parts.scheme in ("http", "https") and bool(parts.netloc) and " " not in value
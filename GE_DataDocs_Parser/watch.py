@@ -0,0 +1,166 @@
+import copy
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .GE_DataDocs_Parser import (AnnotationIndex, BuildOptions, Conflict, DuplicateAnnotationError,
+                                 extract_annotation_lists, extract_file_annotations, index_toc, merge_toc,
+                                 walk_directory)
+from .output import write_grid
+from .pathfilter import PathFilter
+
+logger = logging.getLogger(__name__)
+
+
+class AnnotationWatcher:
+    """
+    Keeps the annotations of every .py file under a path in memory and keeps a merged Feature Maturity Grid up to date
+    as files change.
+
+    The tree is polled with os.stat, so it works the same on every platform and on network mounts where inotify events
+    are not delivered. Only files whose mtime or size changed are parsed again, and only the TOC cases whose annotation
+    changed are patched in the grid.
+
+    Annotations are merged in walk order into an AnnotationIndex, as a full build does, so a duplicate id is resolved
+    by the conflict policy and reported. With the error policy, a duplicate that appears while watching leaves the grid
+    as it was until it is resolved.
+    """
+
+    def __init__(self, path: str, in_json: str, out: str, options: Optional[BuildOptions] = None):
+        """
+        Args:
+            path: PATH to Great Expectations folder
+            in_json: TOC file for all Feature Maturity Grid annotations
+            out: file the grid is written to
+            options: how the files are found and parsed. None uses the defaults of BuildOptions. Its workers are only
+                used for the initial parse, and the cache settings are not used
+
+        Raises:
+            DuplicateAnnotationError: if options.on_conflict is error and an id is defined more than once
+        """
+        options = options or BuildOptions()
+        self.path = os.path.abspath(path)
+        self.out = out
+        self.engine = options.engine
+        self.path_filter = options.path_filter or PathFilter()
+        self.on_conflict = options.on_conflict
+        with open(in_json) as json_file:
+            self._toc = json.load(json_file)
+        self._stats: Dict[str, Optional[Tuple[int, int]]] = {}  # filepath -> (mtime_ns, size), in walk order
+        self._file_annotations: Dict[str, List[Dict]] = {}  # filepath -> annotations found in the file
+        self._index = AnnotationIndex(on_conflict=self.on_conflict)
+        self._grid: List[Dict] = []
+        self._case_positions: Dict[str, List[Tuple[List[Dict], int, Dict]]] = {}  # id -> (cases, index, TOC case)
+        self._build(options.workers)
+
+    def _build(self, workers: Optional[int]) -> None:
+        filepaths = list(walk_directory(self.path, self.path_filter))
+        self._stats = {filepath: stat_file(filepath) for filepath in filepaths}
+        annotation_lists = extract_annotation_lists(filepaths, workers, engine=self.engine)
+        for filepath, annotation_list in zip(filepaths, annotation_lists):
+            self._file_annotations[filepath] = annotation_list or []
+        self._index = self._merge_annotations()
+        self._index.check()
+        toc_index = index_toc(self._toc)
+        self._grid = merge_toc(copy.deepcopy(self._toc), self._index, toc_index)
+        for case_id, positions in toc_index.items():
+            for section_index, feature_index, case_index in positions:
+                cases = self._grid[section_index]["section_features"][feature_index]["cases"]
+                toc_case = self._toc[section_index]["section_features"][feature_index]["cases"][case_index]
+                self._case_positions.setdefault(case_id, []).append((cases, case_index, toc_case))
+
+    def refresh(self) -> Set[str]:
+        """
+        Re-parses the files that were added, changed or removed since the last call and patches the grid
+
+        Returns:
+            ids of the TOC cases that changed
+        """
+        stats = {filepath: stat_file(filepath) for filepath in walk_directory(self.path, self.path_filter)}
+        changed = [filepath for filepath, stat in stats.items() if self._stats.get(filepath) != stat]
+        removed = [filepath for filepath in self._stats if filepath not in stats]
+        self._stats = stats
+        if not changed and not removed:
+            return set()
+        for filepath in removed:
+            self._file_annotations.pop(filepath, None)
+        for filepath in changed:
+            try:
+                self._file_annotations[filepath] = extract_file_annotations(filepath, engine=self.engine) or []
+            except (OSError, SyntaxError, ValueError) as e:
+                # most likely a save in progress; keep the previous annotations until the file parses again
+                logger.warning(f"could not parse {filepath}: {e}")
+                self._stats[filepath] = None
+        annotations = self._merge_annotations()
+        reported = {str(conflict) for conflict in self._index.conflicts}
+        for conflict in annotations.conflicts:
+            if str(conflict) not in reported:
+                logger.warning(str(conflict))
+        try:
+            annotations.check()
+        except DuplicateAnnotationError as e:
+            logger.error(f"{e}; the grid is kept as it was until they are resolved")
+            return set()
+        changed_ids = {
+            annotation_id
+            for annotation_id in self._index.keys() | annotations.keys()
+            if self._index.get(annotation_id) != annotations.get(annotation_id)
+        }
+        self._index = annotations
+        patched_ids = set()
+        for annotation_id in changed_ids:
+            for cases, index, case in self._case_positions.get(annotation_id, ()):
+                cases[index] = annotations.get(annotation_id, case)
+                patched_ids.add(annotation_id)
+        return patched_ids
+
+    def write(self) -> None:
+        """
+        Atomically rewrites the output file, so readers never see a partially written grid
+        """
+        tmp_path = f"{self.out}.tmp"
+        with open(tmp_path, "w") as outfile:
+            write_grid(self._grid, {}, outfile)
+        os.replace(tmp_path, self.out)
+
+    def run(self, interval: float = 0.2) -> None:
+        """
+        Writes the grid, then polls the tree every interval seconds and rewrites the grid when a TOC case changes.
+        Runs until interrupted
+        """
+        self.write()
+        while True:
+            time.sleep(interval)
+            started = time.perf_counter()
+            patched_ids = self.refresh()
+            if patched_ids:
+                self.write()
+                logger.info(f"updated {len(patched_ids)} cases in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    @property
+    def conflicts(self) -> List[Conflict]:
+        """
+        Returns:
+            the ids defined more than once in the tree, as of the last refresh that updated the grid
+        """
+        return self._index.conflicts
+
+    def _merge_annotations(self) -> AnnotationIndex:
+        annotations = AnnotationIndex(on_conflict=self.on_conflict)
+        for filepath in self._stats:  # walk order, as in a full build
+            annotations.add(self._file_annotations.get(filepath, []), filepath)
+        return annotations
+
+
+def stat_file(filepath: str) -> Optional[Tuple[int, int]]:
+    """
+    Returns:
+        (mtime_ns, size) of the file, which changes when the file is saved, or None if it does not exist
+    """
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,67 @@
+"""
+Measures the memory held per annotation by the FeatureAnnotation records, against the plain dicts they replace.
+
+    python benchmarks/bench_annotation_memory.py [--annotations N]
+
+N synthetic annotations are parsed with _parse_feature_annotation and kept alive, and the memory they hold is measured
+with tracemalloc. The dict baseline is the same annotations as freshly allocated nested dicts with their own strings,
+which is what the parser produced before the records (a JSON round trip allocates exactly that).
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import _parse_feature_annotation  # noqa: E402
+from GE_DataDocs_Parser.records import to_json  # noqa: E402
+
+from corpus import ANNOTATION_BLOCK  # noqa: E402
+
+
+def docstrings(count, rng):
+    return [
+        ANNOTATION_BLOCK.format(id=f"feature_{index}", title=f"Feature {index}",
+                                maturity=rng.choice(["Production", "Beta", "Experimental"]),
+                                stability=rng.choice(["Stable", "Mostly Stable", "Unstable"]),
+                                bug_risk=rng.choice(["Low", "Moderate", "High"]))
+        for index in range(count)
+    ]
+
+
+def retained(build):
+    """Returns the result of build() and the bytes it still holds once built"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--annotations", type=int, default=20000)
+    args = parser.parse_args()
+
+    sources = docstrings(args.annotations, random.Random(0))
+    records, records_size = retained(lambda: [annotation for docstring in sources
+                                              for annotation in _parse_feature_annotation(docstring)])
+    serialized = json.dumps(records, default=to_json)
+    dicts, dicts_size = retained(lambda: json.loads(serialized))
+    if dicts != records:
+        raise AssertionError("the records do not convert back to the same dicts")
+
+    print(f"{len(records)} annotations")
+    print(f"  dicts      {dicts_size / len(dicts):8.0f} bytes/annotation")
+    print(f"  records    {records_size / len(records):8.0f} bytes/annotation")
+    print(f"  saved      {(1 - records_size / dicts_size) * 100:7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Micro-benchmark of _parse_feature_annotation against the 14-group regex it replaced.
+
+    python benchmarks/bench_annotation_parser.py [PATH ...]
+
+Docstrings are collected from the given source trees (test_folder by default) and from a synthetic docstring with
+many annotation blocks between prose paragraphs. Only docstrings that hold an annotation are timed: both parsers return
+straight away for a docstring without "id:". The regex returns plain dicts, so the parser is timed once with
+_parse_annotation_blocks, which returns the same dicts, and once with _parse_feature_annotation, which also builds the
+FeatureAnnotation records.
+"""
+import argparse
+import ast
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import (  # noqa: E402
+    _parse_annotation_blocks,
+    _parse_feature_annotation,
+    maturity_details_keys,
+)
+
+LEGACY_ANNOTATION_REGEX = re.compile(
+    "".join(
+        f"[ ]*({field}:.*)[\n]"
+        for field in ["id", "title", "icon", "short_description", "description", "how_to_guide_url", "maturity", "maturity_details"]
+        + maturity_details_keys
+    )
+)
+
+ANNOTATION_BLOCK = """
+    id: feature_{index}
+    title: Feature {index}
+    icon:
+    short_description: short
+    description: description of feature {index}
+    how_to_guide_url: https://docs.greatexpectations.io/en/latest/how_to/{index}.html
+    maturity: Beta
+    maturity_details:
+        api_stability: Stable
+        implementation_completeness: Complete
+        unit_test_coverage: Complete
+        integration_infrastructure_test_coverage: N/A
+        documentation_completeness: Partial
+        bug_risk: Low
+"""
+
+PROSE = "    Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore.\n" * 20
+
+
+def legacy_parse(docstring):
+    """The regex parser as it was before the line-oriented parser, for comparison"""
+    list_of_annotations = []
+    if "id:" not in docstring:  # the same early return as the parser
+        return list_of_annotations
+    for matches in LEGACY_ANNOTATION_REGEX.findall(docstring):
+        annotation_dict = {}
+        maturity_details_dict = {}
+        for matched_line in matches:
+            matched_line_fields = matched_line.split(":")
+            this_key = matched_line_fields[0].strip()
+            this_val = matched_line_fields[1].strip()
+            if this_key in maturity_details_keys:
+                maturity_details_dict[this_key] = this_val
+            else:
+                annotation_dict[this_key] = this_val
+        annotation_dict["maturity_details"] = maturity_details_dict
+        list_of_annotations.append(annotation_dict)
+    return list_of_annotations
+
+
+def collect_docstrings(paths):
+    docstrings = []
+    for path in paths:
+        for root, dirs, files in os.walk(path):
+            for file in files:
+                if not file.endswith(".py"):
+                    continue
+                with open(os.path.join(root, file), "rb") as srcfile:
+                    try:
+                        tree = ast.parse(srcfile.read())
+                    except SyntaxError:
+                        continue
+                for node in ast.walk(tree):
+                    if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                        docstring = ast.get_docstring(node)
+                        if docstring and _parse_annotation_blocks(docstring):
+                            docstrings.append(docstring)
+    return docstrings
+
+
+def bench(name, parse, docstrings, repeat):
+    number = max(1, repeat // len(docstrings))
+    best = min(timeit.repeat(lambda: [parse(docstring) for docstring in docstrings], number=number, repeat=5))
+    per_call_us = best / (number * len(docstrings)) * 1e6
+    print(f"  {name:<8} {per_call_us:10.2f} us/docstring")
+    return per_call_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("paths", nargs="*", default=[os.path.join(os.path.dirname(__file__), os.pardir, "test_folder")])
+    parser.add_argument("--blocks", type=int, default=100, help="annotation blocks in the synthetic docstring")
+    parser.add_argument("--repeat", type=int, default=2000, help="approximate docstring parses per timing")
+    args = parser.parse_args()
+
+    synthetic = "".join(PROSE + ANNOTATION_BLOCK.format(index=index) for index in range(args.blocks))
+    corpora = [(f"synthetic docstring ({len(synthetic) // 1024} KiB, {args.blocks} blocks)", [synthetic]),
+               (f"source docstrings ({', '.join(args.paths)})", collect_docstrings(args.paths))]
+    for title, docstrings in corpora:
+        if not docstrings:
+            continue
+        print(f"{title}: {len(docstrings)} annotated docstrings")
+        legacy = bench("regex", legacy_parse, docstrings, args.repeat)
+        blocks = bench("dicts", _parse_annotation_blocks, docstrings, args.repeat)
+        records = bench("records", _parse_feature_annotation, docstrings, args.repeat)
+        print(f"  speedup  {legacy / blocks:10.2f}x dicts, {legacy / records:.2f}x records")
+
+
+if __name__ == "__main__":
+    main()
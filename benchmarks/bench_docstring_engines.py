@@ -0,0 +1,93 @@
+"""
+Compares the CPU time and peak memory of the ast and tokenize docstring engines on large modules.
+
+    python benchmarks/bench_docstring_engines.py [FILE ...] [--repeat N] [--out results.json]
+
+Without FILE arguments, three synthetic modules of increasing size are generated with benchmarks/corpus.py. For every
+file, each engine extracts the annotations --repeat times and the lowest CPU time is reported, together with the peak
+memory allocated while extracting, as measured by tracemalloc. The annotations of both engines are checked to be equal.
+"""
+import argparse
+import ast
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import _parse_docstrings, _walk_tree  # noqa: E402
+from GE_DataDocs_Parser.docstrings import scan_docstrings  # noqa: E402
+
+from corpus import CorpusSpec, _module_source  # noqa: E402
+
+ENGINES = {
+    "ast": lambda source: _walk_tree(ast.parse(source)),
+    "tokenize": lambda source: _parse_docstrings(scan_docstrings(source)),
+}
+
+SYNTHETIC_SIZES = (100_000, 1_000_000, 5_000_000)
+
+
+def synthetic_module(size):
+    spec = CorpusSpec(file_size=size)
+    return _module_source(random.Random(size), spec, [f"feature_{block}" for block in range(spec.annotations_per_docstring)])
+
+
+def measure(extract, source, repeat):
+    """Returns the annotations, the lowest CPU time of repeat runs and the peak traced memory of one run"""
+    cpu_times = []
+    for _ in range(repeat):
+        started = time.process_time()
+        annotations = extract(source)
+        cpu_times.append(time.process_time() - started)
+    tracemalloc.start()
+    extract(source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return annotations, min(cpu_times), peak
+
+
+def run_benchmark(sources, repeat):
+    results = {}
+    for name, source in sources.items():
+        results[name] = {"bytes": len(source)}
+        annotations = {}
+        for engine, extract in ENGINES.items():
+            annotations[engine], seconds, peak = measure(extract, source, repeat)
+            results[name][engine] = {"cpu_seconds": seconds, "peak_bytes": peak}
+        if annotations["ast"] != annotations["tokenize"]:
+            raise AssertionError(f"{name}: the engines found different annotations")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("files", nargs="*", help=".py files to extract. Synthetic modules are generated otherwise")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=None, help="file to write the results JSON to")
+    args = parser.parse_args()
+
+    if args.files:
+        sources = {}
+        for filepath in args.files:
+            with open(filepath, "rb") as srcfile:
+                sources[filepath] = srcfile.read()
+    else:
+        sources = {f"synthetic_{size}": synthetic_module(size).encode() for size in SYNTHETIC_SIZES}
+    results = run_benchmark(sources, args.repeat)
+
+    for name, result in results.items():
+        print(f"{name} ({result['bytes']} bytes)")
+        for engine in ENGINES:
+            print(f"  {engine:<10} {result[engine]['cpu_seconds'] * 1000:10.2f} ms cpu "
+                  f"{result[engine]['peak_bytes'] / 1024:12.1f} KiB peak")
+    if args.out is not None:
+        with open(args.out, "w") as outfile:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "files": results}, outfile, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Measures the peak RSS of GE_parse parse on a tree with a few huge generated modules, with and without memory limits.
+
+    python benchmarks/bench_memory.py [--huge-files N] [--huge-size BYTES] [--max-file-size SIZE] [corpus options]
+
+--huge-files generated modules of about --huge-size bytes each (a class with an annotation and a large dict literal,
+like a vendored schema) are added to the corpus, half of them without annotation markers. Each variant is parsed in a
+fresh interpreter without the cache, and its peak RSS is read from the line GE_parse prints. The grid of every
+variant that scans oversize files is checked to be identical to the one the unlimited parse writes.
+
+The memory a syntax tree takes per byte of source is measured too, with tracemalloc over the corpus files and the
+generated modules, which is what PARSE_MEMORY_FACTORS is based on.
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, REPO_ROOT)
+
+from corpus import ANNOTATION_BLOCK, CorpusSpec, generate_corpus  # noqa: E402
+
+COMMAND = [sys.executable, "-m", "GE_DataDocs_Parser.cli"]
+
+
+def write_huge_module(filepath, size, annotated, index):
+    """Writes a module of about size bytes, a class holding a dict literal, with an annotation if annotated"""
+    docstring = ANNOTATION_BLOCK.format(id=f"huge_feature_{index}", title=f"Huge feature {index}",
+                                        maturity="Beta", stability="Stable", bug_risk="Low") if annotated else ""
+    with open(filepath, "w") as srcfile:
+        srcfile.write(f'class Schema{index}:\n    """{docstring}    """\n    TABLE = {{\n')
+        written, key = 0, 0
+        while written < size:
+            line = f"        'key_{key}': [{key}, {key + 1}, 'value_{key}'],\n"
+            srcfile.write(line)
+            written += len(line)
+            key += 1
+        srcfile.write("    }\n")
+
+
+def ast_memory_factor(filepaths):
+    """Returns the mean and the largest bytes traced while building the syntax tree of a file, per byte of source"""
+    total_source, total_peak, largest = 0, 0, 0.0
+    for filepath in filepaths:
+        with open(filepath, "rb") as srcfile:
+            source = srcfile.read()
+        if not source:
+            continue
+        tracemalloc.start()
+        tree = ast.parse(source)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del tree
+        total_source += len(source)
+        total_peak += peak
+        largest = max(largest, peak / len(source))
+    return total_peak / total_source, largest
+
+
+def parse(src, toc, arguments):
+    """Returns the grid and the peak RSS in MB of one GE_parse parse"""
+    result = subprocess.run([*COMMAND, "parse", src, toc, "--no-cache", *arguments], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True)
+    peak = re.search(r"^peak RSS ([\d.]+) MB", result.stderr, re.MULTILINE)
+    return result.stdout, float(peak.group(1)) if peak else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--huge-files", type=int, default=2)
+    parser.add_argument("--huge-size", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--max-file-size", default="1M", help="size limit of the limited variants, as GE_parse takes it")
+    parser.add_argument("--memory-budget", default="128M", help="budget of the budgeted variant, as GE_parse takes it")
+    for field, default in CorpusSpec._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    spec = CorpusSpec(**{field: getattr(args, field) for field in CorpusSpec._fields})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generate_corpus(tmp_dir, spec)
+        src, toc = os.path.join(tmp_dir, "src"), os.path.join(tmp_dir, "toc.json")
+        huge_paths = [os.path.join(src, f"generated_schema_{index}.py") for index in range(args.huge_files)]
+        for index, filepath in enumerate(huge_paths):
+            write_huge_module(filepath, args.huge_size, index % 2 == 0, index)
+        corpus_paths = [os.path.join(dirpath, filename) for dirpath, _, filenames in os.walk(src)
+                        for filename in filenames if filename.endswith(".py") and "generated_schema" not in filename]
+
+        mean, largest = ast_memory_factor(corpus_paths[:200])
+        print(f"syntax tree per source byte: corpus files mean {mean:.0f}, largest {largest:.0f}; "
+              f"generated modules {ast_memory_factor(huge_paths[:1])[0]:.0f}")
+        print(f"{spec.files} files and {args.huge_files} generated modules of {args.huge_size // 1024} KB")
+        variants = {
+            "no limits": [],
+            "tokenize engine": ["--engine", "tokenize"],
+            f"--max-file-size {args.max_file_size}": ["--max-file-size", args.max_file_size],
+            f"--max-file-size {args.max_file_size} skip": ["--max-file-size", args.max_file_size, "--oversize", "skip"],
+            f"--memory-budget {args.memory_budget}": ["--memory-budget", args.memory_budget],
+        }
+        expected = None
+        for name, arguments in variants.items():
+            grid, peak = parse(src, toc, arguments)
+            expected = expected or grid
+            if "skip" not in arguments and grid != expected:
+                raise AssertionError(f"{name} wrote a different grid than the parse without limits")
+            print(f"  {name:<34} peak RSS {peak:10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Times each stage of the parser pipeline on a synthetic corpus and writes the results as JSON.
+
+    python benchmarks/bench_pipeline.py [--out results.json] [--compare baseline.json] [corpus options]
+
+Stages are timed separately, each on the output of the previous one: walking the tree, with and without pruning the
+default excludes (see --ignored-files in benchmarks/corpus.py), reading the files, the pre-filter, ast.parse,
+_walk_tree, _parse_feature_annotation, merging into the TOC and writing the grid JSON. The whole build_index call is
+timed as well. Every stage is run --repeat times and the fastest run is reported. With --compare,
+the change against an earlier results file is printed, so runs from two commits can be compared.
+"""
+import argparse
+import ast
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import (  # noqa: E402
+    _has_feature_maturity_markers,
+    _parse_feature_annotation,
+    walk_directory,
+    _walk_tree,
+    build_index,
+    merge,
+)
+from GE_DataDocs_Parser.output import write_grid  # noqa: E402
+from GE_DataDocs_Parser.pathfilter import PathFilter  # noqa: E402
+
+from corpus import CorpusSpec, generate_corpus  # noqa: E402
+
+
+def time_stage(function, repeat):
+    """Returns the result of the last run and the wall-clock time of every run"""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        runs.append(time.perf_counter() - started)
+    return result, runs
+
+
+def read_files(filepaths):
+    sources = []
+    for filepath in filepaths:
+        with open(filepath, "rb") as srcfile:
+            sources.append(srcfile.read())
+    return sources
+
+
+def collect_docstrings(trees):
+    return [
+        ast.get_docstring(node)
+        for tree in trees
+        for node in ast.walk(tree)
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+    ]
+
+
+def run_benchmark(src_dir, toc_path, repeat):
+    with open(toc_path) as tocfile:
+        toc = json.load(tocfile)
+    stages = {}
+
+    def stage(name, function, count=None):
+        result, runs = time_stage(function, repeat)
+        stages[name] = {"seconds": min(runs), "runs": runs}
+        if count is not None:
+            stages[name]["count"] = count
+        return result
+
+    unfiltered = PathFilter(default_excludes=False, gitignore=False)
+    stage("walk_directory_unfiltered", lambda: list(walk_directory(src_dir, unfiltered)))
+    filepaths = stage("walk_directory", lambda: list(walk_directory(src_dir)))
+    sources = stage("read_files", lambda: read_files(filepaths), count=len(filepaths))
+    stages["read_files"]["bytes"] = sum(len(source) for source in sources)
+    marked = stage("prefilter", lambda: [source for source in sources if _has_feature_maturity_markers(source)])
+    stages["prefilter"]["count"] = len(marked)
+    trees = stage("ast_parse", lambda: [ast.parse(source) for source in sources], count=len(sources))
+    stage("walk_tree", lambda: [_walk_tree(tree) for tree in trees], count=len(trees))
+    docstrings = collect_docstrings(trees)
+    stage("parse_feature_annotation", lambda: [_parse_feature_annotation(docstring) for docstring in docstrings],
+          count=len(docstrings))
+    index = stage("build_index", lambda: build_index(src_dir))
+    stages["build_index"]["count"] = len(index)
+    stage("merge_toc", lambda: merge(toc, index))
+    stage("json_output", lambda: write_grid(toc, index, io.StringIO()))
+    return stages
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_stages(stages, baseline=None):
+    for name, result in stages.items():
+        line = f"  {name:<26} {result['seconds'] * 1000:10.2f} ms"
+        if baseline is not None and name in baseline:
+            change = (result["seconds"] / baseline[name]["seconds"] - 1) * 100
+            line += f"  {change:+7.1f}% vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=None,
+                        help="existing corpus directory from benchmarks/corpus.py. A temporary one is generated otherwise")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=None, help="file to write the results JSON to")
+    parser.add_argument("--compare", default=None, help="results JSON of an earlier run to compare against")
+    for field, default in CorpusSpec._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    spec = CorpusSpec(**{field: getattr(args, field) for field in CorpusSpec._fields})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_dir = args.corpus
+        if corpus_dir is None:
+            corpus_dir = tmp_dir
+            generate_corpus(corpus_dir, spec)
+        stages = run_benchmark(os.path.join(corpus_dir, "src"), os.path.join(corpus_dir, "toc.json"), args.repeat)
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": args.corpus or spec._asdict(),
+        "repeat": args.repeat,
+        "stages": stages,
+    }
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)["stages"]
+    print_stages(stages, baseline)
+    if args.out is not None:
+        with open(args.out, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+
+
+if __name__ == "__main__":
+    main()
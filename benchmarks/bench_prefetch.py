@@ -0,0 +1,78 @@
+"""
+Times serial parsing of a synthetic corpus with different read-ahead depths and reader thread counts.
+
+    python benchmarks/bench_prefetch.py [--latency-ms MS] [--read-ahead N ...] [--read-threads N ...] [corpus options]
+
+A network-mounted checkout is simulated with --latency-ms, which delays every open() of a source file by that many
+milliseconds, sleeping without holding the GIL as a real filesystem wait does. Every combination of --read-ahead and
+--read-threads is run --repeat times and the fastest wall-clock time is reported. A read-ahead of 0 is the baseline
+that reads each file when it is parsed. The annotations are checked to be the same for every combination.
+"""
+import argparse
+import builtins
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import GE_DataDocs_Parser.GE_DataDocs_Parser as parser_module  # noqa: E402
+import GE_DataDocs_Parser.prefetch as prefetch_module  # noqa: E402
+from GE_DataDocs_Parser.GE_DataDocs_Parser import extract_annotation_lists, walk_directory  # noqa: E402
+
+from corpus import CorpusSpec, generate_corpus  # noqa: E402
+
+
+def delay_opens(latency):
+    """Makes the parser and the reader threads wait latency seconds before opening a file"""
+    def slow_open(*args, **kwargs):
+        time.sleep(latency)
+        return builtins.open(*args, **kwargs)
+
+    parser_module.open = slow_open
+    prefetch_module.open = slow_open
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=None,
+                        help="existing corpus directory from benchmarks/corpus.py. A temporary one is generated otherwise")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--read-ahead", type=int, nargs="+", default=[0, 8, 32, 128])
+    parser.add_argument("--read-threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    for field, default in CorpusSpec._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    spec = CorpusSpec(**{field: getattr(args, field) for field in CorpusSpec._fields})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_dir = args.corpus
+        if corpus_dir is None:
+            corpus_dir = tmp_dir
+            generate_corpus(corpus_dir, spec)
+        filepaths = list(walk_directory(os.path.join(corpus_dir, "src")))
+        if args.latency_ms:
+            delay_opens(args.latency_ms / 1000)
+        expected = None
+        print(f"{len(filepaths)} files, {args.latency_ms} ms latency per open")
+        for read_ahead, read_threads in itertools.product(args.read_ahead, args.read_threads):
+            if read_ahead == 0 and read_threads != args.read_threads[0]:
+                continue  # the baseline does not use the reader threads
+            runs = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                annotation_lists = extract_annotation_lists(filepaths, read_ahead=read_ahead, read_threads=read_threads)
+                runs.append(time.perf_counter() - started)
+            if expected is None:
+                expected = annotation_lists
+            elif annotation_lists != expected:
+                raise AssertionError(f"read-ahead {read_ahead} with {read_threads} threads found different annotations")
+            threads = "-" if read_ahead == 0 else read_threads
+            print(f"  read-ahead {read_ahead:>4}  threads {threads:>3}  {min(runs) * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
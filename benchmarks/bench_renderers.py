@@ -0,0 +1,99 @@
+"""
+Times writing the grid in every output format from one traversal of the merged TOC, against one traversal per format.
+
+    python benchmarks/bench_renderers.py [--repeat N] [corpus options]
+
+The index is built once, then every format of OUTPUT_FORMATS is written to a file both by one render_grid call that
+feeds all renderers, which is what GE_parse parse --format ... --format ... does, by one render_grid call per format,
+and by writing the JSON grid and then loading it again for every other format, which is what post-processing scripts
+do. Peak traced memory of each variant is measured with tracemalloc in a separate run, and every file of the single
+pass is checked to be identical to the one its own pass writes.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import build_index  # noqa: E402
+from GE_DataDocs_Parser.defaults import OUTPUT_FORMATS  # noqa: E402
+from GE_DataDocs_Parser.output import RENDERERS, render_grid  # noqa: E402
+
+from corpus import CorpusSpec, generate_corpus  # noqa: E402
+
+
+def render(loaded_json, index, out_dir, formats):
+    """Writes formats to out_dir/grid.<ext> in one render_grid call"""
+    with contextlib.ExitStack() as outfiles:
+        renderers = [RENDERERS[output_format][0](outfiles.enter_context(
+            open(os.path.join(out_dir, "grid" + RENDERERS[output_format][1]), "w"))) for output_format in formats]
+        render_grid(loaded_json, index, renderers)
+
+
+def timed(write):
+    started = time.perf_counter()
+    write()
+    return time.perf_counter() - started
+
+
+def peak_memory(write):
+    """Returns the peak traced bytes of write()"""
+    tracemalloc.start()
+    write()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    for field, default in CorpusSpec._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    spec = CorpusSpec(**{field: getattr(args, field) for field in CorpusSpec._fields})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generate_corpus(tmp_dir, spec)
+        index = build_index(os.path.join(tmp_dir, "src"))
+        with open(os.path.join(tmp_dir, "toc.json")) as toc_file:
+            loaded_json = json.load(toc_file)
+        single_dir, separate_dir, reload_dir = (os.path.join(tmp_dir, name) for name in ("single", "separate", "reload"))
+        for out_dir in (single_dir, separate_dir, reload_dir):
+            os.makedirs(out_dir)
+
+        def separate():
+            for output_format in OUTPUT_FORMATS:
+                render(loaded_json, index, separate_dir, [output_format])
+
+        def reload():
+            render(loaded_json, index, reload_dir, ["json"])
+            for output_format in OUTPUT_FORMATS[1:]:
+                with open(os.path.join(reload_dir, "grid.json")) as grid_file:
+                    grid = json.load(grid_file)
+                # the merged grid holds every case already, so nothing is looked up in the index
+                render(grid, {}, reload_dir, [output_format])
+
+        variants = {"one pass": lambda: render(loaded_json, index, single_dir, OUTPUT_FORMATS),
+                    "one pass per format": separate,
+                    "json, then reloaded": reload}
+        cases = sum(len(feature["cases"]) for section in loaded_json for feature in section["section_features"])
+        print(f"{len(index)} annotations, {cases} TOC cases, {len(OUTPUT_FORMATS)} formats: {', '.join(OUTPUT_FORMATS)}")
+        for name, write in variants.items():
+            elapsed = sorted(timed(write) for _ in range(args.repeat))[args.repeat // 2]
+            peak = peak_memory(write)
+            print(f"  {name:<22} median {elapsed * 1000:10.2f} ms   peak {peak / 1024:8.0f} KiB")
+        for filename in os.listdir(single_dir):
+            with open(os.path.join(single_dir, filename)) as single, \
+                    open(os.path.join(separate_dir, filename)) as own_pass:
+                if single.read() != own_pass.read():
+                    raise AssertionError(f"{filename} differs between the single pass and its own pass")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Times grid requests to a warm GE_parse serve against running GE_parse parse once per grid.
+
+    python benchmarks/bench_serve.py [--requests N] [--touch N] [corpus options]
+
+The baseline is the full cost a docs build pays per grid without the server: a new interpreter, the click import and a
+parse of the whole tree, with the annotation cache disabled and enabled. The server is started in this process on a
+Unix socket, and --requests grids are requested from it with and without --touch files changed between requests.
+Every grid is checked to be byte-identical to the one parse writes.
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, REPO_ROOT)
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import walk_directory  # noqa: E402
+from GE_DataDocs_Parser.serve import AnnotationService, make_server  # noqa: E402
+
+from corpus import CorpusSpec, generate_corpus  # noqa: E402
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path):
+        super().__init__("localhost")
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def request_grid(socket_path, toc):
+    connection = UnixHTTPConnection(socket_path)
+    connection.request("GET", f"/build?toc={toc}")
+    body = connection.getresponse().read().decode()
+    connection.close()
+    return body + "\n"
+
+
+def run_parse(src, toc, cache_args):
+    command = [sys.executable, "-m", "GE_DataDocs_Parser.cli", "parse", src, toc, *cache_args]
+    return subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+
+
+def report(name, runs):
+    runs = sorted(runs)
+    print(f"  {name:<28} median {runs[len(runs) // 2] * 1000:10.2f} ms   min {runs[0] * 1000:10.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--touch", type=int, default=1, help="files rewritten before each request of the edit run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of GE_parse parse per baseline")
+    for field, default in CorpusSpec._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    spec = CorpusSpec(**{field: getattr(args, field) for field in CorpusSpec._fields})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generate_corpus(tmp_dir, spec)
+        src, toc = os.path.join(tmp_dir, "src"), os.path.join(tmp_dir, "toc.json")
+        filepaths = list(walk_directory(src))
+        cache_dir = os.path.join(tmp_dir, "cache")
+        print(f"{len(filepaths)} files")
+
+        expected = None
+        for name, cache_args in (("parse, no cache", ["--no-cache"]), ("parse, warm cache", ["--cache-dir", cache_dir])):
+            run_parse(src, toc, cache_args)  # fills the cache
+            runs = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                expected = run_parse(src, toc, cache_args)
+                runs.append(time.perf_counter() - started)
+            report(name, runs)
+
+        started = time.perf_counter()
+        service = AnnotationService([src])
+        print(f"  {'serve startup':<28} {(time.perf_counter() - started) * 1000:17.2f} ms")
+        socket_path = os.path.join(tmp_dir, "serve.sock")
+        server = make_server(service, socket_path=socket_path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            for name, touch in (("serve, unchanged tree", 0), (f"serve, {args.touch} files changed", args.touch)):
+                runs = []
+                for request in range(args.requests):
+                    for filepath in filepaths[request * touch % len(filepaths):][:touch]:
+                        with open(filepath, "a") as srcfile:
+                            srcfile.write("\n")
+                    started = time.perf_counter()
+                    grid = request_grid(socket_path, toc)
+                    runs.append(time.perf_counter() - started)
+                    if grid != expected:
+                        raise AssertionError("the server returned a different grid than parse")
+                report(name, runs)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Times GE_parse parse split into N shards run as separate processes, then merged with GE_parse reduce.
+
+    python benchmarks/bench_shards.py [--shards 1,2,4] [--repeat N] [corpus options]
+
+Each shard is a separate interpreter, as it would be on its own CI runner, and all shards of a run are started at once.
+The wall time of a sharded build is that of the slowest shard plus the reduce, which is what a pipeline with one runner
+per shard waits for. The annotation cache is disabled, and every reduced grid is checked to be byte-identical to the one
+an unsharded parse writes.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, REPO_ROOT)
+
+from corpus import CorpusSpec, generate_corpus  # noqa: E402
+
+COMMAND = [sys.executable, "-m", "GE_DataDocs_Parser.cli"]
+
+
+def run_shards(src, shard_dir, count):
+    """Starts every shard at once and returns the wall time until the slowest one is done"""
+    started = time.perf_counter()
+    processes = [subprocess.Popen([*COMMAND, "parse", src, "--shard", f"{index}/{count}", "--no-cache",
+                                   "--out", os.path.join(shard_dir, f"shard{index}.json")],
+                                  cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for index in range(1, count + 1)]
+    if any([process.wait() != 0 for process in processes]):
+        raise RuntimeError(f"a shard of {count} failed")
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shards", default="1,2,4", help="comma-separated numbers of shards to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    for field, default in CorpusSpec._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    spec = CorpusSpec(**{field: getattr(args, field) for field in CorpusSpec._fields})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generate_corpus(tmp_dir, spec)
+        src, toc = os.path.join(tmp_dir, "src"), os.path.join(tmp_dir, "toc.json")
+        started = time.perf_counter()
+        expected = subprocess.run([*COMMAND, "parse", src, toc, "--no-cache"], cwd=REPO_ROOT, capture_output=True,
+                                  text=True, check=True).stdout
+        print(f"{spec.files} files, unsharded parse {(time.perf_counter() - started) * 1000:.0f} ms, "
+              f"{os.cpu_count()} CPUs")
+        print(f"{'shards':>8}{'slowest shard':>16}{'reduce':>10}{'total':>10}{'speedup':>10}   (ms, median of "
+              f"{args.repeat})")
+        baseline = None
+        for count in (int(count) for count in args.shards.split(",")):
+            runs = []
+            for _ in range(args.repeat):
+                shard_dir = tempfile.mkdtemp(dir=tmp_dir)
+                slowest = run_shards(src, shard_dir, count)
+                started = time.perf_counter()
+                grid = subprocess.run([*COMMAND, "reduce", *(os.path.join(shard_dir, f"shard{index}.json")
+                                                              for index in range(1, count + 1)), "--injson", toc],
+                                      cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+                reduce_time = time.perf_counter() - started
+                if grid != expected:
+                    raise AssertionError(f"reduce of {count} shards wrote a different grid than parse")
+                runs.append((slowest + reduce_time, slowest, reduce_time))
+            total, slowest, reduce_time = sorted(runs)[len(runs) // 2]
+            baseline = baseline or total
+            print(f"{count:>8}{slowest * 1000:16.0f}{reduce_time * 1000:10.0f}{total * 1000:10.0f}"
+                  f"{baseline / total:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
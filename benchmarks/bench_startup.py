@@ -0,0 +1,106 @@
+"""
+Measures the startup cost of GE_parse with python -X importtime and fails when it is over budget.
+
+    python benchmarks/bench_startup.py [--budget-ms MS] [--repeat N]
+
+Each invocation (--version, --help, parse --help and a parse of a tiny corpus) is run --repeat times in a fresh
+interpreter. For the median run the wall-clock time, the total import time and the import time of this package and of
+click are reported. The help and version paths fail the run if they import any of FORBIDDEN_MODULES, which are only
+needed once a command parses, or if their total import time is over --budget-ms, so a regression can be caught in CI.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, REPO_ROOT)
+
+from corpus import CorpusSpec, generate_corpus  # noqa: E402
+
+# modules that --help and --version must not import
+FORBIDDEN_MODULES = ("GE_DataDocs_Parser.GE_DataDocs_Parser", "GE_DataDocs_Parser.cache", "json", "logging",
+                     "multiprocessing", "concurrent.futures")
+
+
+def parse_importtime(stderr):
+    """Returns {module: (self us, cumulative us, nesting level)} from the output of -X importtime"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us), (len(name) - len(name.lstrip())) // 2)
+    return modules
+
+
+def run(arguments, cwd):
+    command = [sys.executable, "-X", "importtime", "-m", "GE_DataDocs_Parser.cli", *arguments]
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=cwd, capture_output=True, text=True, check=True)
+    return time.perf_counter() - started, parse_importtime(completed.stderr)
+
+
+def summarize(wall, modules):
+    def cumulative(prefix):
+        # top-most modules of the prefix only, so nested imports are not counted twice
+        return sum(cumulative_us for name, (_, cumulative_us, _) in modules.items()
+                   if (name == prefix or name.startswith(prefix + ".")) and
+                   not any(parent == prefix or parent.startswith(prefix + ".")
+                           for parent in _parents(modules, name)))
+
+    return {"wall_ms": wall * 1000, "imports_ms": sum(self_us for self_us, _, _ in modules.values()) / 1000,
+            "package_ms": cumulative("GE_DataDocs_Parser") / 1000, "click_ms": cumulative("click") / 1000}
+
+
+def _parents(modules, name):
+    # -X importtime prints a module after the modules it imported, one level deeper
+    names = list(modules)
+    level = modules[name][2]
+    for later in names[names.index(name) + 1:]:
+        if modules[later][2] < level:
+            level = modules[later][2]
+            yield later
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=75.0,
+                        help="maximum total import time of the --help and --version paths")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generate_corpus(tmp_dir, CorpusSpec(files=5))
+        invocations = {
+            "--version": (["--version"], True),
+            "--help": (["--help"], True),
+            "parse --help": (["parse", "--help"], True),
+            "parse 5 files": (["parse", os.path.join(tmp_dir, "src"), os.path.join(tmp_dir, "toc.json"), "--no-cache",
+                               "--out", os.path.join(tmp_dir, "grid.json")], False),
+        }
+        print(f"{'':<16}{'wall':>10}{'imports':>10}{'package':>10}{'click':>10}   (ms, median of {args.repeat})")
+        for name, (arguments, budgeted) in invocations.items():
+            runs = sorted((run(arguments, REPO_ROOT) for _ in range(args.repeat)), key=lambda result: result[0])
+            wall, modules = runs[len(runs) // 2]
+            summary = summarize(wall, modules)
+            print(f"{name:<16}" + "".join(f"{summary[key]:10.1f}" for key in ("wall_ms", "imports_ms", "package_ms",
+                                                                                 "click_ms")))
+            if not budgeted:
+                continue
+            imported = [module for module in FORBIDDEN_MODULES if module in modules]
+            if imported:
+                failures.append(f"{name} imports {', '.join(imported)}")
+            if summary["imports_ms"] > args.budget_ms:
+                failures.append(f"{name} spends {summary['imports_ms']:.1f} ms importing, over the "
+                                f"{args.budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Generates a synthetic Great Expectations-like source tree and a matching TOC for benchmarking.
+
+    python benchmarks/corpus.py OUT_DIR [--files N] [--file-size BYTES] [--annotation-density P] [--docstring-size BYTES]
+
+OUT_DIR/src holds the .py files, spread over nested packages, and OUT_DIR/toc.json lists every generated annotation id
+plus as many ids that have no annotation. With --ignored-files, that many more files are written under src/.git and
+src/node_modules, which the walk is expected to skip.
+"""
+import argparse
+import json
+import os
+import random
+from typing import List, NamedTuple
+
+ANNOTATION_BLOCK = """
+    id: {id}
+    title: {title}
+    icon:
+    short_description: {title}
+    description: Synthetic feature {id}
+    how_to_guide_url: https://docs.greatexpectations.io/en/latest/how_to_guides/{id}.html
+    maturity: {maturity}
+    maturity_details:
+        api_stability: {stability}
+        implementation_completeness: Complete
+        unit_test_coverage: Partial
+        integration_infrastructure_test_coverage: N/A
+        documentation_completeness: Complete
+        bug_risk: {bug_risk}
+"""
+
+WORDS = ("expectation", "suite", "batch", "datasource", "validation", "store", "checkpoint", "profiler", "render",
+         "column", "table", "value", "result", "config", "context", "backend", "metric", "kwargs")
+
+
+class CorpusSpec(NamedTuple):
+    files: int = 1000
+    file_size: int = 8000  # approximate bytes of code per file
+    annotation_density: float = 0.02  # fraction of files with one annotated class
+    annotations_per_docstring: int = 3
+    docstring_size: int = 600  # approximate bytes of prose per docstring
+    files_per_package: int = 25
+    ignored_files: int = 0  # files under directories excluded by default, half of them .py files
+    seed: int = 0
+
+
+def generate_corpus(out_dir: str, spec: CorpusSpec = CorpusSpec()) -> List[str]:
+    """
+    Args:
+        out_dir: directory to write src/ and toc.json into
+        spec: shape of the corpus
+
+    Returns:
+        ids of all generated annotations
+    """
+    rng = random.Random(spec.seed)
+    src_dir = os.path.join(out_dir, "src")
+    annotation_ids = []
+    for file_index in range(spec.files):
+        package = os.path.join(src_dir, *(f"package_{part}" for part in _package_path(file_index // spec.files_per_package)))
+        os.makedirs(package, exist_ok=True)
+        ids = []
+        if rng.random() < spec.annotation_density:
+            ids = [f"feature_{file_index}_{block}" for block in range(spec.annotations_per_docstring)]
+            annotation_ids.extend(ids)
+        with open(os.path.join(package, f"module_{file_index}.py"), "w") as srcfile:
+            srcfile.write(_module_source(rng, spec, ids))
+    for file_index in range(spec.ignored_files):
+        ignored_dir = os.path.join(src_dir, *((".git", "objects", f"{file_index % 256:02x}") if file_index % 2 else
+                                              ("node_modules", f"module_{file_index % 50}", "lib")))
+        os.makedirs(ignored_dir, exist_ok=True)
+        with open(os.path.join(ignored_dir, f"ignored_{file_index}.py" if file_index % 4 < 2 else f"ignored_{file_index}"),
+                  "w") as ignoredfile:
+            ignoredfile.write("x = 1\n")
+    toc = _toc(annotation_ids, [f"missing_feature_{index}" for index in range(len(annotation_ids))], rng)
+    with open(os.path.join(out_dir, "toc.json"), "w") as tocfile:
+        json.dump(toc, tocfile, indent=2)
+    return annotation_ids
+
+
+def _package_path(package_index: int) -> List[int]:
+    # two levels of packages, ten subpackages each, so the walk has to descend into directories
+    return [package_index // 10, package_index % 10]
+
+
+def _prose(rng: random.Random, size: int, indent: str = "    ") -> str:
+    lines = []
+    line = indent
+    written = 0
+    while written < size:
+        word = rng.choice(WORDS)
+        if len(line) + len(word) > 100:
+            lines.append(line.rstrip())
+            line = indent
+        line += word + " "
+        written += len(word) + 1
+    lines.append(line.rstrip())
+    return "\n".join(lines)
+
+
+def _module_source(rng: random.Random, spec: CorpusSpec, ids: List[str]) -> str:
+    parts = [f'"""\n{_prose(rng, spec.docstring_size, indent="")}\n"""\nimport os\nfrom typing import Dict, List\n\n']
+    if ids:
+        blocks = "".join(
+            ANNOTATION_BLOCK.format(id=annotation_id, title=annotation_id.replace("_", " ").title(),
+                                    maturity=rng.choice(["Production", "Beta", "Experimental"]),
+                                    stability=rng.choice(["Stable", "Mostly Stable", "Unstable"]),
+                                    bug_risk=rng.choice(["Low", "Moderate", "High"]))
+            for annotation_id in ids
+        )
+        parts.append(f'\nclass AnnotatedFeature:\n    """\n{_prose(rng, spec.docstring_size)}\n\n'
+                     f'    .. admonition:: Feature Maturity\n{blocks}    """\n')
+    size = sum(len(part) for part in parts)
+    function_index = 0
+    while size < spec.file_size:
+        name = f"{rng.choice(WORDS)}_{function_index}"
+        body = (f"\ndef {name}(value: Dict, items: List) -> int:\n    \"\"\"\n{_prose(rng, spec.docstring_size // 4)}\n"
+                f"\n    Args:\n        value: the {rng.choice(WORDS)}\n        items: the {rng.choice(WORDS)}s\n    \"\"\"\n"
+                f"    total = 0\n    for item in items:\n        if item in value:\n            total += len(str(value[item]))\n"
+                f"    return total + {function_index}\n")
+        parts.append(body)
+        size += len(body)
+        function_index += 1
+    return "".join(parts)
+
+
+def _toc(annotation_ids: List[str], missing_ids: List[str], rng: random.Random) -> List[dict]:
+    case_ids = annotation_ids + missing_ids
+    rng.shuffle(case_ids)
+    features = [
+        {"title": f"Feature group {start // 20}", "description": "", "id": f"group_{start // 20}",
+         "cases": [{"id": case_id} for case_id in case_ids[start:start + 20]]}
+        for start in range(0, len(case_ids), 20)
+    ]
+    return [{"section_title": f"Section {start // 10}", "section_features": features[start:start + 10]}
+            for start in range(0, len(features), 10)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("out_dir")
+    for field, default in CorpusSpec._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    spec = CorpusSpec(**{field: getattr(args, field) for field in CorpusSpec._fields})
+    annotation_ids = generate_corpus(args.out_dir, spec)
+    print(f"wrote {spec.files} files with {len(annotation_ids)} annotations to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import shutil
+
+import pytest
+
+from helpers import REPO_ROOT, write_feature
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    """A tree with the example module, annotated modules in subpackages and modules without annotations"""
+    src = tmp_path / "src"
+    shutil.copytree(os.path.join(REPO_ROOT, "test_folder"), src)
+    for index in range(12):
+        write_feature(str(src / f"pkg_{index % 3}" / f"module_{index}.py"), f"generated_feature_{index}",
+                      f"Generated feature {index}", name=f"Feature{index}")
+        with open(src / f"pkg_{index % 3}" / f"plain_{index}.py", "w") as srcfile:
+            srcfile.write(f'def plain_{index}():\n    """Returns the id: {index}"""\n    return {index}\n')
+    return str(src)
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+TOC = os.path.join(REPO_ROOT, "data", "toc.json")
+
+COMMAND = [sys.executable, "-m", "GE_DataDocs_Parser.cli"]
+
+FEATURE_CLASS = '''class {name}:
+    """
+    Some {name} documentation.
+
+    id: {id}
+    title: {title}
+    maturity: {maturity}
+    maturity_details:
+        api_stability: Stable
+        bug_risk: Low
+    """
+
+    def method(self):
+        """Not an annotation: no id line"""
+'''
+
+
+def write_feature(filepath, annotation_id, title, name="Feature", maturity="Beta"):
+    """Writes a module with one class whose docstring holds one annotation"""
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, "w") as srcfile:
+        srcfile.write(FEATURE_CLASS.format(name=name, id=annotation_id, title=title, maturity=maturity))
+
+
+def run_cli(*arguments, cwd=REPO_ROOT, check=True):
+    """Runs GE_parse with arguments in a fresh interpreter, and returns the completed process"""
+    return subprocess.run([*COMMAND, *arguments], cwd=cwd, capture_output=True, text=True, check=check,
+                          env=dict(os.environ, PYTHONPATH=REPO_ROOT))
@@ -0,0 +1,32 @@
+import json
+import os
+
+from GE_DataDocs_Parser import GE_DataDocs_Parser as parser
+from GE_DataDocs_Parser.artifact import build_hashed_index
+
+from helpers import TOC, run_cli, write_feature
+
+
+def test_index_then_merge_writes_the_parse_grid(source_tree, tmp_path):
+    index_path = str(tmp_path / "index.geidx")
+    run_cli("index", source_tree, "--out", index_path, "--no-cache")
+    merged = run_cli("merge", index_path, TOC).stdout
+    parsed = run_cli("parse", source_tree, TOC, "--no-cache").stdout
+    assert json.loads(parsed)
+    assert merged == parsed
+
+
+def test_a_file_created_during_the_build_is_not_hashed(source_tree, monkeypatch):
+    extract_annotation_lists = parser.extract_annotation_lists
+    late_file = os.path.join(source_tree, "late.py")
+
+    def extract_and_create_a_file(*args, **kwargs):
+        write_feature(late_file, "late_feature", "Late")
+        return extract_annotation_lists(*args, **kwargs)
+
+    monkeypatch.setattr(parser, "extract_annotation_lists", extract_and_create_a_file)
+    index, digests = build_hashed_index(source_tree)
+    assert os.path.exists(late_file)
+    assert "late_feature" not in index
+    walked = set(parser.walk_directory(os.path.abspath(source_tree)))
+    assert {filepath for filepath, _ in digests} == walked - {late_file}
@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+
+from GE_DataDocs_Parser.batch import load_manifest
+
+from helpers import TOC, run_cli
+
+
+def write_manifest(tmp_path, jobs):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps(jobs))
+    return str(manifest)
+
+
+def test_batch_writes_the_grid_of_parse_for_every_job(source_tree, tmp_path):
+    manifest = write_manifest(tmp_path, [{"path": source_tree, "injson": TOC, "out": "out/first.json"},
+                                         {"path": "src/pkg_1", "injson": TOC, "out": "out/second.json"}])
+    run_cli("batch", manifest, "--no-cache")
+    for out, path in (("first.json", source_tree), ("second.json", os.path.join(source_tree, "pkg_1"))):
+        assert (tmp_path / "out" / out).read_text() + "\n" == run_cli("parse", path, TOC, "--no-cache").stdout
+
+
+@pytest.mark.parametrize("entry, message", [
+    ({"path": "missing", "injson": TOC, "out": "out.json"}, "path {tmp_path}/missing of job 1 is not a directory"),
+    ({"path": "src", "injson": "missing.json", "out": "out.json"}, "injson {tmp_path}/missing.json of job 1 is not a file"),
+    ({"path": "src", "injson": TOC}, "job 1 is missing out"),
+    ("src", "job 1 is not an object"),
+])
+def test_load_manifest_rejects_invalid_jobs(source_tree, tmp_path, entry, message):
+    manifest = write_manifest(tmp_path, [{"path": "src", "injson": TOC, "out": "out.json"}, entry])
+    with pytest.raises(ValueError, match=message.format(tmp_path=tmp_path)):
+        load_manifest(manifest)
+
+
+def test_batch_reports_an_invalid_manifest_before_running_any_job(source_tree, tmp_path):
+    manifest = write_manifest(tmp_path, [{"path": "src", "injson": TOC, "out": "first.json"},
+                                         {"path": "/nonexistent", "injson": TOC, "out": "second.json"}])
+    result = run_cli("batch", manifest, "--no-cache", check=False)
+    assert result.returncode == 1
+    assert result.stderr == f"Error: {manifest}: path /nonexistent of job 1 is not a directory\n"
+    assert not (tmp_path / "first.json").exists()
@@ -0,0 +1,28 @@
+import os
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import BuildOptions, build_index
+from GE_DataDocs_Parser.cache import CACHE_FILENAME, AnnotationCache
+
+
+def test_cache_file_fits_in_its_size_cap(source_tree, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    sizes = []
+    for cache_max_size in (10 ** 9, 2000, 500):
+        build_index(source_tree, BuildOptions(cache_dir=cache_dir, cache_max_size=cache_max_size))
+        sizes.append(os.path.getsize(os.path.join(cache_dir, CACHE_FILENAME)))
+    # the records of the files without annotations count too, and fill most of the cache
+    assert sizes[0] > 2000
+    assert 1000 < sizes[1] <= 2000
+    assert sizes[2] <= 500
+
+
+def test_cached_annotations_are_reused_across_runs(source_tree, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    parsed = build_index(source_tree, BuildOptions(cache_dir=cache_dir))
+    touched = os.path.join(source_tree, "pkg_0", "module_0.py")
+    os.utime(touched, ns=(0, 0))  # same content, so found by its hash
+
+    cache = AnnotationCache(cache_dir)
+    for filepath in parsed.files:
+        assert cache.lookup(filepath) == parsed.files[filepath]
+    assert (cache.hits, cache.misses) == (len(parsed.files), 0)
@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import BuildOptions, DuplicateAnnotationError, build_index
+from GE_DataDocs_Parser.incremental import load_index, write_index
+from GE_DataDocs_Parser.watch import AnnotationWatcher
+
+from helpers import TOC, run_cli, write_feature
+
+
+@pytest.fixture
+def duplicate_tree(tmp_path):
+    """Two modules that define the same id, a.py first in walk order"""
+    src = tmp_path / "duplicates"
+    write_feature(str(src / "a.py"), "dup_feature", "From A")
+    write_feature(str(src / "b.py"), "dup_feature", "From B")
+    return str(src)
+
+
+@pytest.fixture
+def duplicate_toc(tmp_path):
+    """TOC with the one case that the modules of duplicate_tree define"""
+    toc = tmp_path / "toc.json"
+    toc.write_text(json.dumps([{"section_title": "Duplicates", "section_features": [
+        {"title": "Duplicates", "id": "duplicates", "cases": [{"id": "dup_feature"}]}]}]))
+    return str(toc)
+
+
+def watched_title(watcher):
+    watcher.write()
+    with open(watcher.out) as grid_file:
+        return json.load(grid_file)[0]["section_features"][0]["cases"][0].get("title")
+
+
+@pytest.mark.parametrize("on_conflict, title", [("first", "From A"), ("last", "From B")])
+def test_on_conflict_chooses_the_definition_kept(duplicate_tree, on_conflict, title):
+    index = build_index(duplicate_tree, BuildOptions(on_conflict=on_conflict))
+    assert index["dup_feature"]["title"] == title
+    [conflict] = index.conflicts
+    assert conflict.annotation_id == "dup_feature"
+    assert [(os.path.basename(definition.filepath), definition.line, definition.scope)
+            for definition in conflict.definitions] == [("a.py", 5, "Feature"), ("b.py", 5, "Feature")]
+    assert conflict.kept == (0 if on_conflict == "first" else 1)
+
+
+def test_on_conflict_error_raises(duplicate_tree, tmp_path):
+    with pytest.raises(DuplicateAnnotationError):
+        build_index(duplicate_tree, BuildOptions(on_conflict="error"))
+    report = tmp_path / "conflicts.json"
+    result = run_cli("parse", duplicate_tree, TOC, "--no-cache", "--on-conflict", "error",
+                     "--conflict-report", str(report), check=False)
+    assert result.returncode == 1
+    assert "defined more than once" in result.stderr
+    assert '"annotation_id": "dup_feature"' in report.read_text()
+
+
+def test_index_keeps_its_conflict_policy(duplicate_tree, tmp_path):
+    index_path = str(tmp_path / "index.json")
+    write_index(build_index(duplicate_tree, BuildOptions(on_conflict="first")), duplicate_tree, index_path)
+    assert load_index(index_path, duplicate_tree).on_conflict == "first"
+
+
+def test_update_keeps_the_conflict_policy_of_the_index(duplicate_tree, tmp_path):
+    grid, index_path = str(tmp_path / "grid.json"), str(tmp_path / "index.json")
+    run_cli("parse", duplicate_tree, TOC, "--no-cache", "--on-conflict", "first", "--out", grid,
+            "--index-out", index_path)
+    write_feature(os.path.join(duplicate_tree, "a.py"), "dup_feature", "From A2")
+    updated = run_cli("update", duplicate_tree, grid, "--index", index_path,
+                      "--changed", os.path.join(duplicate_tree, "a.py")).stdout
+    assert updated == run_cli("parse", duplicate_tree, TOC, "--no-cache", "--on-conflict", "first").stdout
+    assert load_index(index_path, duplicate_tree)["dup_feature"]["title"] == "From A2"
+
+    result = run_cli("update", duplicate_tree, grid, "--index", index_path, "--on-conflict", "last",
+                     "--changed", os.path.join(duplicate_tree, "a.py"), check=False)
+    assert result.returncode != 0
+    assert "differs from the policy first" in result.stderr
+
+
+def test_watch_keeps_the_definition_chosen_by_on_conflict(duplicate_tree, duplicate_toc, tmp_path):
+    watcher = AnnotationWatcher(duplicate_tree, duplicate_toc, str(tmp_path / "grid.json"),
+                                BuildOptions(on_conflict="first"))
+    assert watched_title(watcher) == "From A"
+    assert [conflict.annotation_id for conflict in watcher.conflicts] == ["dup_feature"]
+    write_feature(os.path.join(duplicate_tree, "b.py"), "dup_feature", "From B, edited")
+    assert watcher.refresh() == set()
+    assert watched_title(watcher) == "From A"
+    write_feature(os.path.join(duplicate_tree, "a.py"), "a_feature", "From A")
+    assert watcher.refresh() == {"dup_feature"}
+    assert watched_title(watcher) == "From B, edited"
+    assert watcher.conflicts == []
+
+
+def test_watch_with_error_keeps_the_grid_until_a_duplicate_is_resolved(duplicate_tree, duplicate_toc, tmp_path):
+    with pytest.raises(DuplicateAnnotationError):
+        AnnotationWatcher(duplicate_tree, duplicate_toc, str(tmp_path / "grid.json"), BuildOptions(on_conflict="error"))
+    result = run_cli("watch", duplicate_tree, duplicate_toc, "--out", str(tmp_path / "grid.json"),
+                     "--on-conflict", "error", check=False)
+    assert result.returncode == 1
+    assert "dup_feature is defined 2 times" in result.stderr
+
+    os.remove(os.path.join(duplicate_tree, "b.py"))
+    watcher = AnnotationWatcher(duplicate_tree, duplicate_toc, str(tmp_path / "grid.json"),
+                                BuildOptions(on_conflict="error"))
+    write_feature(os.path.join(duplicate_tree, "b.py"), "dup_feature", "From B")
+    assert watcher.refresh() == set()
+    assert watched_title(watcher) == "From A"
+    write_feature(os.path.join(duplicate_tree, "b.py"), "b_feature", "From B")
+    write_feature(os.path.join(duplicate_tree, "a.py"), "dup_feature", "From A, edited")
+    assert watcher.refresh() == {"dup_feature"}
+    assert watched_title(watcher) == "From A, edited"
@@ -0,0 +1,17 @@
+from GE_DataDocs_Parser.GE_DataDocs_Parser import BuildOptions, build_index
+
+from helpers import TOC, run_cli
+
+
+def test_tokenize_engine_finds_the_annotations_of_the_ast_engine(source_tree):
+    ast_index = build_index(source_tree, BuildOptions(engine="ast"))
+    tokenize_index = build_index(source_tree, BuildOptions(engine="tokenize"))
+    assert len(ast_index) == 17
+    assert list(tokenize_index.items()) == list(ast_index.items())
+    assert ([(annotation.line, annotation.scope) for annotation in tokenize_index.values()] ==
+            [(annotation.line, annotation.scope) for annotation in ast_index.values()])
+
+
+def test_tokenize_engine_writes_the_grid_of_the_ast_engine(source_tree):
+    assert (run_cli("parse", source_tree, TOC, "--no-cache", "--engine", "tokenize").stdout ==
+            run_cli("parse", source_tree, TOC, "--no-cache").stdout)
@@ -0,0 +1,76 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from GE_DataDocs_Parser.incremental import git_changed_files, load_index
+
+from helpers import TOC, run_cli, write_feature
+
+requires_git = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git(cwd, *arguments):
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *arguments],
+                   cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def parsed_tree(source_tree, tmp_path):
+    """source_tree, with the grid and the index of a full parse"""
+    grid, index_path = str(tmp_path / "grid.json"), str(tmp_path / "index.json")
+    run_cli("parse", source_tree, TOC, "--no-cache", "--out", grid, "--index-out", index_path)
+    return source_tree, grid, index_path
+
+
+def test_update_of_changed_files_writes_the_grid_of_a_full_parse(parsed_tree):
+    source_tree, grid, index_path = parsed_tree
+    changed = os.path.join(source_tree, "pkg_1", "module_1.py")
+    write_feature(changed, "generated_feature_1", "Retitled feature", name="Feature1", maturity="Production")
+    os.remove(os.path.join(source_tree, "pkg_2", "module_2.py"))
+
+    updated = run_cli("update", source_tree, grid, "--index", index_path, "--changed", changed,
+                      "--changed", os.path.join(source_tree, "pkg_2", "module_2.py")).stdout
+    assert updated == run_cli("parse", source_tree, TOC, "--no-cache").stdout
+    assert load_index(index_path, source_tree)["generated_feature_1"]["title"] == "Retitled feature"
+
+
+@requires_git
+def test_git_changed_files_lists_both_paths_of_a_moved_file(source_tree):
+    git(source_tree, "init", "-q")
+    git(source_tree, "add", ".")
+    git(source_tree, "commit", "-q", "-m", "baseline")
+    git(source_tree, "mv", os.path.join("pkg_0", "module_0.py"), os.path.join("pkg_1", "renamed.py"))
+    write_feature(os.path.join(source_tree, "untracked.py"), "untracked_feature", "Untracked")
+
+    assert sorted(git_changed_files(source_tree, "HEAD")) == sorted(
+        os.path.join(source_tree, *relpath) for relpath in
+        [("pkg_0", "module_0.py"), ("pkg_1", "renamed.py"), ("untracked.py",)])
+
+
+@requires_git
+def test_update_since_a_revision_follows_a_moved_file(parsed_tree):
+    source_tree, grid, index_path = parsed_tree
+    git(source_tree, "init", "-q")
+    git(source_tree, "add", ".")
+    git(source_tree, "commit", "-q", "-m", "baseline")
+    git(source_tree, "mv", os.path.join("pkg_0", "module_0.py"), os.path.join("pkg_1", "renamed.py"))
+
+    updated = run_cli("update", source_tree, grid, "--index", index_path, "--since", "HEAD").stdout
+    assert updated == run_cli("parse", source_tree, TOC, "--no-cache").stdout
+    index = load_index(index_path, source_tree)
+    assert index.source("generated_feature_0") == os.path.join(os.path.abspath(source_tree), "pkg_1", "renamed.py")
+    assert os.path.join(os.path.abspath(source_tree), "pkg_0", "module_0.py") not in index.files
+    assert not index.conflicts
+
+
+def test_update_rejects_an_index_of_another_version(parsed_tree, tmp_path):
+    source_tree, grid, _ = parsed_tree
+    old_index = tmp_path / "old_index.json"
+    old_index.write_text('{"version": 1, "files": []}')
+    result = run_cli("update", source_tree, grid, "--index", str(old_index), "--changed",
+                     os.path.join(source_tree, "pkg_0", "module_0.py"), check=False)
+    assert result.returncode == 1
+    assert "written by another version" in result.stderr
+    assert "Traceback" not in result.stderr
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+from html.parser import HTMLParser
+
+import pytest
+
+from GE_DataDocs_Parser import output
+from GE_DataDocs_Parser.GE_DataDocs_Parser import merge
+from GE_DataDocs_Parser.defaults import OUTPUT_FORMATS
+from GE_DataDocs_Parser.output import MATURITY_DETAIL_COLUMNS, RENDERERS, JsonRenderer, render_grid
+from GE_DataDocs_Parser.records import FeatureAnnotation
+
+TOC = [{
+    "section_title": "Infrastructure & <tools>",
+    "section_features": [{
+        "title": "Where is your data stored?",
+        "description": "A Datasource | facilitates access",
+        "id": "datasource",
+        "cases": [{"id": "datasource_s3"}, {"id": "datasource_unknown"}],
+        "how_to_guide_url": "https://example.com/datasource",
+    }],
+    "footnote": "after the features",
+}]
+
+ANNOTATIONS = {"datasource_s3": FeatureAnnotation({
+    "id": "datasource_s3",
+    "title": "S3 | buckets",
+    "icon": "",
+    "short_description": "Reads <objects> from S3",
+    "description": "",
+    "how_to_guide_url": "https://example.com/s3?a=1&b=2",
+    "maturity": "Production",
+    "maturity_details": {"api_stability": "Stable", "bug_risk": "Low"},
+}, line=3, scope="S3Datasource")}
+
+
+def render(output_format, indent=2):
+    out = io.StringIO()
+    renderer = JsonRenderer(out, indent) if output_format == "json" else RENDERERS[output_format][0](out)
+    render_grid(TOC, ANNOTATIONS, [renderer])
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("indent, separators", [(2, None), (None, (",", ":"))])
+def test_json_is_the_merged_grid(indent, separators):
+    assert render("json", indent) == json.dumps(merge(TOC, {id_: a.to_dict() for id_, a in ANNOTATIONS.items()}),
+                                                indent=indent, separators=separators)
+
+
+def test_ndjson_has_one_case_per_line():
+    lines = [json.loads(line) for line in render("ndjson").splitlines()]
+    assert [(line["section_title"], line["feature_id"], line["case"]["id"]) for line in lines] == [
+        ("Infrastructure & <tools>", "datasource", "datasource_s3"),
+        ("Infrastructure & <tools>", "datasource", "datasource_unknown")]
+    assert lines[0]["case"]["maturity_details"] == {"api_stability": "Stable", "bug_risk": "Low"}
+
+
+def test_csv_has_one_row_per_case():
+    header, annotated, unannotated = csv.reader(io.StringIO(render("csv")))
+    assert header[:4] == ["section_title", "feature_id", "feature_title", "id"]
+    row = dict(zip(header, annotated))
+    assert (row["title"], row["maturity"], row["api_stability"], row["bug_risk"]) == (
+        "S3 | buckets", "Production", "Stable", "Low")
+    assert row["implementation_completeness"] == ""
+    assert dict(zip(header, unannotated)) == dict.fromkeys(header, "") | {
+        "section_title": "Infrastructure & <tools>", "feature_id": "datasource",
+        "feature_title": "Where is your data stored?", "id": "datasource_unknown"}
+
+
+def test_markdown_has_a_table_per_feature():
+    lines = render("markdown").splitlines()
+    assert lines[:5] == ["## Infrastructure & <tools>", "", "### Where is your data stored?", "",
+                         "A Datasource | facilitates access"]
+    header, rule, annotated, unannotated = lines[6:10]
+    assert header.count("|") == rule.count("|") == len(MATURITY_DETAIL_COLUMNS) + 3
+    assert annotated == ("| [S3 \\| buckets](https://example.com/s3?a=1&b=2) | Production | Stable |  |  |  |  "
+                         "| Low |")
+    assert unannotated == "| datasource_unknown |  |  |  |  |  |  |  |"
+
+
+class _Elements(HTMLParser):
+    """Collects the tags, the ids and the text of an HTML page, and checks that every tag is closed"""
+
+    def __init__(self):
+        super().__init__()
+        self.open, self.ids, self.text, self.hrefs = [], [], [], []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag != "meta":
+            self.open.append(tag)
+        self.ids += [attrs["id"]] if "id" in attrs else []
+        self.hrefs += [attrs["href"]] if "href" in attrs else []
+
+    def handle_endtag(self, tag):
+        assert self.open.pop() == tag
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+
+def test_html_is_a_well_formed_escaped_page():
+    page = render("html")
+    assert page.startswith("<!DOCTYPE html>")
+    elements = _Elements()
+    elements.feed(page)
+    assert elements.open == []
+    assert elements.ids == ["datasource", "datasource_s3", "datasource_unknown"]
+    assert elements.hrefs == ["https://example.com/s3?a=1&b=2"]
+    assert "Infrastructure & <tools>" in elements.text
+    assert "S3 | buckets" in elements.text
+
+
+def test_one_pass_writes_what_a_pass_per_format_writes(monkeypatch):
+    monkeypatch.setattr(output, "WRITE_BUFFER_SIZE", 100)  # flushed several times per format
+    outs = [io.StringIO() for _ in OUTPUT_FORMATS]
+    render_grid(TOC, ANNOTATIONS, [RENDERERS[output_format][0](out) for output_format, out in zip(OUTPUT_FORMATS, outs)])
+    assert [out.getvalue() for out in outs] == [render(output_format) for output_format in OUTPUT_FORMATS]
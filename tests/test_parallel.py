@@ -0,0 +1,19 @@
+import json
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import BuildOptions, build_index
+
+from helpers import TOC, run_cli
+
+
+def test_workers_find_the_annotations_of_a_serial_parse(source_tree):
+    serial = build_index(source_tree)
+    parallel = build_index(source_tree, BuildOptions(workers=2))
+    assert list(parallel.items()) == list(serial.items())
+    assert list(parallel.files) == list(serial.files)
+
+
+def test_parallel_parse_writes_the_serial_grid(source_tree):
+    serial = run_cli("parse", source_tree, TOC, "--no-cache").stdout
+    parallel = run_cli("parse", source_tree, TOC, "--no-cache", "-j", "2").stdout
+    assert json.loads(serial)
+    assert parallel == serial
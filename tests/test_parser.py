@@ -0,0 +1,62 @@
+import json
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import _parse_feature_annotation, build_annotations
+
+from helpers import TOC, run_cli
+
+
+def test_only_the_first_colon_splits_a_field():
+    annotations = _parse_feature_annotation(
+        "id: url_feature\n"
+        "maturity: Beta\n"
+        "how_to_guide_url: https://docs.greatexpectations.io/en/latest/how_to.html#step:2\n"
+        "description: key: value pairs are kept whole\n")
+    assert annotations[0]["how_to_guide_url"] == "https://docs.greatexpectations.io/en/latest/how_to.html#step:2"
+    assert annotations[0]["description"] == "key: value pairs are kept whole"
+
+
+def test_indented_lines_continue_the_field_above():
+    annotations = _parse_feature_annotation(
+        "id: wrapped_feature\n"
+        "short_description: a description that\n"
+        "    wraps over two lines\n"
+        "maturity: Beta\n"
+        "maturity_details:\n"
+        "    api_stability: Stable\n"
+        "    bug_risk: Low\n")
+    assert annotations[0]["short_description"] == "a description that wraps over two lines"
+    assert annotations[0]["maturity"] == "Beta"
+    assert annotations[0]["maturity_details"]["bug_risk"] == "Low"
+
+
+def test_fields_come_in_any_order_and_unknown_fields_are_kept():
+    annotations = _parse_feature_annotation(
+        "id: first_feature\n"
+        "maturity: Beta\n"
+        "owner: core team\n"
+        "title: First\n"
+        "\n"
+        "id: second_feature\n"
+        "bug_risk: High\n"
+        "maturity: Experimental\n"
+        "title: Second\n")
+    assert [annotation["id"] for annotation in annotations] == ["first_feature", "second_feature"]
+    assert annotations[0]["owner"] == "core team"
+    assert annotations[0]["title"] == "First"
+    assert annotations[1]["maturity_details"]["bug_risk"] == "High"
+    assert annotations[1]["title"] == "Second"
+
+
+def test_blocks_without_maturity_are_not_annotations():
+    assert _parse_feature_annotation("Args:\n    id: the id of the feature\n    bug_risk: Low\n") == []
+
+
+def test_block_lines_are_counted_from_the_first_line_of_the_docstring():
+    annotations = _parse_feature_annotation("Summary.\n\nid: counted_feature\nmaturity: Beta\n", first_line=10,
+                                            scope="Outer.Inner")
+    assert (annotations[0].line, annotations[0].scope) == (12, "Outer.Inner")
+
+
+def test_build_annotations_returns_the_parse_grid(source_tree):
+    parsed = run_cli("parse", source_tree, TOC, "--no-cache").stdout
+    assert build_annotations(source_tree, TOC) == json.loads(parsed)
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from GE_DataDocs_Parser.pathfilter import PathFilter
+
+TREE_FILES = [
+    "top.py",
+    "notes.txt",
+    "pkg/module.py",
+    "pkg/generated_module.py",
+    "pkg/keep_generated.py",
+    "pkg/build/module.py",
+    "pkg/sub/deep.py",
+    "pkg/sub/build.py",
+    "build/module.py",
+    "dist/module.py",
+    "docs/conf.py",
+    "docs/build/module.py",
+    "env/pyvenv.cfg",
+    "env/lib/site.py",
+    "__pycache__/cached.py",
+]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """A tree of the TREE_FILES, all empty"""
+    for relpath in TREE_FILES:
+        filepath = tmp_path / relpath
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_text("")
+    return str(tmp_path)
+
+
+def walked(root, path_filter):
+    """Returns the paths relative to root that path_filter walks, and checks that is_selected picks the same files"""
+    selected = [os.path.relpath(filepath, root).replace(os.sep, "/") for filepath in path_filter.walk(root)]
+    assert [relpath for relpath in TREE_FILES if path_filter.is_selected(root, os.path.join(root, relpath))] == \
+        [relpath for relpath in TREE_FILES if relpath in selected]
+    return set(selected)
+
+
+def test_default_excludes_drop_build_dist_caches_and_virtualenvs_at_any_depth(tree):
+    assert walked(tree, PathFilter()) == {"top.py", "pkg/module.py", "pkg/generated_module.py",
+                                          "pkg/keep_generated.py", "pkg/sub/deep.py", "pkg/sub/build.py",
+                                          "docs/conf.py"}
+
+
+def test_without_default_excludes_every_py_file_is_walked(tree):
+    assert walked(tree, PathFilter(default_excludes=False)) == {relpath for relpath in TREE_FILES
+                                                                if relpath.endswith(".py")}
+
+
+def test_a_negated_pattern_includes_again_what_an_earlier_one_excluded(tree):
+    path_filter = PathFilter(exclude=["*generated*.py", "!keep_*.py"])
+    assert {"pkg/generated_module.py", "pkg/keep_generated.py"} & walked(tree, path_filter) == {"pkg/keep_generated.py"}
+
+
+def test_a_pattern_with_a_slash_is_anchored_to_the_root(tree):
+    assert "top.py" not in walked(tree, PathFilter(exclude=["/top.py"]))
+    anchored = walked(tree, PathFilter(exclude=["pkg/sub"]))
+    assert not {"pkg/sub/deep.py", "pkg/sub/build.py"} & anchored
+    assert walked(tree, PathFilter(exclude=["sub/deep.py"])) >= {"pkg/sub/deep.py"}
+
+
+def test_double_star_matches_across_directories(tree):
+    assert not {relpath for relpath in walked(tree, PathFilter(exclude=["pkg/**/*.py"])) if relpath.startswith("pkg/")}
+    assert "pkg/sub/deep.py" not in walked(tree, PathFilter(exclude=["**/deep.py"]))
+    assert walked(tree, PathFilter(include=["**/sub/*.py"])) == {"pkg/sub/deep.py", "pkg/sub/build.py"}
+
+
+def test_a_trailing_slash_only_matches_directories(tree):
+    assert "pkg/sub/build.py" in walked(tree, PathFilter(default_excludes=False, exclude=["build.py/"]))
+    assert "pkg/sub/build.py" not in walked(tree, PathFilter(default_excludes=False, exclude=["build.py"]))
+    assert not {"docs/conf.py"} & walked(tree, PathFilter(exclude=["docs/"]))
+
+
+def test_gitignore_patterns_are_relative_to_their_directory(tree):
+    with open(os.path.join(tree, "pkg", ".gitignore"), "w") as gitignore:
+        gitignore.write("# generated sources\n/generated_*.py\n")
+    assert "pkg/generated_module.py" not in walked(tree, PathFilter())
+    assert "pkg/generated_module.py" in walked(tree, PathFilter(gitignore=False))
+
+
+def test_is_selected_rejects_files_outside_the_root_and_other_extensions(tree):
+    path_filter = PathFilter()
+    assert not path_filter.is_selected(os.path.join(tree, "pkg"), os.path.join(tree, "top.py"))
+    assert not path_filter.is_selected(tree, os.path.join(tree, "notes.txt"))
+    assert path_filter.is_selected(tree, os.path.join(tree, "pkg", "not_created_yet.py"))
@@ -0,0 +1,128 @@
+import json
+import os
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from GE_DataDocs_Parser.serve import AnnotationService, is_socket, make_server
+
+from helpers import write_feature
+
+SERVED_TOC = [{"section_title": "Served", "section_features": [
+    {"title": "Served feature", "id": "served", "cases": [{"id": "served_feature"}]}]}]
+
+
+@pytest.fixture
+def service(tmp_path):
+    (tmp_path / "src").mkdir()
+    return AnnotationService([str(tmp_path / "src")])
+
+
+@pytest.fixture
+def served(tmp_path):
+    """The URL of a server on a free port, serving a tree with one annotated module, and the path of that module"""
+    feature_path = str(tmp_path / "src" / "feature.py")
+    write_feature(feature_path, "served_feature", "Served")
+    server = make_server(AnnotationService([str(tmp_path / "src")]), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", feature_path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def toc_path(tmp_path):
+    toc_path = tmp_path / "toc.json"
+    toc_path.write_text(json.dumps(SERVED_TOC))
+    return str(toc_path)
+
+
+def request(url, data=None):
+    """Returns the status and the JSON body of the response to a GET, or a POST of data"""
+    try:
+        with urllib.request.urlopen(url, data) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        with e:
+            return e.code, json.load(e)
+
+
+def served_title(grid):
+    return grid[0]["section_features"][0]["cases"][0].get("title")
+
+
+def test_make_server_keeps_a_file_that_is_not_a_socket(service, tmp_path):
+    precious = tmp_path / "precious.txt"
+    precious.write_text("keep")
+    with pytest.raises(FileExistsError):
+        make_server(service, socket_path=str(precious))
+    assert precious.read_text() == "keep"
+
+
+def test_make_server_replaces_a_stale_socket(service, tmp_path):
+    socket_path = str(tmp_path / "stale.sock")
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(socket_path)
+    stale.close()
+    assert is_socket(socket_path)
+    server = make_server(service, socket_path=socket_path)
+    server.server_close()
+    assert is_socket(socket_path)
+    os.unlink(socket_path)
+    assert not is_socket(socket_path)
+
+
+def test_build_serves_the_grid_of_the_toc_file(served, toc_path):
+    url, _ = served
+    status, grid = request(f"{url}/build?toc={toc_path}")
+    assert status == 200
+    assert served_title(grid) == "Served"
+
+
+def test_build_rejects_a_missing_toc(served, tmp_path):
+    url, _ = served
+    assert request(f"{url}/build")[0] == 400
+    status, body = request(f"{url}/build?toc={tmp_path / 'missing.json'}")
+    assert status == 400
+    assert "does not exist" in body["error"]
+
+
+def test_build_and_merge_reject_a_root_that_is_not_served(served, toc_path, tmp_path):
+    url, _ = served
+    assert request(f"{url}/build?toc={toc_path}&root={tmp_path}")[0] == 404
+    assert request(f"{url}/merge?root={tmp_path}", json.dumps(SERVED_TOC).encode())[0] == 404
+
+
+def test_merge_serves_the_grid_of_the_posted_toc(served):
+    url, _ = served
+    status, grid = request(f"{url}/merge", json.dumps(SERVED_TOC).encode())
+    assert status == 200
+    assert served_title(grid) == "Served"
+
+
+@pytest.mark.parametrize("body", [b"not json", b'{"section_title": "not a list"}'])
+def test_merge_rejects_a_malformed_toc(served, body):
+    url, _ = served
+    assert request(f"{url}/merge", body)[0] == 400
+
+
+def test_unknown_endpoints_are_not_found(served):
+    url, _ = served
+    assert request(f"{url}/parse")[0] == 404
+
+
+def test_build_and_merge_pick_up_a_touched_file(served, toc_path):
+    url, feature_path = served
+    assert served_title(request(f"{url}/build?toc={toc_path}")[1]) == "Served"
+    write_feature(feature_path, "served_feature", "Served again")
+    stat = os.stat(feature_path)
+    os.utime(feature_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert served_title(request(f"{url}/build?toc={toc_path}")[1]) == "Served again"
+    assert served_title(request(f"{url}/merge", json.dumps(SERVED_TOC).encode())[1]) == "Served again"
+    stats = request(f"{url}/stats")[1]
+    assert list(stats["roots"].values())[0]["reparsed_files"] == 1
@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+from GE_DataDocs_Parser.shard import build_shard, reduce_shards
+
+from helpers import COMMAND, REPO_ROOT, TOC, run_cli
+
+
+def test_shards_parsed_in_separate_processes_reduce_to_the_parse_grid(source_tree, tmp_path):
+    shard_paths = [str(tmp_path / f"shard_{index}.json") for index in range(1, 4)]
+    processes = [subprocess.Popen([*COMMAND, "parse", source_tree, "--shard", f"{index}/3", "--out", shard_path,
+                                   "--no-cache"], cwd=REPO_ROOT, env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for index, shard_path in enumerate(shard_paths, 1)]
+    assert [process.wait() for process in processes] == [0, 0, 0]
+    reduced = run_cli("reduce", *reversed(shard_paths), "--injson", TOC).stdout
+    parsed = run_cli("parse", source_tree, TOC, "--no-cache").stdout
+    assert json.loads(parsed)
+    assert reduced == parsed
+
+
+@pytest.mark.parametrize("shard", [[0, 2], [3, 2]])
+def test_reduce_rejects_a_shard_number_out_of_range(source_tree, tmp_path, shard):
+    shard_paths = [str(tmp_path / f"shard_{index}.json") for index in (1, 2)]
+    for index, shard_path in enumerate(shard_paths, 1):
+        build_shard(source_tree, shard_path, (index, 2))
+    with open(shard_paths[1]) as shardfile:
+        stray = json.load(shardfile)
+    stray["shard"] = shard
+    stray_path = str(tmp_path / "stray.json")
+    with open(stray_path, "w") as shardfile:
+        json.dump(stray, shardfile)
+    with pytest.raises(ValueError, match=f"shard {shard[0]}/2, not one of shards 1 to 2"):
+        reduce_shards([*shard_paths, stray_path])
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from GE_DataDocs_Parser.GE_DataDocs_Parser import _parse_feature_annotation, maturity_details_keys
+from GE_DataDocs_Parser.validation import validate_annotation
+
+from helpers import TOC, run_cli
+
+VALID_DOCSTRING = """
+Summary of the feature.
+
+id: valid_feature
+title: Valid feature
+icon: https://docs.greatexpectations.io/icon.png
+short_description: Short
+description: Longer
+how_to_guide_url: https://docs.greatexpectations.io/en/latest/how_to.html
+maturity: Production
+maturity_details:
+    api_stability: Stable
+    implementation_completeness: Complete
+    unit_test_coverage: Complete
+    integration_infrastructure_test_coverage: N/A
+    documentation_completeness: Complete
+    bug_risk: Low
+"""
+
+VALID_MODULE = f'''class ValidFeature:
+    """{VALID_DOCSTRING}"""
+'''
+
+
+def valid_annotation(**fields):
+    """Returns the annotation of VALID_DOCSTRING as a dict, with fields replaced, or removed where they are None"""
+    annotation = _parse_feature_annotation(VALID_DOCSTRING)[0].to_dict()
+    annotation.update(fields)
+    return {field: value for field, value in annotation.items() if value is not None}
+
+
+def test_a_complete_annotation_is_valid():
+    assert validate_annotation(valid_annotation()) == []
+
+
+@pytest.mark.parametrize("annotation, message", [
+    (valid_annotation(icon=None), "missing field icon"),
+    (valid_annotation(title=""), "title is blank"),
+    (valid_annotation(maturity="Alpha"), "maturity 'Alpha' is not one of Production, Beta, Experimental, N/A"),
+    (valid_annotation(maturity_details={key: "Low" for key in maturity_details_keys if key != "bug_risk"}),
+     "maturity_details is missing bug_risk"),
+    (valid_annotation(how_to_guide_url="docs/how_to.html"),
+     "how_to_guide_url 'docs/how_to.html' is not an http(s) URL"),
+    (valid_annotation(icon="ftp://docs.greatexpectations.io/icon.png"),
+     "icon 'ftp://docs.greatexpectations.io/icon.png' is not an http(s) URL"),
+])
+def test_each_problem_has_its_message(annotation, message):
+    assert validate_annotation(annotation) == [message]
+
+
+def test_blank_links_are_left_to_be_written():
+    assert validate_annotation(valid_annotation(icon="", how_to_guide_url="")) == []
+
+
+def test_strict_fails_after_writing_the_grid(source_tree, tmp_path):
+    lenient_path, strict_path = str(tmp_path / "lenient.json"), str(tmp_path / "strict.json")
+    run_cli("parse", source_tree, TOC, "--out", lenient_path, "--no-cache")
+    strict = run_cli("parse", source_tree, TOC, "--out", strict_path, "--no-cache", "--strict", check=False)
+    assert strict.returncode != 0
+    assert "annotations failed validation" in strict.stderr
+    with open(lenient_path) as lenient_file, open(strict_path) as strict_file:
+        assert json.load(strict_file) == json.load(lenient_file)
+
+
+def test_strict_passes_valid_annotations(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "valid.py").write_text(VALID_MODULE)
+    strict = run_cli("parse", str(tmp_path / "src"), TOC, "--out", str(tmp_path / "grid.json"), "--no-cache",
+                     "--strict", check=False)
+    assert strict.returncode == 0, strict.stderr
+    assert "0 validation errors" in strict.stderr